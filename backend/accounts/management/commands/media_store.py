@@ -0,0 +1,25 @@
+# accounts/management/commands/media_store.py
+from django.core.management.base import BaseCommand
+
+from config.media_store import import_legacy, sweep
+
+
+class Command(BaseCommand):
+    help = "Media ombori: eski fayllarni xesh nomlariga ko'chirish, thumbnail yaratish, ishlatilmaganlarini tozalash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--import-legacy', action='store_true',
+                            help="upload_to nomli eski fayllarni omborga ko'chirish (takrorlar birlashadi)")
+        parser.add_argument('--grace', type=int, default=None,
+                            help="Ishlatilmagan fayl necha sekunddan keyin o'chiriladi (standart MEDIA_STORE['ORPHAN_GRACE'])")
+
+    def handle(self, *args, **options):
+        if options['import_legacy']:
+            result = import_legacy()
+            self.stdout.write(f"Ko'chirildi: {result['moved']}, topilmadi: {result['missing']}")
+
+        kwargs = {} if options['grace'] is None else {'grace': options['grace']}
+        result = sweep(**kwargs)
+        self.stdout.write(self.style.SUCCESS(
+            f"Fayllar: {result['files']}, yangi thumbnail: {result['thumbnails']}, o'chirildi: {result['removed']}"
+        ))
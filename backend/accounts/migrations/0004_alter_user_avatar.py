@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:48
+
+import config.media_store
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_emergencycontact_emergencysos_familymember'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=config.media_store.media_storage, upload_to='avatars/'),
+        ),
+    ]
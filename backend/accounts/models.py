@@ -4,6 +4,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
 
+from config.media_store import media_storage
+
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = [
@@ -21,7 +23,7 @@ class User(AbstractUser):
     birth_date = models.DateField(null=True, blank=True)
     gender = models.CharField(max_length=10, blank=True, default='')
     blood_type = models.CharField(max_length=5, blank=True, default='')
-    avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=media_storage, null=True, blank=True)
     address = models.TextField(blank=True, default='')
 
     # Health info
@@ -49,6 +51,16 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name}".strip() or self.email
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        # Shifokor ismi AI tavsiyalaridagi xaritada (last_login kabi yangilanishlarda emas)
+        if self.user_type == 'doctor' and (
+            update_fields is None or {'first_name', 'last_name'} & set(update_fields)
+        ):
+            from doctors.recommendations import bump_version
+            bump_version()
+
 class FamilyMember(models.Model):
     """Oila a'zolari"""
     RELATIONSHIP_CHOICES = [
@@ -2,6 +2,8 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+
+from config.media_store import thumbnail_urls
 from .models import User
 
 
@@ -313,6 +315,7 @@ class MedicalDocumentSerializer(serializers.ModelSerializer):
     """Tibbiy hujjatlar serializeri"""
     document_type_display = serializers.CharField(source='get_document_type_display', read_only=True)
     file_url = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
     file_size_display = serializers.SerializerMethodField()
 
     class Meta:
@@ -320,7 +323,7 @@ class MedicalDocumentSerializer(serializers.ModelSerializer):
         model = MedicalDocument
         fields = [
             'id', 'title', 'document_type', 'document_type_display',
-            'file', 'file_url', 'file_type', 'file_size', 'file_size_display',
+            'file', 'file_url', 'thumbnails', 'file_type', 'file_size', 'file_size_display',
             'description', 'doctor_name', 'hospital_name',
             'document_date', 'is_important', 'created_at', 'updated_at'
         ]
@@ -334,6 +337,10 @@ class MedicalDocumentSerializer(serializers.ModelSerializer):
             return obj.file.url
         return None
 
+    def get_thumbnails(self, obj):
+        """Ro'yxat uchun kichik WebP rasm (PDF - birinchi sahifa); hali tayyor bo'lmasa None"""
+        return thumbnail_urls(obj.file, self.context.get('request'))
+
     def get_file_size_display(self, obj):
         """Fayl hajmini o'qiladigan formatda"""
         size = obj.file_size or 0
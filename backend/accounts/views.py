@@ -941,31 +941,34 @@ def get_aqi_level(aqi):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def air_quality_history_chart(request):
-    """Havo sifati tarixi"""
+    """Havo sifati tarixi (saqlangan IQAir o'lchovlarining kunlik/soatlik agregatlaridan)"""
+    from air_quality import history
+    from air_quality.readings import resolve_city
 
-    days = int(request.GET.get('days', 30))
-    city = request.GET.get('city', 'Toshkent')
+    city_info = resolve_city(request.GET.get('city', 'Toshkent'))
+    try:
+        start, end, points = history.parse_range(request.GET, default_days=30)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    result = history.series(city_info['city'], start, end, points)
     data = []
-    for i in range(days):
-        date = timezone.now().date() - timedelta(days=days - 1 - i)
-        aqi = random.randint(40, 180)
+    for point in result['points']:
+        moment = timezone.localtime(point['time'])
         data.append({
-            'date': str(date),
-            'aqi': aqi,
-            'level': get_aqi_level(aqi),
+            'date': str(moment.date()),
+            'time': moment.isoformat(),
+            'aqi': point['aqi'],
+            'min': point['min'],
+            'max': point['max'],
+            'level': get_aqi_level(point['aqi']),
         })
 
-    aqi_values = [d['aqi'] for d in data]
-
     return Response({
-        'city': city,
+        'city': city_info['name_uz'],
+        'resolution': result['resolution'],
         'data': data,
-        'statistics': {
-            'average': round(sum(aqi_values) / len(aqi_values), 1),
-            'min': min(aqi_values),
-            'max': max(aqi_values),
-        }
+        'statistics': result['statistics'],
     })
 
 
@@ -35,6 +35,9 @@ urlpatterns = [
     path('appointments/<uuid:pk>/confirm/', views.admin_appointment_confirm, name='admin-appointment-confirm'),
     path('appointments/<uuid:pk>/cancel/', views.admin_appointment_cancel, name='admin-appointment-cancel'),
 
+    # ============== SYMPTOM TRENDS ==============
+    path('symptoms/trends/', views.admin_symptom_trends, name='admin-symptom-trends'),
+
     # ============== HOSPITALS ==============
     path('hospitals/', views.admin_hospitals_list, name='admin-hospitals-list'),
 
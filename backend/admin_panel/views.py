@@ -604,6 +604,71 @@ def admin_appointments_stats(request):
     })
 
 
+# ============== SYMPTOM TRENDS ==============
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_symptom_trends(request):
+    """
+    Alomatlar trendlari - kunlik agregatdan (SymptomDailyStat), xom tekshiruvlar o'qilmaydi.
+    ?dimension=symptom|condition|age|emergency|total&days=30&top=10&values=isitma,yo'tal
+    """
+    from ai_service.models import SymptomDailyStat, RollupWatermark
+    from ai_service.rollups import WATERMARK_NAME, symptom_key
+
+    dimension = request.query_params.get('dimension', 'symptom')
+    if dimension not in dict(SymptomDailyStat.DIMENSION_CHOICES):
+        return Response({'error': "Noto'g'ri dimension"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        top = min(max(int(request.query_params.get('top', 10)), 1), 50)
+    except ValueError:
+        return Response({'error': "days va top butun son bo'lishi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    stats = SymptomDailyStat.objects.filter(date__gte=start, date__lte=end)
+
+    values = [v.strip() for v in request.query_params.get('values', '').split(',') if v.strip()]
+    if dimension == 'symptom':
+        values = [symptom_key(v) for v in values]
+    if not values:
+        # Davr bo'yicha eng ko'p uchraganlari
+        values = list(
+            stats.filter(dimension=dimension)
+            .values('value').annotate(total=Sum('count')).order_by('-total')
+            .values_list('value', flat=True)[:top]
+        )
+
+    dates = [start + timedelta(days=i) for i in range(days)]
+    index = {date: i for i, date in enumerate(dates)}
+    series = {value: [0] * days for value in values}
+    totals = [0] * days
+    rows = stats.filter(Q(dimension=dimension, value__in=values) | Q(dimension='total'))
+    for row_dimension, value, date, count in rows.values_list('dimension', 'value', 'date', 'count'):
+        if row_dimension == 'total':
+            totals[index[date]] = count
+        if row_dimension == dimension and value in series:
+            series[value][index[date]] = count
+
+    updated_until = RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list(
+        'last_created_at', flat=True
+    ).first()
+
+    return Response({
+        'dimension': dimension,
+        'start': start,
+        'end': end,
+        'dates': dates,
+        'totals': totals,
+        'series': [
+            {'value': value, 'total': sum(counts), 'counts': counts}
+            for value, counts in series.items()
+        ],
+        'updated_until': updated_until,  # agregatga kirgan oxirgi tekshiruv vaqti
+    })
+
+
 # ============== HOSPITALS MANAGEMENT ==============
 
 @api_view(['GET'])
@@ -1,6 +1,8 @@
 # ai_service/admin.py
 from django.contrib import admin
-from .models import SymptomCheck, Symptom, MedicalCondition, AIConsultation
+from .models import (
+    SymptomCheck, Symptom, MedicalCondition, AIConsultation, AIAnalysisJob, LLMUsageStat, SymptomDailyStat,
+)
 
 
 @admin.register(SymptomCheck)
@@ -55,4 +57,30 @@ class AIConsultationAdmin(admin.ModelAdmin):
             return obj.symptoms[:50] + '...' if len(obj.symptoms) > 50 else obj.symptoms
         return '-'
 
-    get_symptoms_short.short_description = 'Alomatlar'
\ No newline at end of file
+    get_symptoms_short.short_description = 'Alomatlar'
+
+
+@admin.register(AIAnalysisJob)
+class AIAnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__email', 'symptoms']
+    ordering = ['-created_at']
+    readonly_fields = ['id', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+
+
+@admin.register(LLMUsageStat)
+class LLMUsageStatAdmin(admin.ModelAdmin):
+    list_display = ['bucket', 'kind', 'operation', 'model', 'outcome', 'count', 'retries',
+                    'input_tokens', 'output_tokens', 'cost_usd']
+    list_filter = ['kind', 'operation', 'outcome', 'model']
+    ordering = ['-bucket']
+    readonly_fields = [f.name for f in LLMUsageStat._meta.fields]
+
+
+@admin.register(SymptomDailyStat)
+class SymptomDailyStatAdmin(admin.ModelAdmin):
+    list_display = ['date', 'dimension', 'value', 'count']
+    list_filter = ['dimension', 'date']
+    search_fields = ['value']
+    ordering = ['-date', '-count']
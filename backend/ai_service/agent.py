@@ -1,10 +1,21 @@
 import json
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from django.conf import settings
-from doctors.models import Doctor
+from django.db import connection
+from doctors.recommendations import recommendations
 from medicines.models import Medicine
 from appointments.models import Appointment
+from .response_cache import agent_cache
+from .streaming import StreamingJSONFields
+from .model_health import model_health, gemini_model, ModelsUnavailable
+from .metering import meter, generate_text
+from .singleflight import agent_flight, prompt_key
+from .matcher import KeywordMatcher
+from .response_cache import STOPWORDS, normalize_symptoms, normalize_text
 
 # Gemini konfiguratsiya
 try:
@@ -13,62 +24,158 @@ try:
 except Exception:
     GEMINI_CONFIGURED = False
 
+# Stream paytida action lar uchun umumiy pool (har xabarga yangi thread yaratilmaydi)
+ACTION_WORKERS = 4
+_action_executor = None
+_action_executor_lock = threading.Lock()
+
+
+def _get_action_executor():
+    global _action_executor
+    with _action_executor_lock:
+        if _action_executor is None:
+            _action_executor = ThreadPoolExecutor(max_workers=ACTION_WORKERS, thread_name_prefix='agent-action')
+        return _action_executor
+
+
+# Mahalliy intent aniqlash - bu xabarlarga LLM siz javob beriladi
+INTENT_KEYWORDS = {
+    'greeting': ['salom', 'assalomu alaykum', 'assalom', 'xayrli kun', 'xayrli tong', 'hello', 'hi',
+                 'privet', 'здравствуйте', 'привет'],
+    'thanks': ['rahmat', 'tashakkur', 'spasibo', 'спасибо', 'thanks', 'thank you'],
+    'medicine_search': ['dori', 'tabletka', 'preparat', 'лекарств', 'таблетк'],
+    # Bular bo'lsa xabar LLM ga yuboriladi
+    'doctor': ['shifokor', 'doktor', 'vrach', 'врач', 'доктор'],
+    'pharmacy': ['dorixona', 'apteka', 'аптек', 'pharmacy'],
+}
+SMALL_TALK_INTENTS = ('greeting', 'thanks')
+# Salomlashish/rahmat yonida kelsa ham xabarni small talk qoldiradigan so'zlar
+SMALL_TALK_FILLER = {'katta', 'kop', 'sizga', 'sizlarga', 'hammaga', 'yaxshi', 'ok'}
+# Dori qidiruvida so'rovdan chiqarib tashlanadigan so'z o'zaklari (dori nomi emas)
+MEDICINE_QUERY_SKIP = (
+    'dori', 'tabletka', 'preparat', 'qidir', 'kerak', 'bormi', 'haqida', 'narx', 'topib', 'ber',
+    'qayer', 'qaysi', 'qanday', 'qancha', 'qachon', 'nima', 'nech', 'uchun', 'mumkin', 'yaqin',
+    'yaxshi', 'arzon',
+)
+LOCAL_REPLIES = {
+    'greeting': (
+        "Assalomu alaykum! Men HealthHub AI yordamchisiman. Alomatlaringizni ayting, "
+        "shifokor yoki dori topishda yordam beraman.",
+        ["Alomatlarim bor", "Shifokor kerak", "Dori qidirish"]
+    ),
+    'thanks': (
+        "Arzimaydi! Sog'lig'ingiz bo'yicha yana savollar bo'lsa, bemalol yozing.",
+        ["Alomatlarim bor", "Shifokor kerak"]
+    ),
+}
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def _build_small_talk_phrases():
+    """[(tokenlar, intent)] - uzunroq ibora birinchi ("thank you" "thank" dan oldin)"""
+    phrases = [
+        (tuple(_WORD_RE.findall(normalize_text(keyword))), intent)
+        for intent in SMALL_TALK_INTENTS for keyword in INTENT_KEYWORDS[intent]
+    ]
+    return sorted(phrases, key=lambda phrase: -len(phrase[0]))
+
+
+SMALL_TALK_PHRASES = _build_small_talk_phrases()
+
+
+def small_talk_intent(message: str):
+    """
+    Xabar faqat salomlashish/rahmat so'zlaridan (butun so'z) iborat bo'lsa 'greeting' yoki
+    'thanks', aks holda None. "Salom, uxlay olmayapman" yoki "salomatlik" - None.
+    """
+    tokens = _WORD_RE.findall(normalize_text(message))
+    intents = set()
+    i = 0
+    while i < len(tokens):
+        for phrase, intent in SMALL_TALK_PHRASES:
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                intents.add(intent)
+                i += len(phrase)
+                break
+        else:
+            if tokens[i] not in STOPWORDS and tokens[i] not in SMALL_TALK_FILLER:
+                return None
+            i += 1
+    if not intents:
+        return None
+    return 'thanks' if 'thanks' in intents else 'greeting'
+
+
+def medicine_query(message: str) -> list:
+    """Xabardan dori nomi(lar)ini ajratish: 'Paratsetamol dori bormi?' -> ['Paratsetamol']"""
+    words = re.findall(r"[\w'ʻ’-]+", message)
+    return [
+        word for word in words
+        if len(word) >= 3
+        and normalize_symptoms(word)
+        and not normalize_text(word).startswith(MEDICINE_QUERY_SKIP)
+    ]
+
+
+def _build_intent_matcher():
+    from .views import LOCAL_ANALYSIS_KEYWORDS
+
+    patterns = [(kw, intent, 1) for intent, keywords in INTENT_KEYWORDS.items() for kw in keywords]
+    patterns += [(kw, 'symptoms', 1) for _, keywords in LOCAL_ANALYSIS_KEYWORDS for kw in keywords]
+    patterns += [("og'ri", 'symptoms', 1), ('kasal', 'symptoms', 1)]
+    return KeywordMatcher(patterns)
+
+
+_intent_matcher = None
+
+
+def classify_intent_local(message: str):
+    """
+    Aniq holatlar uchun intent (greeting, thanks, medicine_search), aks holda None.
+    Alomat, shifokor yoki dorixona so'zlari bo'lsa har doim None - bu LLM ishi.
+    medicine_search - faqat xabarda dori nomi bo'lsa ("Dori kerak" - None).
+    """
+    global _intent_matcher
+    if _intent_matcher is None:
+        _intent_matcher = _build_intent_matcher()
+
+    scores = _intent_matcher.scores(message)
+    if not scores or 'symptoms' in scores or 'doctor' in scores or 'pharmacy' in scores:
+        return None
+    if 'medicine_search' in scores:
+        return 'medicine_search' if medicine_query(message) else None
+    return small_talk_intent(message)
+
 
 class HealthAgent:
-    """AI Agent - Google Gemini bilan (retry logic bilan)"""
+    """AI Agent - Google Gemini bilan (model breakerlari bilan)"""
 
     # Modellar ro'yxati - fallback uchun
     MODELS = ['gemini-1.5-flash', 'gemini-2.0-flash-exp', 'gemini-2.0-flash']
 
+    # Tahlil maydonlari qiymatlari (analyze_symptoms va birlashgan chat prompti uchun)
+    ANALYSIS_RULES = """severity: "past", "o'rta", "yuqori", "jiddiy" dan biri
+urgency: "oddiy", "tez", "shoshilinch" dan biri
+recommended_specialization: Terapevt, Kardiolog, Nevrolog, Pediatr, Ginekolog, Dermatolog, Oftalmolog, LOR, Travmatolog, Psixolog dan biri"""
+
     def __init__(self, user=None):
         self.user = user
-        self.current_model_index = 0
-        self.model = self._get_model()
+        # Shu agent qilgan LLM chaqiruvlari soni (o'lchash uchun)
+        self.llm_calls = 0
         self.context = {
             'user_symptoms': '',
             'recommended_specialization': None,
         }
 
-    def _get_model(self):
-        """Joriy modelni olish"""
-        model_name = self.MODELS[self.current_model_index]
-        return genai.GenerativeModel(model_name)
-
-    def _try_next_model(self):
-        """Keyingi modelga o'tish"""
-        if self.current_model_index < len(self.MODELS) - 1:
-            self.current_model_index += 1
-            self.model = self._get_model()
-            return True
-        return False
-
-    def _generate_with_retry(self, prompt: str, max_retries: int = 2) -> str:
-        """Retry logic bilan content generatsiya"""
-        last_error = None
-
-        for _ in range(len(self.MODELS)):
-            for attempt in range(max_retries):
-                try:
-                    response = self.model.generate_content(prompt)
-                    return response.text
-                except Exception as e:
-                    last_error = e
-                    error_str = str(e).lower()
-
-                    # Quota xatosi
-                    if '429' in str(e) or 'quota' in error_str or 'rate' in error_str:
-                        print(f"Gemini quota error: {e}")
-                        time.sleep(1)
-                        break  # Boshqa modelga o'tish
-
-                    print(f"Gemini error (attempt {attempt + 1}): {e}")
-                    time.sleep(0.5)
-
-            # Keyingi modelga o'tish
-            if not self._try_next_model():
-                break
-
-        raise last_error or Exception("Gemini API bilan bog'lanib bo'lmadi")
+    def _generate_with_retry(self, prompt: str) -> str:
+        """Content generatsiya - ochiq breakerli modellar kutmasdan o'tkazib yuboriladi"""
+        self.llm_calls += 1
+        # Bir vaqtdagi bir xil promptlar bitta chaqiruvni baham ko'radi
+        return agent_flight.do(prompt_key(prompt), lambda: model_health.call(
+            self.MODELS,
+            lambda model_name: generate_text(model_name, prompt, 'agent')
+        ))
 
     def _clean_json(self, text: str) -> str:
         """JSON ni tozalash"""
@@ -83,6 +190,12 @@ class HealthAgent:
 
     def analyze_symptoms(self, symptoms: str) -> dict:
         """Alomatlarni tahlil qilish"""
+        cached = agent_cache.get(symptoms)
+        if cached is not None:
+            self.context['user_symptoms'] = symptoms
+            self.context['recommended_specialization'] = cached.get('recommended_specialization')
+            return cached
+
         prompt = f"""Sen tajribali tibbiy AI assistantsan. Quyidagi alomatlarni tahlil qil.
 
 Alomatlar: {symptoms}
@@ -97,16 +210,13 @@ FAQAT quyidagi JSON formatda javob ber, boshqa hech narsa yozma:
     "warning_signs": ["ogohlantirish1"]
 }}
 
-severity: "past", "o'rta", "yuqori", "jiddiy" dan biri
-urgency: "oddiy", "tez", "shoshilinch" dan biri
-recommended_specialization: Terapevt, Kardiolog, Nevrolog, Pediatr, Ginekolog, Dermatolog, Oftalmolog, LOR, Travmatolog, Psixolog dan biri"""
+{self.ANALYSIS_RULES}"""
 
         try:
             response_text = self._generate_with_retry(prompt)
             text = self._clean_json(response_text)
             result = json.loads(text)
-            self.context['user_symptoms'] = symptoms
-            self.context['recommended_specialization'] = result.get('recommended_specialization')
+            self._remember_analysis(symptoms, result)
             return result
         except Exception as e:
             print(f"Analyze error: {e}")
@@ -122,28 +232,8 @@ recommended_specialization: Terapevt, Kardiolog, Nevrolog, Pediatr, Ginekolog, D
     def find_doctors(self, specialization: str = None, limit: int = 5) -> list:
         """Shifokorlarni topish"""
         spec = specialization or self.context.get('recommended_specialization')
-
-        queryset = Doctor.objects.filter(is_available=True)
-
-        if spec:
-            # Faqat name_uz bilan qidirish
-            queryset = queryset.filter(specialization__name_uz__icontains=spec)
-
-        # Agar topilmasa, barcha shifokorlarni qaytarish
-        if not queryset.exists():
-            queryset = Doctor.objects.filter(is_available=True)
-
-        doctors = queryset.order_by('-rating')[:limit]
-
-        return [{
-            'id': d.id,
-            'name': f"{d.user.first_name} {d.user.last_name}",
-            'specialization': d.specialization.name_uz if d.specialization else '',
-            'hospital': d.hospital.name if d.hospital else '',
-            'rating': float(d.rating) if d.rating else 4.5,
-            'experience': d.experience_years or 0,
-            'price': float(d.consultation_price) if d.consultation_price else 150000,
-        } for d in doctors]
+        # Topilmasa - barcha shifokorlar orasidan eng yaxshilari
+        return recommendations.get(spec, limit=limit, fallback_all=True)
 
     def search_medicines(self, query: str) -> list:
         """Dori qidirish"""
@@ -159,18 +249,32 @@ recommended_specialization: Terapevt, Kardiolog, Nevrolog, Pediatr, Ginekolog, D
             'manufacturer': m.manufacturer or '',
         } for m in medicines]
 
-    def process_message(self, user_message: str) -> dict:
-        """Xabarni qayta ishlash"""
+    CHAT_FALLBACK = {
+        "intent": "general_chat",
+        "response": "Sizga qanday yordam bera olaman? Alomatlaringizni ayting yoki shifokor tanlashda yordam beraman.",
+        "action": {"type": "none"},
+        "suggestions": ["Alomatlarim bor", "Shifokor kerak", "Dori qidirish"]
+    }
 
-        prompt = f"""Sen HealthHub UZ AI agentisan. O'zbek tilida javob ber.
+    def _chat_prompt(self, user_message: str) -> str:
+        """Intent, javob va (alomatlar bo'lsa) tahlil - bitta so'rovda"""
+        return f"""Sen HealthHub UZ AI agentisan. O'zbek tilida javob ber.
 
 Foydalanuvchi: {user_message}
 
-FAQAT quyidagi JSON formatda javob ber:
+FAQAT quyidagi JSON formatda javob ber (maydonlar shu tartibda):
 {{
     "intent": "symptoms",
-    "response": "O'zbek tilida iliq javob",
     "action": {{"type": "analyze"}},
+    "response": "O'zbek tilida iliq javob",
+    "analysis": {{
+        "severity": "past",
+        "possible_conditions": ["kasallik1", "kasallik2"],
+        "recommended_specialization": "Terapevt",
+        "urgency": "oddiy",
+        "home_remedies": ["tavsiya1", "tavsiya2"],
+        "warning_signs": ["ogohlantirish1"]
+    }},
     "suggestions": ["taklif1", "taklif2"]
 }}
 
@@ -184,36 +288,97 @@ action.type qiymatlari:
 - "analyze" - alomatlarni tahlil qilish
 - "search_doctors" - shifokor qidirish
 - "search_medicine" - dori qidirish
-- "none" - hech narsa qilmaslik"""
+- "none" - hech narsa qilmaslik
+
+analysis - faqat action.type "analyze" bo'lsa to'ldiriladi, aks holda null.
+{self.ANALYSIS_RULES}"""
+
+    def _remember_analysis(self, symptoms: str, analysis: dict):
+        agent_cache.set(symptoms, analysis)
+        self.context['user_symptoms'] = symptoms
+        self.context['recommended_specialization'] = analysis.get('recommended_specialization')
+
+    def _run_action(self, action, user_message: str, analysis=None):
+        """Action bajarish. Tahlil javobning o'zida kelgan bo'lsa ikkinchi LLM chaqiruvi yo'q"""
+        action_type = (action or {}).get('type', 'none')
+        action_result = None
+
+        if action_type == 'analyze':
+            if isinstance(analysis, dict) and analysis.get('recommended_specialization'):
+                self._remember_analysis(user_message, analysis)
+                action_result = dict(analysis)
+            else:
+                action_result = self.analyze_symptoms(user_message)
+            if action_result and 'error' not in action_result:
+                action_result['recommended_doctors'] = self.find_doctors()
+
+        elif action_type == 'search_doctors':
+            action_result = self.find_doctors()
+
+        elif action_type == 'search_medicine':
+            action_result = self.search_medicines(user_message)
 
+        return action_result
+
+    def _local_message(self, user_message: str):
+        """LLM siz javob (salomlashish, rahmat, dori qidiruvi); mos kelmasa None"""
+        intent = classify_intent_local(user_message)
+        if intent is None:
+            return None
+
+        if intent == 'medicine_search':
+            medicines = []
+            for candidate in medicine_query(user_message):
+                medicines = self.search_medicines(candidate)
+                if medicines:
+                    break
+            return {
+                "intent": intent,
+                "response": (
+                    f"{len(medicines)} ta dori topildi." if medicines
+                    else "Afsuski, bunday dori topilmadi. Nomini tekshirib qayta yozing."
+                ),
+                "action_result": medicines,
+                "suggestions": ["Dorixonalar", "Shifokor kerak"],
+            }
+
+        response, suggestions = LOCAL_REPLIES[intent]
+        return {
+            "intent": intent,
+            "response": response,
+            "action_result": None,
+            "suggestions": suggestions,
+        }
+
+    def _run_action_thread(self, action, user_message: str, analysis=None):
+        """_run_action alohida threadda - o'z DB ulanishini yopadi"""
         try:
-            response_text = self._generate_with_retry(prompt)
-            text = self._clean_json(response_text)
+            return self._run_action(action, user_message, analysis)
+        finally:
+            connection.close()
 
-            try:
-                result = json.loads(text)
-            except:
-                result = {
-                    "intent": "general_chat",
-                    "response": "Sizga qanday yordam bera olaman? Alomatlaringizni ayting yoki shifokor tanlashda yordam beraman.",
-                    "action": {"type": "none"},
-                    "suggestions": ["Alomatlarim bor", "Shifokor kerak", "Dori qidirish"]
-                }
-
-            # Action bajarish
-            action_type = result.get('action', {}).get('type', 'none')
-            action_result = None
-
-            if action_type == 'analyze':
-                action_result = self.analyze_symptoms(user_message)
-                if action_result and 'error' not in action_result:
-                    action_result['recommended_doctors'] = self.find_doctors()
+    def process_message(self, user_message: str) -> dict:
+        """Xabarni qayta ishlash"""
+        try:
+            with meter.request('agent') as metered:
+                local = self._local_message(user_message)
+                if local is not None:
+                    metered.path = 'local'
+                    return {"success": True, **local, "context": self.context, "llm_calls": self.llm_calls}
+
+                response_text = self._generate_with_retry(self._chat_prompt(user_message))
+                if not metered.attempts:
+                    # Bir xil so'rovning natijasi kutildi (single-flight)
+                    metered.path = 'coalesced'
+                text = self._clean_json(response_text)
 
-            elif action_type == 'search_doctors':
-                action_result = self.find_doctors()
+                try:
+                    result = json.loads(text)
+                except:
+                    result = dict(self.CHAT_FALLBACK)
+                    metered.path = 'llm_invalid_json'
 
-            elif action_type == 'search_medicine':
-                action_result = self.search_medicines(user_message)
+            action_result = self._run_action(result.get('action'), user_message, result.get('analysis'))
 
             return {
                 "success": True,
@@ -221,7 +386,8 @@ action.type qiymatlari:
                 "response": result.get('response'),
                 "action_result": action_result,
                 "suggestions": result.get('suggestions', []),
-                "context": self.context
+                "context": self.context,
+                "llm_calls": self.llm_calls
             }
 
         except Exception as e:
@@ -231,4 +397,136 @@ action.type qiymatlari:
                 "error": str(e),
                 "response": "Xatolik yuz berdi. Qayta urinib ko'ring.",
                 "suggestions": ["Qayta urinish"]
-            }
\ No newline at end of file
+            }
+
+    def _stream_with_retry(self, prompt: str):
+        """Tokenlarni kelishi bilan qaytarish. Birinchi tokengacha xato bo'lsa keyingi model"""
+        last_error = None
+        self.llm_calls += 1
+
+        for model_name in model_health.order(self.MODELS):
+            if not model_health.acquire(model_name):
+                continue
+            started = False
+            start_time = time.monotonic()
+            try:
+                with meter.call('gemini', model_name, 'agent_stream') as usage:
+                    for chunk in gemini_model(model_name).generate_content(prompt, stream=True):
+                        usage.from_gemini(chunk)
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            # Bo'sh/bloklangan chunk
+                            continue
+                        if text:
+                            started = True
+                            yield text
+            except GeneratorExit:
+                model_health.release(model_name)
+                raise
+            except Exception as e:
+                model_health.record_failure(model_name, e)
+                if started:
+                    # Javob yarmida uzildi - boshqa model boshidan boshlaydi, bu chalkash bo'ladi
+                    raise
+                last_error = e
+                print(f"Gemini stream error ({model_name}): {e}")
+                continue
+            model_health.record_success(model_name, time.monotonic() - start_time)
+            return
+
+        raise last_error or ModelsUnavailable("Gemini API bilan bog'lanib bo'lmadi")
+
+    def stream_message(self, user_message: str):
+        """
+        Xabarni qayta ishlash - streaming rejimi.
+
+        (event, data) juftliklarini yield qiladi:
+            token          - modeldan kelgan xom matn bo'lagi
+            intent, action, analysis - JSON maydoni to'liq kelishi bilan
+            response_delta - javob matnining yangi qismi
+            response, suggestions
+            action_result  - action bajarilishi bilan (javob oqimi bilan parallel)
+            done           - process_message bilan bir xil yakuniy natija
+            error
+        """
+        with meter.request('agent_stream') as metered:
+            yield from self._stream_events(user_message, metered)
+
+    def _stream_events(self, user_message: str, metered):
+        local = self._local_message(user_message)
+        if local is not None:
+            metered.path = 'local'
+            for key in ('intent', 'response', 'suggestions', 'action_result'):
+                yield key, {key: local[key]}
+            yield 'done', {"success": True, **local, "context": self.context, "llm_calls": self.llm_calls}
+            return
+
+        fields = StreamingJSONFields(
+            string_keys=('intent', 'response'),
+            list_keys=('suggestions',),
+            object_keys=('action', 'analysis'),
+            stream_key='response',
+        )
+        buffer = ''
+        action_future = None
+        action_sent = False
+        executor = _get_action_executor()
+
+        try:
+            for chunk in self._stream_with_retry(self._chat_prompt(user_message)):
+                buffer += chunk
+                yield 'token', {'text': chunk}
+                for event, data in fields.feed(buffer):
+                    yield event, data
+                    action = fields.emitted.get('action')
+                    if action_future is None and action is not None:
+                        # Action javob matni oqimi bilan parallel bajariladi; "analyze" tahlil maydonini kutadi
+                        if (action or {}).get('type') != 'analyze':
+                            action_future = executor.submit(self._run_action_thread, action, user_message)
+                        elif 'analysis' in fields.emitted:
+                            action_future = executor.submit(
+                                self._run_action_thread, action, user_message, fields.emitted['analysis']
+                            )
+                if action_future is not None and not action_sent and action_future.done():
+                    yield 'action_result', {'action_result': action_future.result()}
+                    action_sent = True
+
+            try:
+                result = json.loads(self._clean_json(buffer))
+            except ValueError:
+                result = fields.emitted or dict(self.CHAT_FALLBACK)
+                metered.path = 'llm_invalid_json'
+
+            # Oqimda ajratib bo'lmagan maydonlar
+            for key in ('intent', 'response', 'suggestions'):
+                if key not in fields.emitted and key in result:
+                    yield key, {key: result[key]}
+
+            if action_future is None:
+                action_future = executor.submit(
+                    self._run_action_thread, result.get('action'), user_message, result.get('analysis')
+                )
+            action_result = action_future.result()
+            if not action_sent:
+                yield 'action_result', {'action_result': action_result}
+
+            yield 'done', {
+                "success": True,
+                "intent": result.get('intent'),
+                "response": result.get('response'),
+                "action_result": action_result,
+                "suggestions": result.get('suggestions', []),
+                "context": self.context,
+                "llm_calls": self.llm_calls
+            }
+
+        except Exception as e:
+            metered.path = 'error'
+            print(f"Stream error: {e}")
+            yield 'error', {
+                "success": False,
+                "error": str(e),
+                "response": "Xatolik yuz berdi. Qayta urinib ko'ring.",
+                "suggestions": ["Qayta urinish"]
+            }
@@ -2,6 +2,8 @@
 import anthropic
 from django.conf import settings
 import json
+from .response_cache import claude_cache
+from .metering import meter
 
 
 class HealthAI:
@@ -19,10 +21,23 @@ class HealthAI:
         """
         AI-powered symptom analysis
         """
+        with meter.request('claude') as metered:
+            return self._analyze(symptoms, age, gender, medical_history, metered)
+
+    def _analyze(self, symptoms, age, gender, medical_history, metered):
         if not self.client:
             # Fallback to rule-based system
+            metered.path = 'local'
             return self._fallback_analysis(symptoms, age, gender)
 
+        # Tibbiy tarix bo'lsa javob shaxsiy - cache ishlatilmaydi
+        personalized = bool(medical_history)
+        cached = claude_cache.get(symptoms, age, gender, personalized=personalized)
+        if cached is not None:
+            metered.path = 'cache'
+            return cached
+
+        history = medical_history or "Yo'q"
         prompt = f"""
         Siz O'zbekiston tibbiyot ekspertisiz. Bemorning ma'lumotlarini tahlil qiling:
 
@@ -30,7 +45,7 @@ class HealthAI:
         - Yosh: {age}
         - Jins: {'Erkak' if gender == 'male' else 'Ayol'}
         - Alomatlar: {symptoms}
-        - Tibbiy tarix: {medical_history or 'Yo\'q'}
+        - Tibbiy tarix: {history}
 
         QUYIDAGILARNI TAHLIL QILING:
 
@@ -87,14 +102,17 @@ class HealthAI:
         }}
         """
 
+        model = "claude-sonnet-4-20250514"
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=2000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            with meter.call('anthropic', model, 'claude') as usage:
+                response = self.client.messages.create(
+                    model=model,
+                    max_tokens=2000,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+                usage.from_anthropic(response)
 
             result = json.loads(response.content[0].text)
 
@@ -110,10 +128,12 @@ class HealthAI:
                 result['urgency']['category'] = 'routine'
                 result['urgency']['color'] = 'green'
 
+            claude_cache.set(symptoms, result, age, gender, personalized=personalized)
             return result
 
         except Exception as e:
             print(f"AI Error: {e}")
+            metered.path = 'local_fallback'
             return self._fallback_analysis(symptoms, age, gender)
 
     def _fallback_analysis(self, symptoms: str, age: int, gender: str) -> dict:
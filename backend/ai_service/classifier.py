@@ -0,0 +1,225 @@
+# ai_service/classifier.py
+"""
+Lokal alomat klassifikatori - saqlangan tekshiruvlardan o'qitiladi (faqat NumPy).
+
+Matn -> TF-IDF (tokenlar + 4 harfli o'zaklar) -> ikkita multinomial Naive Bayes:
+    specialization - tavsiya etiladigan mutaxassis kaliti (terapevt, kardiolog, ...)
+    urgency        - past / o'rta / yuqori / jiddiy
+
+Ishonchli javoblar (ikkala bosh ham MIN_CONFIDENCE dan yuqori) LLM siz qaytariladi,
+qolganlari LLM ga yuboriladi. O'qitish: python manage.py train_symptom_classifier
+"""
+import json
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .response_cache import normalize_symptoms, normalize_text
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_SETTINGS = getattr(settings, 'SYMPTOM_CLASSIFIER', {})
+MODEL_PATH = str(CLASSIFIER_SETTINGS.get('PATH', os.path.join(settings.BASE_DIR, 'ml_models', 'symptom_classifier.npz')))
+MIN_CONFIDENCE = CLASSIFIER_SETTINGS.get('MIN_CONFIDENCE', 0.85)
+STEM_LENGTH = 4
+
+HEADS = ('specialization', 'urgency')
+
+# SymptomCheck.ai_response['urgency_level'] -> AIConsultation.urgency_level shkalasi
+URGENCY_ALIASES = {
+    'low': 'past', 'normal': "o'rta", 'high': 'yuqori', 'emergency': 'jiddiy',
+    'past': 'past', "o'rta": "o'rta", 'orta': "o'rta", 'yuqori': 'yuqori', 'jiddiy': 'jiddiy',
+}
+SPECIALIZATION_ALIASES = {'tez': 'terapevt', 'umumiy': 'terapevt'}
+
+
+def specialization_key(name):
+    """'Ortoped yoki Revmatolog' -> 'ortoped', 'Tez yordam' -> 'terapevt'"""
+    words = normalize_text(name).split()
+    if not words:
+        return None
+    return SPECIALIZATION_ALIASES.get(words[0], words[0])
+
+
+def urgency_key(value):
+    return URGENCY_ALIASES.get((value or '').strip().lower())
+
+
+def features(text):
+    """Tokenlar va ularning o'zaklari (boshim -> bosh)"""
+    tokens = normalize_symptoms(text)
+    stems = {f'~{t[:STEM_LENGTH]}' for t in tokens if len(t) > STEM_LENGTH}
+    return tokens + sorted(stems)
+
+
+class NaiveBayesHead:
+    """Bitta bosh: TF-IDF og'irlikli multinomial NB"""
+
+    def __init__(self, classes, class_log_prior, feature_log_prob):
+        self.classes = list(classes)
+        self.class_log_prior = class_log_prior
+        self.feature_log_prob = feature_log_prob
+
+    @classmethod
+    def fit(cls, docs, labels, vocab_size, alpha=1.0):
+        """docs: [(indekslar, og'irliklar), ...]"""
+        classes = sorted(set(labels))
+        class_index = {c: i for i, c in enumerate(classes)}
+        sums = np.zeros((len(classes), vocab_size), dtype=np.float64)
+        counts = np.zeros(len(classes), dtype=np.float64)
+        for (indices, weights), label in zip(docs, labels):
+            row = class_index[label]
+            np.add.at(sums[row], indices, weights)
+            counts[row] += 1
+
+        smoothed = sums + alpha
+        feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        class_log_prior = np.log(counts / counts.sum())
+        return cls(classes, class_log_prior, feature_log_prob)
+
+    def predict_proba(self, indices, weights):
+        scores = self.class_log_prior + self.feature_log_prob[:, indices] @ weights
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, indices, weights):
+        proba = self.predict_proba(indices, weights)
+        best = int(proba.argmax())
+        return self.classes[best], float(proba[best])
+
+
+class SymptomClassifier:
+    def __init__(self, vocabulary, idf, heads):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.heads = heads
+
+    @classmethod
+    def fit(cls, texts, labels, alpha=1.0, min_df=1):
+        """labels: {'specialization': [...], 'urgency': [...]} - None yorliqli misollar o'tkazib yuboriladi"""
+        doc_features = [features(text) for text in texts]
+
+        df = {}
+        for feats in doc_features:
+            for feat in set(feats):
+                df[feat] = df.get(feat, 0) + 1
+        vocabulary = {feat: i for i, feat in enumerate(sorted(f for f, n in df.items() if n >= min_df))}
+        n_docs = len(doc_features)
+        idf = np.ones(len(vocabulary), dtype=np.float64)
+        for feat, i in vocabulary.items():
+            idf[i] = math.log((1 + n_docs) / (1 + df[feat])) + 1
+
+        model = cls(vocabulary, idf, {})
+        docs = [model._vectorize(feats) for feats in doc_features]
+        for head in HEADS:
+            pairs = [(doc, label) for doc, label in zip(docs, labels[head]) if label and len(doc[0])]
+            if pairs:
+                head_docs, head_labels = zip(*pairs)
+                model.heads[head] = NaiveBayesHead.fit(head_docs, head_labels, len(vocabulary), alpha)
+        return model
+
+    def _vectorize(self, feats):
+        """Xususiyatlar -> (indekslar, L2 normallashtirilgan tf-idf og'irliklar)"""
+        counts = {}
+        for feat in feats:
+            index = self.vocabulary.get(feat)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        if not counts:
+            return np.zeros(0, dtype=np.intp), np.zeros(0)
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        weights = (1 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * self.idf[indices]
+        return indices, weights / np.linalg.norm(weights)
+
+    def predict(self, text):
+        """
+        {'specialization': (yorliq, ehtimollik), 'urgency': (...)}
+        Matnda tanish so'z bo'lmasa - bo'sh dict.
+        """
+        indices, weights = self._vectorize(features(text))
+        if not len(indices):
+            return {}
+        return {name: head.predict(indices, weights) for name, head in self.heads.items()}
+
+    def confident(self, text, min_confidence=MIN_CONFIDENCE):
+        """Ikkala bosh ham ishonchli bo'lsa bashorat, aks holda None (LLM ga yuborish)"""
+        prediction = self.predict(text)
+        if len(prediction) < len(HEADS):
+            return None
+        if any(probability < min_confidence for _, probability in prediction.values()):
+            return None
+        return prediction
+
+    def save(self, path=MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {'idf': self.idf}
+        meta = {'vocabulary': self.vocabulary, 'heads': {}}
+        for name, head in self.heads.items():
+            arrays[f'{name}_prior'] = head.class_log_prior
+            arrays[f'{name}_log_prob'] = head.feature_log_prob
+            meta['heads'][name] = head.classes
+        arrays['meta'] = np.array(json.dumps(meta, ensure_ascii=False))
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            heads = {
+                name: NaiveBayesHead(classes, data[f'{name}_prior'], data[f'{name}_log_prob'])
+                for name, classes in meta['heads'].items()
+            }
+            return cls(meta['vocabulary'], data['idf'], heads)
+
+
+_model = None
+_model_mtime = None
+_model_lock = threading.Lock()
+
+
+def get_classifier():
+    """Saqlangan model (fayl yangilansa qayta yuklanadi); model yo'q bo'lsa None"""
+    global _model, _model_mtime
+    try:
+        mtime = os.path.getmtime(MODEL_PATH)
+    except OSError:
+        return None
+    with _model_lock:
+        if _model is None or mtime != _model_mtime:
+            try:
+                _model = SymptomClassifier.load(MODEL_PATH)
+                _model_mtime = mtime
+            except Exception as e:
+                logger.warning(f"Symptom classifier load error: {e}")
+                return None
+        return _model
+
+
+def training_examples():
+    """
+    Bazadagi tarixiy tekshiruvlar -> (matnlar, yorliqlar).
+    AIConsultation - LLM javobi, SymptomCheck - lokal tahlil javobi.
+    """
+    from .models import AIConsultation, SymptomCheck
+
+    texts = []
+    labels = {head: [] for head in HEADS}
+
+    rows = AIConsultation.objects.values_list('symptoms', 'recommended_specialist', 'urgency_level')
+    for symptoms, specialist, urgency in rows.iterator():
+        texts.append(symptoms)
+        labels['specialization'].append(specialization_key(specialist))
+        labels['urgency'].append(urgency_key(urgency))
+
+    for symptoms, response in SymptomCheck.objects.values_list('symptoms', 'ai_response').iterator():
+        response = response or {}
+        specs = response.get('recommended_specializations') or []
+        texts.append(symptoms)
+        labels['specialization'].append(specialization_key(specs[0].get('name')) if specs else None)
+        labels['urgency'].append(urgency_key(response.get('urgency_level')))
+
+    return texts, labels
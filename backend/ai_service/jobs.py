@@ -0,0 +1,150 @@
+# ai_service/jobs.py
+"""
+AI tahlilni fon rejimida bajarish.
+
+POST so'rov vazifani navbatga qo'yadi va darhol job id qaytaradi, tahlil esa
+jarayon ichidagi thread pool da bajariladi. Natija bazada (AIAnalysisJob)
+saqlanadi - shuning uchun polling/SSE so'rovi boshqa workerga tushsa ham ishlaydi.
+Jarayon qayta ishga tushsa (deploy) navbatdagi vazifalar yo'qoladi - STALE_AFTER dan
+uzoq pending/running vazifa holat o'qilganda failed deb belgilanadi (expire_stale).
+
+Backpressure:
+    - QUEUE_LIMIT: jarayonda bajarilmagan vazifalar soni cheklangan (oshsa QueueFull)
+    - MAX_CONCURRENT_LLM: bir vaqtda nechta LLM chaqiruvi (llm_slot)
+"""
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+JOB_SETTINGS = getattr(settings, 'AI_JOB_SETTINGS', {})
+WORKERS = JOB_SETTINGS.get('WORKERS', 4)
+QUEUE_LIMIT = JOB_SETTINGS.get('QUEUE_LIMIT', 20)
+MAX_CONCURRENT_LLM = JOB_SETTINGS.get('MAX_CONCURRENT_LLM', 2)
+LLM_SLOT_TIMEOUT = JOB_SETTINGS.get('LLM_SLOT_TIMEOUT', 5)
+STALE_AFTER = JOB_SETTINGS.get('STALE_AFTER', 300)
+STALE_ERROR = "Vazifa bajarilmadi (server qayta ishga tushdi). Qayta urinib ko'ring."
+
+
+class QueueFull(Exception):
+    """Navbat to'lgan - yangi vazifa qabul qilinmaydi"""
+
+
+class LLMBusy(Exception):
+    """Bo'sh LLM slot kutish vaqti tugadi"""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending_lock = threading.Lock()
+_pending = 0
+_llm_slots = threading.BoundedSemaphore(MAX_CONCURRENT_LLM)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='ai-job')
+        return _executor
+
+
+@contextmanager
+def llm_slot(timeout=LLM_SLOT_TIMEOUT):
+    """Bir vaqtdagi LLM chaqiruvlarini cheklash; slot bo'lmasa LLMBusy"""
+    if not _llm_slots.acquire(timeout=timeout):
+        raise LLMBusy("Barcha LLM slotlari band")
+    try:
+        yield
+    finally:
+        _llm_slots.release()
+
+
+def submit(symptoms, user_id, func, *args):
+    """
+    Vazifani navbatga qo'yish. func(*args) natijasi (dict) job.result ga yoziladi.
+    Returns: AIAnalysisJob
+    """
+    global _pending
+    from .models import AIAnalysisJob
+
+    with _pending_lock:
+        if _pending >= QUEUE_LIMIT:
+            raise QueueFull(f"Navbatda {_pending} ta vazifa bor")
+        _pending += 1
+
+    try:
+        job = AIAnalysisJob.objects.create(user_id=user_id, symptoms=symptoms)
+        _get_executor().submit(_run, job.pk, func, args)
+    except Exception:
+        with _pending_lock:
+            _pending -= 1
+        raise
+    return job
+
+
+def _run(job_id, func, args):
+    global _pending
+    from .models import AIAnalysisJob
+
+    try:
+        AIAnalysisJob.objects.filter(pk=job_id).update(status='running', started_at=timezone.now())
+        result = func(*args)
+        AIAnalysisJob.objects.filter(pk=job_id).update(
+            status='done', result=result, finished_at=timezone.now()
+        )
+    except Exception as e:
+        logger.exception(f"AI job {job_id} failed")
+        AIAnalysisJob.objects.filter(pk=job_id).update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+    finally:
+        with _pending_lock:
+            _pending -= 1
+        close_old_connections()
+
+
+def is_stale(job):
+    """Tugamagan va STALE_AFTER dan eski - bajaruvchi jarayon yo'q"""
+    return not job.is_finished and timezone.now() - job.created_at > datetime.timedelta(seconds=STALE_AFTER)
+
+
+def _stale_jobs(job):
+    from .models import AIAnalysisJob
+
+    return AIAnalysisJob.objects.filter(pk=job.pk, status__in=('pending', 'running'))
+
+
+def expire_stale(job):
+    """Eskirgan vazifani failed qilish (boshqa jarayon shu orada tugatgan bo'lsa o'zgarmaydi)"""
+    if is_stale(job):
+        _stale_jobs(job).update(status='failed', error=STALE_ERROR, finished_at=timezone.now())
+        job.refresh_from_db()
+    return job
+
+
+async def aexpire_stale(job):
+    """expire_stale - async view lar uchun"""
+    if is_stale(job):
+        await _stale_jobs(job).aupdate(status='failed', error=STALE_ERROR, finished_at=timezone.now())
+        await job.arefresh_from_db()
+    return job
+
+
+def stats():
+    """Joriy jarayon navbati holati"""
+    with _pending_lock:
+        pending = _pending
+    return {
+        'pending': pending,
+        'queue_limit': QUEUE_LIMIT,
+        'workers': WORKERS,
+        'max_concurrent_llm': MAX_CONCURRENT_LLM,
+    }
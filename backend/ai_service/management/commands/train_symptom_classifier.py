@@ -0,0 +1,120 @@
+# ai_service/management/commands/train_symptom_classifier.py
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_service.classifier import (
+    HEADS, MIN_CONFIDENCE, MODEL_PATH, SymptomClassifier, specialization_key,
+    training_examples, urgency_key,
+)
+
+
+class Command(BaseCommand):
+    help = "Lokal alomat klassifikatorini tarixiy tekshiruvlardan o'qitish (aniqlik va tezlik hisoboti bilan)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test-size', type=float, default=0.2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--alpha', type=float, default=0.1)
+        parser.add_argument('--min-df', type=int, default=1)
+        parser.add_argument('--min-confidence', type=float, default=MIN_CONFIDENCE)
+        parser.add_argument('--min-examples', type=int, default=20)
+        parser.add_argument('--include-rules', action='store_true',
+                            help="SYMPTOM_CONDITION_MAP kalitlarini ham misol sifatida qo'shish")
+        parser.add_argument('--dry-run', action='store_true', help='Faqat hisobot, model saqlanmaydi')
+
+    def handle(self, *args, **options):
+        texts, labels = training_examples()
+        if options['include_rules']:
+            self._add_rule_examples(texts, labels)
+
+        if len(texts) < options['min_examples']:
+            raise CommandError(f"O'qitish uchun misollar yetarli emas: {len(texts)} < {options['min_examples']}")
+
+        order = list(range(len(texts)))
+        random.Random(options['seed']).shuffle(order)
+        n_test = max(1, int(len(order) * options['test_size']))
+        test_idx, train_idx = order[:n_test], order[n_test:]
+
+        def subset(indices):
+            return [texts[i] for i in indices], {h: [labels[h][i] for i in indices] for h in HEADS}
+
+        train_texts, train_labels = subset(train_idx)
+        test_texts, test_labels = subset(test_idx)
+
+        self.stdout.write(f'Misollar: {len(texts)} (train {len(train_texts)}, test {len(test_texts)})')
+        started = time.perf_counter()
+        model = SymptomClassifier.fit(train_texts, train_labels, alpha=options['alpha'], min_df=options['min_df'])
+        self.stdout.write(
+            f"O'qitish: {(time.perf_counter() - started) * 1000:.0f} ms, lug'at {len(model.vocabulary)} ta xususiyat"
+        )
+
+        self._report(model, test_texts, test_labels, train_labels, options['min_confidence'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('--dry-run: model saqlanmadi'))
+            return
+
+        # Yakuniy model barcha misollarda
+        final = SymptomClassifier.fit(texts, labels, alpha=options['alpha'], min_df=options['min_df'])
+        final.save(MODEL_PATH)
+        self.stdout.write(self.style.SUCCESS(f'Model saqlandi: {MODEL_PATH}'))
+
+    def _add_rule_examples(self, texts, labels):
+        from ai_service.views import SYMPTOM_CONDITION_MAP
+
+        for key, data in SYMPTOM_CONDITION_MAP.items():
+            texts.append(key)
+            labels['specialization'].append(specialization_key(data['specializations'][0]))
+            labels['urgency'].append(urgency_key(data['urgency']))
+
+    def _report(self, model, texts, labels, train_labels, min_confidence):
+        timings = []
+        predictions = []
+        for text in texts:
+            started = time.perf_counter()
+            predictions.append(model.predict(text))
+            timings.append(time.perf_counter() - started)
+
+        for head in HEADS:
+            pairs = [
+                (prediction.get(head), expected)
+                for prediction, expected in zip(predictions, labels[head]) if expected
+            ]
+            if not pairs:
+                continue
+            correct = sum(1 for predicted, expected in pairs if predicted and predicted[0] == expected)
+            confident = [(p, e) for p, e in pairs if p and p[1] >= min_confidence]
+            confident_correct = sum(1 for p, e in confident if p[0] == e)
+            known = [label for label in train_labels[head] if label]
+            majority = max(set(known), key=known.count) if known else None
+            baseline = sum(1 for _, e in pairs if e == majority)
+
+            self.stdout.write(f'\n[{head}]')
+            self.stdout.write(f'  aniqlik:          {correct / len(pairs):.1%} ({correct}/{len(pairs)})')
+            self.stdout.write(f'  baseline ({majority}): {baseline / len(pairs):.1%}')
+            self.stdout.write(
+                f'  ishonchli >= {min_confidence}: qamrov {len(confident) / len(pairs):.1%}, '
+                f'aniqlik {confident_correct / len(confident):.1%}' if confident else
+                f'  ishonchli >= {min_confidence}: qamrov 0%'
+            )
+
+        # Ikkala bosh ham ishonchli - LLM siz javob beriladigan ulush
+        local = correct_local = 0
+        for prediction, spec, urgency in zip(predictions, labels['specialization'], labels['urgency']):
+            if len(prediction) == len(HEADS) and all(p >= min_confidence for _, p in prediction.values()):
+                local += 1
+                if prediction['specialization'][0] == spec and prediction['urgency'][0] == urgency:
+                    correct_local += 1
+        self.stdout.write(
+            f'\nLokal javob (LLM siz): {local / len(texts):.1%}'
+            + (f', ikkala bosh to\'g\'ri {correct_local / local:.1%}' if local else '')
+        )
+
+        timings = np.array(timings) * 1e6
+        self.stdout.write(
+            f'Bashorat tezligi: o\'rtacha {timings.mean():.0f} µs, '
+            f'p50 {np.percentile(timings, 50):.0f} µs, p99 {np.percentile(timings, 99):.0f} µs'
+        )
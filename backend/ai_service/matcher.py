@@ -0,0 +1,102 @@
+# ai_service/matcher.py
+"""
+Ko'p kalit so'zli qidiruv - Aho-Corasick avtomati.
+
+Barcha kalit so'zlar bir marta (import paytida) avtomatga kompilyatsiya qilinadi,
+matn esa bitta chiziqli o'tishda barcha kalitlarga tekshiriladi - kalitlar soniga
+bog'liq emas. Matn va kalitlar bir xil normallashtiriladi (kichik harf, kirill ->
+lotin, apostrofsiz), shuning uchun "og'rig'i", "ogʻrigʻi" va "огриги" bir xil.
+
+Moslik faqat so'z boshidan boshlanadi ("ich" -> "ich ketishi", lekin "qichish" emas),
+kalit o'zi esa o'zak bo'lishi mumkin ("shamolla" -> "shamollash").
+"""
+from collections import deque
+
+from .response_cache import normalize_text
+
+
+def _is_word_char(char):
+    return char.isalnum()
+
+
+class KeywordMatcher:
+    """
+    patterns: [(kalit, payload, og'irlik), ...]
+    Bitta payload ga bir nechta kalit bog'lanishi mumkin (masalan, kategoriya).
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._patterns = []
+
+        for keyword, payload, weight in patterns:
+            keyword = normalize_text(keyword).strip()
+            if keyword:
+                self._add(keyword, len(self._patterns))
+                self._patterns.append((payload, weight, len(keyword)))
+        self._build()
+
+    @property
+    def size(self):
+        return len(self._patterns)
+
+    def _add(self, keyword, pattern_id):
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(pattern_id)
+
+    def _build(self):
+        """Fail havolalari (BFS). Chiqishlar fail zanjiri bo'yicha birlashtiriladi"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _scan(self, text):
+        """(pattern_id, boshlanish) - normallashtirilgan matn bo'yicha bitta o'tish"""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern_id in out[node]:
+                start = i - patterns[pattern_id][2] + 1
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    yield pattern_id, start
+
+    def find(self, text):
+        """Matndagi barcha mosliklar: [(payload, og'irlik, boshlanish), ...]"""
+        return [
+            (self._patterns[pattern_id][0], self._patterns[pattern_id][1], start)
+            for pattern_id, start in self._scan(normalize_text(text))
+        ]
+
+    def scores(self, text):
+        """payload -> og'irliklar yig'indisi (bir kalit matnda necha marta bo'lsa ham bir marta)"""
+        seen = set()
+        totals = {}
+        for pattern_id, _ in self._scan(normalize_text(text)):
+            if pattern_id in seen:
+                continue
+            seen.add(pattern_id)
+            payload, weight, _ = self._patterns[pattern_id]
+            totals[payload] = totals.get(payload, 0) + weight
+        return totals
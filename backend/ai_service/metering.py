@@ -0,0 +1,374 @@
+# ai_service/metering.py
+"""
+LLM chaqiruvlari metrikasi - kechikish histogrammasi, qayta urinishlar, javob yo'li,
+tokenlar va taxminiy narx.
+
+Ikki daraja:
+    meter.call(provider, model, operation)  - bitta model chaqiruvi (success/error/quota)
+    meter.request(operation)                - bitta foydalanuvchi so'rovi; req.path
+                                              javob qayerdan kelganini bildiradi
+                                              (llm/cache/classifier/local/coalesced/...)
+So'rov ichidagi model chaqiruvlari (thread bo'yicha) urinishlar sifatida sanaladi -
+birinchisidan keyingilari retry.
+
+Agregatlar jarayon xotirasida yig'iladi va FLUSH_INTERVAL da bir marta LLMUsageStat
+jadvaliga (soatlik bucket) qo'shiladi - barcha workerlar bitta jadvalga yozadi.
+RETENTION_DAYS dan eski soatlik qatorlar beat (compact) orqali har kalit uchun bitta
+jami qatorga (bucket=TOTALS_BUCKET) yig'iladi - jadval chegaralangan, counterlar kamaymaydi.
+/metrics jadvaldan Prometheus matn formatini quradi.
+"""
+import datetime
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .model_health import gemini_model, is_quota_error
+
+logger = logging.getLogger(__name__)
+
+METERING_SETTINGS = getattr(settings, 'LLM_METERING', {})
+FLUSH_INTERVAL = METERING_SETTINGS.get('FLUSH_INTERVAL', 30)
+LATENCY_BUCKETS = tuple(METERING_SETTINGS.get('LATENCY_BUCKETS', (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)))
+PRICING = METERING_SETTINGS.get('PRICING', {})
+RETENTION_DAYS = METERING_SETTINGS.get('RETENTION_DAYS', 7)
+TOTALS_BUCKET = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    """USD - PRICING da model bo'lmasa 0"""
+    input_price, output_price = PRICING.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class CallUsage:
+    """Model javobidagi token soni (provayderga qarab)"""
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def from_gemini(self, response):
+        # Streamingda har bir chunk da bo'lishi mumkin - oxirgisi to'liq son
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            self.input_tokens = getattr(usage, 'prompt_token_count', 0) or self.input_tokens
+            self.output_tokens = getattr(usage, 'candidates_token_count', 0) or self.output_tokens
+
+    def from_anthropic(self, response):
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self.input_tokens = getattr(usage, 'input_tokens', 0) or 0
+            self.output_tokens = getattr(usage, 'output_tokens', 0) or 0
+
+
+class _Aggregate:
+    __slots__ = ('count', 'retries', 'input_tokens', 'output_tokens', 'cost', 'latency_sum', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.retries = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, latency, retries=0, input_tokens=0, output_tokens=0, cost=0.0):
+        self.count += 1
+        self.retries += retries
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost += cost
+        self.latency_sum += latency
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.retries += other.retries
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cost += other.cost
+        self.latency_sum += other.latency_sum
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def add_stat(self, stat):
+        """LLMUsageStat qatorini qo'shish"""
+        self.count += stat.count
+        self.retries += stat.retries
+        self.input_tokens += stat.input_tokens
+        self.output_tokens += stat.output_tokens
+        self.cost += stat.cost_usd
+        self.latency_sum += stat.latency_sum
+        for index, count in enumerate((stat.latency_buckets or [])[:len(self.buckets)]):
+            self.buckets[index] += count
+
+    def save_into(self, stat):
+        """Agregatni LLMUsageStat qatoriga qo'shib saqlash"""
+        buckets = list(stat.latency_buckets or [])
+        buckets += [0] * (len(self.buckets) - len(buckets))
+        for index, count in enumerate(self.buckets):
+            buckets[index] += count
+        stat.latency_buckets = buckets
+        stat.count += self.count
+        stat.retries += self.retries
+        stat.input_tokens += self.input_tokens
+        stat.output_tokens += self.output_tokens
+        stat.cost_usd += self.cost
+        stat.latency_sum += self.latency_sum
+        stat.save()
+
+
+class _Request:
+    def __init__(self, operation, path):
+        self.operation = operation
+        self.path = path
+        self.attempts = 0
+
+
+class LLMMeter:
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_flush = time.monotonic()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _observe(self, kind, provider, model, operation, outcome, latency, **values):
+        bucket = timezone.now().replace(minute=0, second=0, microsecond=0)
+        key = (bucket, kind, provider, model, operation, outcome)
+        with self._lock:
+            aggregate = self._pending.get(key)
+            if aggregate is None:
+                aggregate = self._pending[key] = _Aggregate()
+            aggregate.observe(latency, **values)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    @contextmanager
+    def call(self, provider, model, operation):
+        """Bitta model chaqiruvi; blok ichida usage.from_gemini()/from_anthropic() chaqiriladi"""
+        usage = CallUsage()
+        stack = self._stack()
+        if stack:
+            stack[-1].attempts += 1
+        started = time.monotonic()
+        outcome = 'success'
+        try:
+            yield usage
+        except GeneratorExit:
+            # Mijoz oqimni uzdi
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            outcome = 'quota' if is_quota_error(e) else 'error'
+            raise
+        finally:
+            self._observe(
+                'call', provider, model, operation, outcome, time.monotonic() - started,
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                cost=estimate_cost(model, usage.input_tokens, usage.output_tokens),
+            )
+
+    @contextmanager
+    def request(self, operation, path='llm'):
+        """Foydalanuvchi so'rovi; javob yo'li req.path ga yoziladi"""
+        request = _Request(operation, path)
+        stack = self._stack()
+        stack.append(request)
+        started = time.monotonic()
+        try:
+            yield request
+        except GeneratorExit:
+            request.path = 'cancelled'
+            raise
+        except Exception:
+            request.path = 'error'
+            raise
+        finally:
+            # Generator (SSE) boshqa threadda yopilishi mumkin - aynan shu yozuv olib tashlanadi
+            if request in stack:
+                stack.remove(request)
+            self._observe(
+                'request', '', '', operation, request.path, time.monotonic() - started,
+                retries=max(0, request.attempts - 1),
+            )
+
+    def flush(self):
+        """Jarayon agregatlarini LLMUsageStat ga qo'shish; xato bo'lsa keyingi safarga qoldiriladi"""
+        from .models import LLMUsageStat
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            with transaction.atomic():
+                for (bucket, kind, provider, model, operation, outcome), aggregate in pending.items():
+                    stat, _ = LLMUsageStat.objects.select_for_update().get_or_create(
+                        bucket=bucket, kind=kind, provider=provider, model=model,
+                        operation=operation, outcome=outcome,
+                    )
+                    aggregate.save_into(stat)
+        except Exception as e:
+            logger.warning(f"LLM metering flush error: {e}")
+            with self._lock:
+                for key, aggregate in pending.items():
+                    current = self._pending.get(key)
+                    if current is None:
+                        self._pending[key] = aggregate
+                    else:
+                        current.merge(aggregate)
+            return 0
+        return len(pending)
+
+
+meter = LLMMeter()
+
+
+def compact(days=None):
+    """
+    `days` (default RETENTION_DAYS) dan eski soatlik qatorlarni har kalit uchun bitta jami
+    qatorga (bucket=TOTALS_BUCKET) qo'shib o'chirish. Yig'indilar o'zgarmaydi - /metrics
+    counterlari kamaymaydi, jadval esa RETENTION_DAYS x 24 soat x kalitlar bilan chegaralanadi.
+    """
+    from .models import LLMUsageStat
+
+    cutoff = timezone.now() - datetime.timedelta(days=RETENTION_DAYS if days is None else days)
+    with transaction.atomic():
+        old = LLMUsageStat.objects.select_for_update().filter(bucket__gt=TOTALS_BUCKET, bucket__lt=cutoff)
+        totals = {}
+        compacted = 0
+        for stat in old:
+            key = (stat.kind, stat.provider, stat.model, stat.operation, stat.outcome)
+            aggregate = totals.get(key)
+            if aggregate is None:
+                aggregate = totals[key] = _Aggregate()
+            aggregate.add_stat(stat)
+            compacted += 1
+        if not compacted:
+            return 0
+        for (kind, provider, model, operation, outcome), aggregate in totals.items():
+            stat, _ = LLMUsageStat.objects.select_for_update().get_or_create(
+                bucket=TOTALS_BUCKET, kind=kind, provider=provider, model=model,
+                operation=operation, outcome=outcome,
+            )
+            aggregate.save_into(stat)
+        old.delete()
+    return compacted
+
+
+def generate_text(model_name, prompt, operation):
+    """Gemini generate_content - o'lchov bilan, javob matni qaytariladi"""
+    with meter.call('gemini', model_name, operation) as usage:
+        response = gemini_model(model_name).generate_content(prompt)
+        usage.from_gemini(response)
+        return response.text
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, labels, buckets, total, latency_sum):
+    cumulative = 0
+    for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {latency_sum:.6f}')
+    lines.append(f'{name}_count{_labels(**labels)} {total}')
+
+
+def render_prometheus():
+    """LLMUsageStat (barcha bucketlar yig'indisi) -> Prometheus text format 0.0.4"""
+    from .models import LLMUsageStat
+
+    calls, requests = {}, {}
+    for stat in LLMUsageStat.objects.all().iterator():
+        if stat.kind == 'call':
+            key = (stat.provider, stat.model, stat.operation, stat.outcome)
+            target = calls
+        else:
+            key = (stat.operation, stat.outcome)
+            target = requests
+        aggregate = target.get(key)
+        if aggregate is None:
+            aggregate = target[key] = _Aggregate()
+        aggregate.add_stat(stat)
+
+    lines = [
+        '# HELP healthhub_llm_calls_total LLM model calls by outcome.',
+        '# TYPE healthhub_llm_calls_total counter',
+    ]
+    for (provider, model, operation, outcome), a in sorted(calls.items()):
+        lines.append(f'healthhub_llm_calls_total{_labels(provider=provider, model=model, operation=operation, outcome=outcome)} {a.count}')
+
+    lines += [
+        '# HELP healthhub_llm_call_duration_seconds LLM model call latency.',
+        '# TYPE healthhub_llm_call_duration_seconds histogram',
+    ]
+    for (provider, model, operation, outcome), a in sorted(calls.items()):
+        labels = {'provider': provider, 'model': model, 'operation': operation, 'outcome': outcome}
+        _histogram(lines, 'healthhub_llm_call_duration_seconds', labels, a.buckets, a.count, a.latency_sum)
+
+    lines += [
+        '# HELP healthhub_llm_tokens_total Tokens reported by the provider.',
+        '# TYPE healthhub_llm_tokens_total counter',
+    ]
+    for (provider, model, operation, outcome), a in sorted(calls.items()):
+        for direction, value in (('input', a.input_tokens), ('output', a.output_tokens)):
+            lines.append(
+                f'healthhub_llm_tokens_total{_labels(provider=provider, model=model, operation=operation, outcome=outcome, direction=direction)} {value}'
+            )
+
+    lines += [
+        '# HELP healthhub_llm_cost_usd_total Estimated LLM cost (LLM_METERING PRICING).',
+        '# TYPE healthhub_llm_cost_usd_total counter',
+    ]
+    for (provider, model, operation, outcome), a in sorted(calls.items()):
+        lines.append(f'healthhub_llm_cost_usd_total{_labels(provider=provider, model=model, operation=operation, outcome=outcome)} {a.cost:.6f}')
+
+    lines += [
+        '# HELP healthhub_llm_requests_total User requests by answer path (llm, cache, classifier, local, ...).',
+        '# TYPE healthhub_llm_requests_total counter',
+    ]
+    for (operation, path), a in sorted(requests.items()):
+        lines.append(f'healthhub_llm_requests_total{_labels(operation=operation, path=path)} {a.count}')
+
+    lines += [
+        '# HELP healthhub_llm_retries_total Extra model attempts after the first one within a request.',
+        '# TYPE healthhub_llm_retries_total counter',
+    ]
+    for (operation, path), a in sorted(requests.items()):
+        lines.append(f'healthhub_llm_retries_total{_labels(operation=operation, path=path)} {a.retries}')
+
+    lines += [
+        '# HELP healthhub_llm_request_duration_seconds End-to-end request latency by answer path.',
+        '# TYPE healthhub_llm_request_duration_seconds histogram',
+    ]
+    for (operation, path), a in sorted(requests.items()):
+        _histogram(lines, 'healthhub_llm_request_duration_seconds', {'operation': operation, 'path': path},
+                   a.buckets, a.count, a.latency_sum)
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_service', '0003_aianalysisjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMUsageStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('kind', models.CharField(choices=[('call', 'Model chaqiruvi'), ('request', "So'rov")], max_length=10)),
+                ('provider', models.CharField(blank=True, max_length=20)),
+                ('model', models.CharField(blank=True, max_length=64)),
+                ('operation', models.CharField(max_length=32)),
+                ('outcome', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('input_tokens', models.PositiveBigIntegerField(default=0)),
+                ('output_tokens', models.PositiveBigIntegerField(default=0)),
+                ('cost_usd', models.FloatField(default=0)),
+                ('latency_sum', models.FloatField(default=0)),
+                ('latency_buckets', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'LLM statistikasi',
+                'verbose_name_plural': 'LLM statistikasi',
+                'ordering': ['-bucket'],
+                'unique_together': {('bucket', 'kind', 'provider', 'model', 'operation', 'outcome')},
+            },
+        ),
+    ]
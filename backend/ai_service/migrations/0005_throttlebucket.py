@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_service', '0004_llmusagestat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated', models.FloatField()),
+                ('expires_at', models.FloatField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Throttle bucket',
+                'verbose_name_plural': 'Throttle buckets',
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_service', '0005_throttlebucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_id', models.CharField(blank=True, max_length=64)),
+                ('processed', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Agregatsiya belgisi',
+                'verbose_name_plural': 'Agregatsiya belgilari',
+            },
+        ),
+        migrations.CreateModel(
+            name='SymptomDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('total', 'Jami'), ('symptom', 'Alomat'), ('condition', 'Kasallik'), ('age', 'Yosh guruhi'), ('emergency', 'Shoshilinch')], max_length=20)),
+                ('value', models.CharField(blank=True, max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Alomatlar kunlik statistikasi',
+                'verbose_name_plural': 'Alomatlar kunlik statistikasi',
+                'ordering': ['-date', 'dimension', '-count'],
+                'indexes': [models.Index(fields=['dimension', 'date'], name='ai_service__dimensi_35aabb_idx')],
+                'unique_together': {('date', 'dimension', 'value')},
+            },
+        ),
+    ]
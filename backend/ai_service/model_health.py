@@ -0,0 +1,206 @@
+# ai_service/model_health.py
+"""
+LLM modellari holati (circuit breaker) - jarayon bo'yicha umumiy.
+
+Har bir model uchun:
+    closed    - ishlayapti, so'rovlar o'tadi
+    open      - ketma-ket xatolar (yoki quota) - cooldown tugaguncha o'tkazib yuboriladi
+    half_open - cooldown tugadi, bitta sinov so'rovi o'tadi; muvaffaqiyatli bo'lsa closed
+
+Ochiq breaker Django cache ga ham yoziladi - boshqa workerlar ham o'sha modelni
+darhol o'tkazib yuboradi. Sog'lom modellar javob vaqti EWMA bo'yicha tartiblanadi.
+"""
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+BREAKER_SETTINGS = getattr(settings, 'LLM_BREAKER_SETTINGS', {})
+FAILURE_THRESHOLD = BREAKER_SETTINGS.get('FAILURE_THRESHOLD', 3)
+COOLDOWN = BREAKER_SETTINGS.get('COOLDOWN', 30)
+QUOTA_COOLDOWN = BREAKER_SETTINGS.get('QUOTA_COOLDOWN', 120)
+EWMA_ALPHA = 0.3
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class ModelsUnavailable(Exception):
+    """Barcha modellar breaker bilan yopilgan"""
+
+
+QUOTA_ERROR_TYPES = {'ResourceExhausted', 'TooManyRequests'}
+QUOTA_ERROR_RE = re.compile(r'\b429\b|resource_exhausted|rate limit|quota', re.IGNORECASE)
+
+
+def is_quota_error(error):
+    """429 / RESOURCE_EXHAUSTED (google.api_core istisnolari yoki matni bo'yicha)"""
+    if type(error).__name__ in QUOTA_ERROR_TYPES:
+        return True
+    return bool(QUOTA_ERROR_RE.search(str(error)))
+
+
+class ModelHealth:
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.latency = None
+        self.successes = 0
+        self.total_failures = 0
+
+
+class ModelHealthRegistry:
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN,
+                 quota_cooldown=QUOTA_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.quota_cooldown = quota_cooldown
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(name):
+        return f'llm_breaker:{name}'
+
+    def _get(self, name):
+        health = self._models.get(name)
+        if health is None:
+            health = self._models[name] = ModelHealth(name)
+        return health
+
+    def order(self, models):
+        """
+        Hozir chaqirish mumkin bo'lgan modellar - eng tezkor sog'lom model birinchi,
+        cooldown i tugaganlari oxirida. Chaqirishdan oldin acquire() - sinov sloti
+        faqat model haqiqatan chaqirilganda band qilinadi.
+        """
+        shared = cache.get_many([self._cache_key(name) for name in models])
+        now = time.time()
+        healthy, probes = [], []
+
+        with self._lock:
+            for index, name in enumerate(models):
+                health = self._get(name)
+                shared_until = shared.get(self._cache_key(name), 0)
+                if shared_until > now and health.state == CLOSED:
+                    # Boshqa worker ochgan
+                    health.state = OPEN
+                    health.open_until = shared_until
+
+                if health.state == CLOSED:
+                    latency = health.latency if health.latency is not None else float('inf')
+                    # O'lchanmagan modellar ro'yxatdagi tartibda
+                    healthy.append((latency, index, name))
+                elif health.open_until <= now and not health.probe_in_flight:
+                    probes.append(name)
+
+        return [name for _, _, name in sorted(healthy)] + probes
+
+    def acquire(self, name):
+        """Modelni hozir chaqirish mumkinmi; cooldown tugagan bo'lsa bitta sinov (half-open) ruxsati"""
+        with self._lock:
+            health = self._get(name)
+            if health.state == CLOSED:
+                return True
+            if health.open_until <= time.time() and not health.probe_in_flight:
+                health.state = HALF_OPEN
+                health.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, name, latency):
+        with self._lock:
+            health = self._get(name)
+            was_open = health.state != CLOSED
+            health.state = CLOSED
+            health.failures = 0
+            health.probe_in_flight = False
+            health.successes += 1
+            if health.latency is None:
+                health.latency = latency
+            else:
+                health.latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * health.latency
+        if was_open:
+            cache.delete(self._cache_key(name))
+            logger.info(f"LLM breaker closed: {name}")
+
+    def record_failure(self, name, error=None):
+        quota = error is not None and is_quota_error(error)
+        with self._lock:
+            health = self._get(name)
+            health.failures += 1
+            health.total_failures += 1
+            health.probe_in_flight = False
+            should_open = quota or health.state == HALF_OPEN or health.failures >= self.failure_threshold
+            if not should_open:
+                return
+            cooldown = self.quota_cooldown if quota else self.cooldown
+            health.state = OPEN
+            health.open_until = time.time() + cooldown
+            open_until = health.open_until
+        cache.set(self._cache_key(name), open_until, cooldown)
+        logger.warning(f"LLM breaker opened: {name} ({cooldown}s): {error}")
+
+    def release(self, name):
+        """Natijasi noma'lum so'rov (mijoz oqimni uzdi) - sinov slotini bo'shatish"""
+        with self._lock:
+            self._get(name).probe_in_flight = False
+
+    def call(self, models, func):
+        """
+        func(model_name) ni birinchi muvaffaqiyatli modelgacha chaqirish.
+        Ochiq modellar kutmasdan o'tkazib yuboriladi.
+        """
+        last_error = None
+        for name in self.order(models):
+            if not self.acquire(name):
+                continue
+            started = time.monotonic()
+            try:
+                result = func(name)
+            except Exception as e:
+                last_error = e
+                self.record_failure(name, e)
+                continue
+            self.record_success(name, time.monotonic() - started)
+            return result
+        raise last_error or ModelsUnavailable("Barcha modellar vaqtincha mavjud emas")
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                name: {
+                    'state': h.state,
+                    'failures': h.failures,
+                    'total_failures': h.total_failures,
+                    'successes': h.successes,
+                    'latency_ewma': round(h.latency, 3) if h.latency is not None else None,
+                    'retry_in': max(0, round(h.open_until - now, 1)) if h.state != CLOSED else 0,
+                }
+                for name, h in self._models.items()
+            }
+
+
+model_health = ModelHealthRegistry()
+
+_gemini_models = {}
+_gemini_lock = threading.Lock()
+
+
+def gemini_model(name):
+    """genai.GenerativeModel instansiyasi - har so'rovda qayta yaratilmaydi"""
+    import google.generativeai as genai
+
+    with _gemini_lock:
+        model = _gemini_models.get(name)
+        if model is None:
+            model = _gemini_models[name] = genai.GenerativeModel(name)
+        return model
@@ -180,4 +180,141 @@ class AIConsultation(models.Model):
         verbose_name_plural = 'AI Konsultatsiyalar'
 
     def __str__(self):
-        return f"Consultation - {self.symptoms[:50]}... ({self.created_at.strftime('%Y-%m-%d')})"
\ No newline at end of file
+        return f"Consultation - {self.symptoms[:50]}... ({self.created_at.strftime('%Y-%m-%d')})"
+
+class AIAnalysisJob(models.Model):
+    """Fon rejimidagi AI tahlil vazifasi (async analyze)"""
+    STATUS_CHOICES = [
+        ('pending', 'Navbatda'),
+        ('running', 'Bajarilmoqda'),
+        ('done', 'Tayyor'),
+        ('failed', 'Xato'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='ai_jobs',
+        null=True,
+        blank=True
+    )
+    symptoms = models.TextField(verbose_name='Alomatlar')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'AI tahlil vazifasi'
+        verbose_name_plural = 'AI tahlil vazifalari'
+
+    def __str__(self):
+        return f"Job {str(self.id)[:8]} - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class LLMUsageStat(models.Model):
+    """
+    LLM chaqiruvlari agregati - soatlik bucket bo'yicha (ai_service.metering).
+    kind='call'    - bitta model chaqiruvi (outcome: success/error/quota)
+    kind='request' - bitta foydalanuvchi so'rovi (outcome: javob yo'li - llm/cache/classifier/local/...)
+    """
+    KIND_CHOICES = [
+        ('call', 'Model chaqiruvi'),
+        ('request', "So'rov"),
+    ]
+
+    bucket = models.DateTimeField(db_index=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    provider = models.CharField(max_length=20, blank=True)
+    model = models.CharField(max_length=64, blank=True)
+    operation = models.CharField(max_length=32)
+    outcome = models.CharField(max_length=20)
+
+    count = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    input_tokens = models.PositiveBigIntegerField(default=0)
+    output_tokens = models.PositiveBigIntegerField(default=0)
+    cost_usd = models.FloatField(default=0)
+    latency_sum = models.FloatField(default=0)
+    latency_buckets = models.JSONField(default=list)  # LATENCY_BUCKETS + [+Inf] bo'yicha (kumulyativ emas)
+
+    class Meta:
+        ordering = ['-bucket']
+        unique_together = ['bucket', 'kind', 'provider', 'model', 'operation', 'outcome']
+        verbose_name = 'LLM statistikasi'
+        verbose_name_plural = 'LLM statistikasi'
+
+    def __str__(self):
+        return f"{self.bucket:%Y-%m-%d %H:00} {self.operation} {self.model or self.outcome} x{self.count}"
+
+
+class ThrottleBucket(models.Model):
+    """
+    Throttle token bucket (ai_service.throttling, BACKEND='db').
+    Vaqtlar - unix sekund (float): yangilash bitta UPDATE ichida arifmetika bilan bajariladi.
+    """
+    key = models.CharField(max_length=200, unique=True)
+    tokens = models.FloatField()
+    updated = models.FloatField()
+    expires_at = models.FloatField(db_index=True)  # shu vaqtdan keyin bucket to'la - o'chirish mumkin
+
+    class Meta:
+        verbose_name = 'Throttle bucket'
+        verbose_name_plural = 'Throttle buckets'
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f}"
+
+
+class SymptomDailyStat(models.Model):
+    """
+    SymptomCheck kunlik agregati (ai_service.rollups) - admin trendlari xom
+    tekshiruvlarni skanerlamasdan shu jadvaldan o'qiydi.
+    """
+    DIMENSION_CHOICES = [
+        ('total', 'Jami'),
+        ('symptom', 'Alomat'),
+        ('condition', 'Kasallik'),
+        ('age', 'Yosh guruhi'),
+        ('emergency', 'Shoshilinch'),
+    ]
+
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    value = models.CharField(max_length=255, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', 'dimension', '-count']
+        unique_together = ['date', 'dimension', 'value']
+        indexes = [models.Index(fields=['dimension', 'date'])]
+        verbose_name = 'Alomatlar kunlik statistikasi'
+        verbose_name_plural = 'Alomatlar kunlik statistikasi'
+
+    def __str__(self):
+        return f"{self.date} {self.dimension}={self.value}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """Inkremental agregatsiya qayerda to'xtagani - (created_at, id) bo'yicha"""
+    name = models.CharField(max_length=50, unique=True)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    last_id = models.CharField(max_length=64, blank=True)
+    processed = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Agregatsiya belgisi'
+        verbose_name_plural = 'Agregatsiya belgilari'
+
+    def __str__(self):
+        return f"{self.name}: {self.last_created_at}"
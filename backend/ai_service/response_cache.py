@@ -0,0 +1,186 @@
+# ai_service/response_cache.py
+"""
+LLM tahlil natijalari uchun cache.
+
+Kalit - normallashtirilgan alomatlar to'plami (kichik harf, lotinga o'girilgan,
+tokenlarga ajratilgan, saralangan) + yosh va jins guruhlari. Shunday qilib
+"Bosh og'rig'i va isitma" va "isitma, bosh ogrigi" bitta natijani oladi.
+
+Ikki daraja:
+    L1 - jarayon ichidagi LRU (TTL bilan), eng tez
+    L2 - Django cache (workerlar o'rtasida umumiy bo'lsa)
+"""
+import copy
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_TTL = settings.CACHE_TIMEOUTS.get('ai_analysis', 60 * 60 * 6)
+DEFAULT_MAX_ENTRIES = 500
+
+# O'zbek/rus kirill -> lotin
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya', 'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+}
+_TRANSLIT_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+
+# Apostrof variantlari olib tashlanadi: og'riq = ogʻriq = ogriq
+_APOSTROPHES = str.maketrans('', '', "'`ʻʼ‘’´")
+
+STOPWORDS = {
+    # o'zbek
+    'va', 'ham', 'bor', 'menda', 'meni', 'men', 'juda', 'biroz', 'sal', 'yoki', 'bilan',
+    'ozgina', 'hozir', 'bu', 'u',
+    # rus (lotinga o'girilgan) va ingliz
+    'i', 'menya', 'ochen', 'and', 'the', 'a', 'my', 'have',
+}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_text(text):
+    """Matnni lotin, kichik harf va apostrofsiz ko'rinishga keltirish"""
+    text = (text or '').lower().translate(_TRANSLIT_TABLE).translate(_APOSTROPHES)
+    return text
+
+
+def normalize_symptoms(symptoms):
+    """Alomatlar (matn yoki ro'yxat) -> saralangan noyob tokenlar"""
+    if isinstance(symptoms, (list, tuple)):
+        symptoms = ' '.join(str(s) for s in symptoms)
+    tokens = _TOKEN_RE.findall(normalize_text(symptoms))
+    return sorted({t for t in tokens if t not in STOPWORDS})
+
+
+def age_bucket(age):
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return 'na'
+    if age < 13:
+        return 'child'
+    if age < 18:
+        return 'teen'
+    if age < 40:
+        return 'adult'
+    if age < 65:
+        return 'middle'
+    return 'senior'
+
+
+def gender_bucket(gender):
+    gender = (gender or '').lower()
+    if gender in ('male', 'm', 'erkak'):
+        return 'male'
+    if gender in ('female', 'f', 'ayol'):
+        return 'female'
+    return 'na'
+
+
+class SymptomResultCache:
+    """Normallashtirilgan alomatlar bo'yicha LLM javoblari cache"""
+
+    def __init__(self, namespace, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.local_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def make_key(self, symptoms, age=None, gender=None):
+        tokens = normalize_symptoms(symptoms)
+        if not tokens:
+            return None
+        raw = f"{' '.join(tokens)}|{age_bucket(age)}|{gender_bucket(gender)}"
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return f'ai_result:{self.namespace}:{digest}'
+
+    def get(self, symptoms, age=None, gender=None, personalized=False):
+        """Cache dan natija (yo'q bo'lsa None)"""
+        if personalized:
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        key = self.make_key(symptoms, age, gender)
+        if key is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._local.move_to_end(key)
+                    self.hits += 1
+                    self.local_hits += 1
+                    return copy.deepcopy(value)
+                del self._local[key]
+
+        value = cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value, now)
+        return copy.deepcopy(value)
+
+    def set(self, symptoms, value, age=None, gender=None, personalized=False):
+        """Natijani saqlash (shaxsiy so'rovlar saqlanmaydi)"""
+        if personalized or value is None:
+            return
+        key = self.make_key(symptoms, age, gender)
+        if key is None:
+            return
+        value = copy.deepcopy(value)
+        cache.set(key, value, self.ttl)
+        with self._lock:
+            self._remember(key, value, time.monotonic())
+
+    def _remember(self, key, value, now):
+        self._local[key] = (value, now + self.ttl)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'namespace': self.namespace,
+                'hits': self.hits,
+                'local_hits': self.local_hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'size': len(self._local),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+            }
+
+
+# Har bir LLM yo'li uchun alohida namespace - promptlar va javob formati farq qiladi
+consultation_cache = SymptomResultCache('consultation')
+agent_cache = SymptomResultCache('agent')
+claude_cache = SymptomResultCache('claude')
+
+ALL_CACHES = (consultation_cache, agent_cache, claude_cache)
@@ -0,0 +1,110 @@
+# ai_service/rollups.py
+"""
+SymptomCheck -> SymptomDailyStat inkremental agregatsiyasi.
+
+Har ishga tushishda faqat oxirgi belgidan (watermark: created_at, id) keyingi
+tekshiruvlar o'qiladi va kunlik hisoblagichlarga qo'shiladi:
+    total     - kunlik tekshiruvlar soni
+    symptom   - alomat bo'yicha
+    condition - AI javobidagi ehtimoliy kasallik bo'yicha
+    age       - yosh guruhi bo'yicha
+    emergency - shoshilinch / oddiy
+Hisoblagichlar va belgi bitta tranzaksiyada yangilanadi - qayta ishga tushirish
+qatorlarni ikki marta sanamaydi. LAG - hali commit bo'lmagan tranzaksiyalardagi
+qatorlar belgidan orqada qolib ketmasligi uchun.
+"""
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .response_cache import age_bucket, normalize_text
+
+WATERMARK_NAME = 'symptom_daily'
+BATCH_SIZE = 2000
+LAG = timedelta(minutes=2)
+
+
+def symptom_key(symptom):
+    """Alomat nomi -> kalit ("Isitma " va "isitma" bir xil)"""
+    return ' '.join(normalize_text(str(symptom)).split())[:255]
+
+
+def check_keys(symptoms, ai_response, age, is_emergency):
+    """Bitta tekshiruv -> (dimension, value) juftliklari"""
+    if isinstance(symptoms, str):
+        symptoms = [symptoms]
+    keys = {('total', ''), ('age', age_bucket(age)), ('emergency', 'true' if is_emergency else 'false')}
+    for symptom in symptoms or []:
+        name = symptom_key(symptom)
+        if name:
+            keys.add(('symptom', name))
+    for condition in (ai_response or {}).get('possible_conditions') or []:
+        name = condition.get('name') if isinstance(condition, dict) else condition
+        if name:
+            keys.add(('condition', str(name).strip()[:255]))
+    return keys
+
+
+def _apply(counts):
+    from .models import SymptomDailyStat
+
+    for (date, dimension, value), count in counts.items():
+        updated = SymptomDailyStat.objects.filter(date=date, dimension=dimension, value=value).update(
+            count=F('count') + count
+        )
+        if not updated:
+            SymptomDailyStat.objects.create(date=date, dimension=dimension, value=value, count=count)
+
+
+def run_symptom_rollup(batch_size=BATCH_SIZE, now=None):
+    """Belgidan keyingi barcha tekshiruvlarni agregatga qo'shish; qayta ishlangan qatorlar soni"""
+    from .models import RollupWatermark, SymptomCheck
+
+    cutoff = (now or timezone.now()) - LAG
+    total = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+
+            rows = SymptomCheck.objects.filter(created_at__lt=cutoff)
+            if watermark.last_created_at is not None:
+                rows = rows.filter(
+                    Q(created_at__gt=watermark.last_created_at) |
+                    Q(created_at=watermark.last_created_at, id__gt=uuid.UUID(watermark.last_id))
+                )
+            rows = list(
+                rows.order_by('created_at', 'id')
+                .values_list('id', 'created_at', 'symptoms', 'ai_response', 'age', 'is_emergency')[:batch_size]
+            )
+            if not rows:
+                return total
+
+            counts = Counter()
+            for _, created_at, symptoms, ai_response, age, is_emergency in rows:
+                date = timezone.localdate(created_at)
+                for dimension, value in check_keys(symptoms, ai_response, age, is_emergency):
+                    counts[(date, dimension, value)] += 1
+            _apply(counts)
+
+            last_id, last_created_at = rows[-1][0], rows[-1][1]
+            watermark.last_created_at = last_created_at
+            watermark.last_id = str(last_id)
+            watermark.processed += len(rows)
+            watermark.save()
+
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+def reset_symptom_rollup():
+    """Agregatni noldan qayta qurish uchun (belgi va hisoblagichlar o'chiriladi)"""
+    from .models import RollupWatermark, SymptomDailyStat
+
+    with transaction.atomic():
+        SymptomDailyStat.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK_NAME).delete()
@@ -0,0 +1,134 @@
+# ai_service/singleflight.py
+"""
+Bir xil LLM so'rovlarini birlashtirish (single-flight).
+
+Bir vaqtda bir xil (normallashtirilgan) so'rov kelsa, faqat birinchisi (leader)
+LLM ni chaqiradi, qolganlari (followers) uning natijasini kutadi:
+    - jarayon ichida - threading.Event orqali
+    - workerlar o'rtasida - cache.add() lock va natija kaliti orqali (CROSS_WORKER)
+Kutish vaqti tugasa SingleFlightTimeout - chaqiruvchi lokal tahlilga o'tadi.
+"""
+import copy
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+FLIGHT_SETTINGS = getattr(settings, 'SINGLE_FLIGHT_SETTINGS', {})
+WAIT_TIMEOUT = FLIGHT_SETTINGS.get('WAIT_TIMEOUT', 30)
+CROSS_WORKER = FLIGHT_SETTINGS.get('CROSS_WORKER', True)
+POLL_INTERVAL = FLIGHT_SETTINGS.get('POLL_INTERVAL', 0.1)
+RESULT_TTL = 30
+
+
+class SingleFlightTimeout(Exception):
+    """Leader natijasini kutish vaqti tugadi"""
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def prompt_key(prompt):
+    """Prompt -> kalit (katta-kichik harf va bo'shliqlar farqi hisobga olinmaydi)"""
+    normalized = ' '.join(prompt.lower().split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self, namespace, timeout=WAIT_TIMEOUT, cross_worker=CROSS_WORKER):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.cross_worker = cross_worker
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def do(self, key, func):
+        """func() natijasi; shu kalit bilan chaqiruv allaqachon bajarilayotgan bo'lsa - uni kutish"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            if not call.event.wait(self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise SingleFlightTimeout(f"{self.namespace}: {self.timeout}s kutildi")
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = self._run(key, func) if self.cross_worker else func()
+            return copy.deepcopy(call.result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _run(self, key, func):
+        """Workerlar o'rtasida: lock olgan worker chaqiradi, qolganlari natija kalitini kutadi"""
+        lock_key = f'single_flight:{self.namespace}:{key}:lock'
+        result_key = f'single_flight:{self.namespace}:{key}:result'
+
+        deadline = time.monotonic() + self.timeout
+        while not cache.add(lock_key, 1, self.timeout):
+            result = cache.get(result_key)
+            if result is not None:
+                with self._lock:
+                    self.shared += 1
+                return result
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    self.timeouts += 1
+                raise SingleFlightTimeout(f"{self.namespace}: boshqa worker {self.timeout}s ichida javob bermadi")
+            time.sleep(POLL_INTERVAL)
+            # Lock yo'qolib natija yo'q bo'lsa (leader xato berdi) - keyingi aylanishda o'zimiz olamiz
+
+        try:
+            # Lock bo'shashidan oldingi leader natijasi (poll oralig'ida tugagan bo'lishi mumkin)
+            result = cache.get(result_key)
+            if result is not None:
+                with self._lock:
+                    self.shared += 1
+                return result
+            result = func()
+            if result is not None:
+                cache.set(result_key, result, RESULT_TTL)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'namespace': self.namespace,
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'shared_across_workers': self.shared,
+                'timeouts': self.timeouts,
+            }
+
+
+analysis_flight = SingleFlight('consultation')
+agent_flight = SingleFlight('agent')
+
+ALL_FLIGHTS = (analysis_flight, agent_flight)
@@ -0,0 +1,133 @@
+# ai_service/streaming.py
+"""
+Server-Sent Events yordamchilari va model javobidan JSON maydonlarini
+oqim davomida (to'liq javobni kutmasdan) ajratib olish.
+
+SSE javoblari async iterator - ASGI (uvicorn worker) da oqim event loop da yuboriladi va
+worker thread ni band qilmaydi. WSGI da Django async iteratorni to'liq yig'ib
+bir javobda qaytaradi - u yerda faqat polling (GET /api/ai/jobs/<id>/) ishlatiladi.
+"""
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """text/event-stream - DRF content negotiation SSE so'rovlarini rad etmasligi uchun"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Xatolik javoblari (400/429) ham SSE hodisasi sifatida
+        return sse_event('error', data).encode(self.charset)
+
+
+def sse_event(event, data):
+    """Bitta SSE hodisasi"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+_END = object()
+
+
+async def iterate_in_thread(iterator):
+    """
+    Bloklovchi generator (LLM oqimi) -> async iterator.
+    Har bir qadam so'rovning o'z threadida (ThreadSensitiveContext) - boshqa so'rovlar kutmaydi.
+    Mijoz uzilsa generator yopiladi (GeneratorExit - model sinov sloti bo'shatiladi).
+    """
+    step = sync_to_async(next)
+    try:
+        while True:
+            item = await step(iterator, _END)
+            if item is _END:
+                return
+            yield item
+    finally:
+        await sync_to_async(iterator.close)()
+
+
+def _string_value_re(key):
+    return re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % re.escape(key))
+
+
+def _decode_partial_string(raw):
+    """Tugallanmagan JSON satrini dekodlash (oxiridagi chala escape tashlanadi)"""
+    while raw:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            raw = raw[:-1]
+    return ''
+
+
+class StreamingJSONFields:
+    """
+    Model oqimidan JSON maydonlarini iloji boricha erta ajratish.
+
+    feed(buffer) har safar yig'ilgan matn bilan chaqiriladi va yangi hodisalarni qaytaradi:
+        (key, {key: value})   - satr, ro'yxat yoki obyekt maydoni to'liq kelganda (bir marta)
+        (delta_key, {'text'}) - stream_key satrining yangi qismi (UI da yozilib borishi uchun)
+    """
+
+    def __init__(self, string_keys=(), list_keys=(), object_keys=(), stream_key=None):
+        self.patterns = {}
+        for key in string_keys:
+            self.patterns[key] = _string_value_re(key)
+        for key in list_keys:
+            self.patterns[key] = re.compile(r'"%s"\s*:\s*(\[[^\]]*\])' % re.escape(key))
+        for key in object_keys:
+            self.patterns[key] = re.compile(r'"%s"\s*:\s*(\{[^{}]*\})' % re.escape(key))
+        self.string_keys = set(string_keys)
+        self.stream_key = stream_key
+        self._stream_start = re.compile(r'"%s"\s*:\s*"' % re.escape(stream_key)) if stream_key else None
+        self._streamed_len = 0
+        self.emitted = {}
+
+    def feed(self, buffer):
+        events = []
+
+        if self._stream_start and self.stream_key not in self.emitted:
+            match = self._stream_start.search(buffer)
+            if match:
+                raw = self._read_string(buffer, match.end())
+                text = _decode_partial_string(raw)
+                if len(text) > self._streamed_len:
+                    events.append((f'{self.stream_key}_delta', {'text': text[self._streamed_len:]}))
+                    self._streamed_len = len(text)
+
+        for key, pattern in self.patterns.items():
+            if key in self.emitted:
+                continue
+            match = pattern.search(buffer)
+            if not match:
+                continue
+            try:
+                if key in self.string_keys:
+                    value = json.loads(f'"{match.group(1)}"')
+                else:
+                    value = json.loads(match.group(1))
+            except ValueError:
+                continue
+            self.emitted[key] = value
+            events.append((key, {key: value}))
+
+        return events
+
+    @staticmethod
+    def _read_string(buffer, start):
+        """start dan boshlab yopuvchi qo'shtirnoqqacha (yoki oxirigacha) xom satr"""
+        i = start
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '\\':
+                i += 2
+                continue
+            if char == '"':
+                break
+            i += 1
+        return buffer[start:min(i, len(buffer))]
@@ -0,0 +1,50 @@
+# ai_service/tasks.py
+import logging
+from celery import shared_task
+from django.utils import timezone
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='ai_service.tasks.cleanup_ai_jobs')
+def cleanup_ai_jobs(days=1):
+    """Eski async tahlil vazifalarini o'chirish"""
+    from .models import AIAnalysisJob
+
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = AIAnalysisJob.objects.filter(created_at__lt=cutoff).delete()
+    logger.info(f"AI jobs cleanup: {deleted} deleted")
+    return deleted
+
+
+@shared_task(name='ai_service.tasks.cleanup_throttle_buckets')
+def cleanup_throttle_buckets():
+    """To'lib bo'lgan throttle bucketlarini o'chirish (BACKEND='db')"""
+    from .throttling import DatabaseBucketStore
+
+    deleted = DatabaseBucketStore().cleanup()
+    logger.info(f"Throttle buckets cleanup: {deleted} deleted")
+    return deleted
+
+
+@shared_task(name='ai_service.tasks.compact_llm_usage')
+def compact_llm_usage():
+    """Eski soatlik LLM metrikalarini jami qatorlarga yig'ish (LLM_METERING RETENTION_DAYS)"""
+    from .metering import compact
+
+    compacted = compact()
+    logger.info(f"LLM usage compaction: {compacted} rows folded")
+    return compacted
+
+
+@shared_task(name='ai_service.tasks.rollup_symptom_stats')
+def rollup_symptom_stats(rebuild=False):
+    """Yangi alomat tekshiruvlarini kunlik agregatga qo'shish (oxirgi belgidan keyin)"""
+    from .rollups import reset_symptom_rollup, run_symptom_rollup
+
+    if rebuild:
+        reset_symptom_rollup()
+    processed = run_symptom_rollup()
+    logger.info(f"Symptom rollup: {processed} checks processed")
+    return processed
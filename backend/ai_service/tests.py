@@ -1,3 +1,39 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .agent import classify_intent_local, medicine_query
+
+
+class ClassifyIntentLocalTests(SimpleTestCase):
+    """Mahalliy javob faqat to'liq small talk yoki dori nomi bo'lsa"""
+
+    def test_small_talk(self):
+        cases = {
+            'Salom': 'greeting',
+            'Assalomu alaykum!': 'greeting',
+            'Hi': 'greeting',
+            'Привет': 'greeting',
+            'Rahmat katta': 'thanks',
+            'Thank you!': 'thanks',
+            'Salom, rahmat': 'thanks',
+        }
+        for message, intent in cases.items():
+            with self.subTest(message=message):
+                self.assertEqual(classify_intent_local(message), intent)
+
+    def test_health_questions_go_to_llm(self):
+        for message in [
+            'high blood pressure',
+            'Salom, uxlay olmayapman',
+            'salomatlik maslahat',
+            'Hisobimni korsat',
+            'Spasibo, doktor',
+        ]:
+            with self.subTest(message=message):
+                self.assertIsNone(classify_intent_local(message))
+
+    def test_medicine_search_needs_name(self):
+        self.assertEqual(classify_intent_local('Paratsetamol dori bormi?'), 'medicine_search')
+        self.assertEqual(medicine_query('Paratsetamol dori bormi?'), ['Paratsetamol'])
+        for message in ['Dorixona qayerda', 'Dori kerak', 'Qaysi dori yaxshi?']:
+            with self.subTest(message=message):
+                self.assertIsNone(classify_intent_local(message))
@@ -1,8 +1,202 @@
 # ai_service/throttling.py
-from rest_framework.throttling import SimpleRateThrottle
+"""
+Token bucket throttling - workerlar o'rtasida umumiy ombor bilan.
 
+DRF SimpleRateThrottle tarixni (vaqtlar ro'yxati) LocMemCache da saqlaydi: N ta worker
+bo'lsa limit amalda N barobar, har tekshiruvda o'sib boruvchi ro'yxat qayta yoziladi.
+Bu yerda har bir kalit uchun bitta bucket (tokens, updated) va bitta atomik amal:
+    db    - ThrottleBucket jadvali, bitta shartli UPDATE (SQLite / PostgreSQL)
+    redis - Lua skript (har qanday Redis protokolli server), vaqt serverdan olinadi
+    local - jarayon xotirasi (testlar va bitta jarayon uchun)
 
-class AIServiceThrottle(SimpleRateThrottle):
+'100/hour' -> sig'im 100 token, soniyasiga 100/3600 token to'ladi.
+Ombor ishlamay qolsa so'rov o'tkaziladi (fail-open) - throttling API ni to'xtatmaydi.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle, UserRateThrottle
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_SETTINGS = getattr(settings, 'THROTTLE_BACKEND', {})
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class LocalBucketStore:
+    """Jarayon ichidagi bucketlar - testlar uchun (workerlar o'rtasida umumiy emas)"""
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """(ruxsat, kutish sekundlari)"""
+        now = self.timer()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, max(updated, now))
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBucketStore:
+    """
+    ThrottleBucket jadvali. To'ldirish va yechish bitta UPDATE ... WHERE tokens yetarli
+    ichida bajariladi - parallel workerlar bir-birining yozuvini yo'qotmaydi.
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+
+    def consume(self, key, capacity, rate):
+        from .models import ThrottleBucket
+
+        now = self.timer()
+        elapsed = Greatest(Value(now) - F('updated'), Value(0.0))
+        refill = elapsed * Value(rate)
+        expires_at = now + capacity / rate
+
+        for _ in range(2):
+            taken = ThrottleBucket.objects.filter(key=key, tokens__gte=Value(1.0) - refill).update(
+                tokens=Least(Value(float(capacity)), F('tokens') + refill) - Value(1.0),
+                updated=Greatest(F('updated'), Value(now)),
+                expires_at=expires_at,
+            )
+            if taken:
+                return True, 0.0
+            try:
+                with transaction.atomic():
+                    ThrottleBucket.objects.create(
+                        key=key, tokens=capacity - 1, updated=now, expires_at=expires_at
+                    )
+                return True, 0.0
+            except IntegrityError:
+                # Bucket bor, lekin token yetarli emas (yoki boshqa worker hozirgina yaratdi)
+                row = ThrottleBucket.objects.filter(key=key).values_list('tokens', 'updated').first()
+                if row is None:
+                    continue
+                tokens = _refill(row[0], row[1], now, capacity, rate)
+                if tokens < 1:
+                    return False, (1 - tokens) / rate
+        return False, 1 / rate
+
+    def cleanup(self):
+        """To'la (muddati o'tgan) bucketlarni o'chirish - ular yangi bucket bilan bir xil"""
+        from .models import ThrottleBucket
+
+        deleted, _ = ThrottleBucket.objects.filter(expires_at__lt=self.timer()).delete()
+        return deleted
+
+
+class RedisBucketStore:
+    """Redis (yoki Redis protokolli server) - bucket hash + Lua skript, bitta round-trip"""
+
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(wait)}
+"""
+
+    def __init__(self, url, prefix='throttle:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, rate):
+        allowed, wait = self._script(keys=[self.prefix + key], args=[capacity, rate])
+        return bool(allowed), float(wait)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """settings.THROTTLE_BACKEND['BACKEND'] bo'yicha ombor (jarayonda bitta)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = THROTTLE_SETTINGS.get('BACKEND', 'db')
+            if backend == 'redis':
+                _store = RedisBucketStore(THROTTLE_SETTINGS['REDIS_URL'])
+            elif backend == 'local':
+                _store = LocalBucketStore()
+            else:
+                _store = DatabaseBucketStore()
+        return _store
+
+
+class TokenBucketThrottleMixin:
+    """
+    SimpleRateThrottle.allow_request o'rniga - tarix ro'yxati o'rniga token bucket.
+    get_cache_key() va rate/scope o'zgarmaydi.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        try:
+            allowed, self.wait_seconds = get_bucket_store().consume(
+                self.key, self.num_requests, self.num_requests / self.duration
+            )
+        except Exception as e:
+            logger.warning(f"Throttle store error ({self.key}): {e}")
+            return True
+        return allowed
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class AnonBucketThrottle(TokenBucketThrottleMixin, AnonRateThrottle):
+    """Global anonim limit (DEFAULT_THROTTLE_CLASSES)"""
+
+
+class UserBucketThrottle(TokenBucketThrottleMixin, UserRateThrottle):
+    """Global foydalanuvchi limiti (DEFAULT_THROTTLE_CLASSES)"""
+
+
+class AIServiceThrottle(TokenBucketThrottleMixin, SimpleRateThrottle):
     """
     AI service endpointlari uchun maxsus throttle.
     Anonim foydalanuvchilar uchun qattiqroq limit.
@@ -23,7 +217,7 @@ class AIServiceThrottle(SimpleRateThrottle):
         }
 
 
-class AIServiceAnonThrottle(SimpleRateThrottle):
+class AIServiceAnonThrottle(TokenBucketThrottleMixin, SimpleRateThrottle):
     """
     Faqat anonim foydalanuvchilar uchun qattiqroq limit.
     Soatiga 10 ta so'rov.
@@ -41,7 +235,7 @@ class AIServiceAnonThrottle(SimpleRateThrottle):
         }
 
 
-class SymptomCheckThrottle(SimpleRateThrottle):
+class SymptomCheckThrottle(TokenBucketThrottleMixin, SimpleRateThrottle):
     """
     Symptom check uchun kunlik limit.
     """
@@ -10,7 +10,10 @@ from .views import (
     get_symptoms_list,
     get_specializations,
     get_check_history,
-    ai_chat
+    ai_chat,
+    cache_stats,
+    job_stream,
+    agent_chat_stream
 )
 
 
@@ -28,6 +31,10 @@ def ai_root(request):
             'specializations': '/api/ai/specializations/',
             'history': '/api/ai/history/',
             'chat': '/api/ai/chat/',
+            'agent_stream': '/api/ai/agent/stream/',
+            'cache_stats': '/api/ai/cache/stats/',
+            'job_status': '/api/ai/consultations/jobs/<job_id>/',
+            'job_stream': '/api/ai/jobs/<job_id>/stream/',
         }
     })
 
@@ -51,6 +58,13 @@ urlpatterns = [
 
     # Chat
     path('chat/', ai_chat, name='ai-chat'),
+    path('agent/stream/', agent_chat_stream, name='agent-chat-stream'),
+
+    # Async tahlil natijasi (SSE)
+    path('jobs/<uuid:job_id>/stream/', job_stream, name='job-stream'),
+
+    # Cache statistikasi (admin)
+    path('cache/stats/', cache_stats, name='cache-stats'),
 
     # Router (consultations ViewSet)
     path('', include(router.urls)),
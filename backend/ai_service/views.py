@@ -1,13 +1,24 @@
 # ai_service/views.py
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes, throttle_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.conf import settings
+from django.http import StreamingHttpResponse, JsonResponse
 from django.utils import timezone
+from admin_panel.views import IsAdminUser
 
 # Models
-from .models import SymptomCheck, Symptom, MedicalCondition, AIConsultation
+from .models import SymptomCheck, Symptom, MedicalCondition, AIConsultation, AIAnalysisJob
+from .response_cache import consultation_cache, ALL_CACHES
+from . import jobs as ai_jobs
+from .model_health import model_health
+from .streaming import EventStreamRenderer, iterate_in_thread, sse_event
+from .matcher import KeywordMatcher
+from .classifier import get_classifier
+from .singleflight import analysis_flight, ALL_FLIGHTS
+from .metering import meter, generate_text, render_prometheus
 
 # Gemini API
 try:
@@ -19,7 +30,7 @@ except ImportError:
 
 # Doctor models
 try:
-    from doctors.models import Doctor, Specialization
+    from doctors.recommendations import recommendations
 
     DOCTORS_AVAILABLE = True
 except ImportError:
@@ -221,6 +232,58 @@ SPECIALIZATION_INFO = {
 }
 
 
+# ==================== KEYWORD MATCHERS ====================
+# _local_analysis kategoriyalari - tartib teng ball bo'lganda ustunlikni belgilaydi
+LOCAL_ANALYSIS_KEYWORDS = [
+    ('emergency', ['hushdan ket', 'tutqanoq', 'qon ket', 'nafas olmayman']),
+    ('cardio', ['yurak', 'ko\'krak og\'ri', 'nafas qisil', 'yurak uris']),
+    ('headache', ['bosh og\'ri', 'migren', 'bosh aylan', 'bosh']),
+    ('cold', ['isitma', 'gripp', 'shamolla', 'sovuq', 'yo\'tal', 'burun']),
+    ('digestive', ['qorin', 'oshqozon', 'ich', 'ko\'ngil aynish', 'qusish']),
+    ('skin', ['teri', 'toshma', 'qichish', 'allergiya', 'yara']),
+    ('joints', ['bo\'g\'im', 'bel', 'suyak', 'tizza', 'oyoq', 'qo\'l og\'ri']),
+    ('fatigue', ['holsiz', 'charchoq', 'kuchsiz', 'tez charchay']),
+]
+LOCAL_ANALYSIS_PRIORITY = {category: i for i, (category, _) in enumerate(LOCAL_ANALYSIS_KEYWORDS)}
+
+# Ko'p so'zli (aniqroq) kalit ko'proq ball beradi
+LOCAL_ANALYSIS_MATCHER = KeywordMatcher(
+    (keyword, category, len(keyword.split()))
+    for category, keywords in LOCAL_ANALYSIS_KEYWORDS
+    for keyword in keywords
+)
+
+
+def _build_symptom_key_matcher():
+    """
+    SYMPTOM_CONDITION_MAP kalitlari: to'liq kalit ('key', kalit) va uning alohida
+    so'zlari ('word', kalit). So'z og'irligi - shu so'z nechta kalitda bo'lsa, shuncha kam.
+    """
+    patterns = [(key, ('key', key), len(key.split())) for key in SYMPTOM_CONDITION_MAP]
+    word_keys = {}
+    for key in SYMPTOM_CONDITION_MAP:
+        for word in key.split():
+            if len(word) >= 3:
+                word_keys.setdefault(word, []).append(key)
+    for word, keys in word_keys.items():
+        for key in keys:
+            patterns.append((word, ('word', key), 1 / len(keys)))
+    return KeywordMatcher(patterns)
+
+
+SYMPTOM_KEY_MATCHER = _build_symptom_key_matcher()
+
+
+def local_analysis_category(text):
+    """Erkin matn -> _local_analysis kategoriyasi (topilmasa None)"""
+    scores = LOCAL_ANALYSIS_MATCHER.scores(text)
+    if not scores:
+        return None
+    if 'emergency' in scores:
+        return 'emergency'
+    return max(scores, key=lambda category: (scores[category], -LOCAL_ANALYSIS_PRIORITY[category]))
+
+
 # ==================== ANALYSIS FUNCTION ====================
 def analyze_symptoms_local(symptoms: list, age: int = None, gender: str = None, severity: str = "moderate") -> dict:
     """Alomatlarni lokal tahlil qilish"""
@@ -243,41 +306,50 @@ def analyze_symptoms_local(symptoms: list, age: int = None, gender: str = None,
     max_urgency = "low"
     urgency_order = {"low": 0, "normal": 1, "high": 2, "emergency": 3}
 
+    def add_symptom_data(data, symptom):
+        nonlocal max_urgency
+        for condition in data["conditions"]:
+            if condition in all_conditions:
+                all_conditions[condition]["count"] += 1
+                all_conditions[condition]["symptoms"].append(symptom)
+            else:
+                all_conditions[condition] = {"name": condition, "count": 1, "symptoms": [symptom]}
+
+        for spec in data["specializations"]:
+            if spec in all_specs:
+                all_specs[spec]["count"] += 1
+            else:
+                all_specs[spec] = {"name": spec, "count": 1}
+
+        if data.get("first_aid"):
+            all_first_aid.extend(data["first_aid"])
+
+        if urgency_order.get(data["urgency"], 0) > urgency_order.get(max_urgency, 0):
+            max_urgency = data["urgency"]
+
     for symptom in symptoms:
         symptom_lower = symptom.lower().strip()
 
         # To'g'ridan-to'g'ri moslik
         if symptom_lower in SYMPTOM_CONDITION_MAP:
-            data = SYMPTOM_CONDITION_MAP[symptom_lower]
-
-            for condition in data["conditions"]:
-                if condition in all_conditions:
-                    all_conditions[condition]["count"] += 1
-                    all_conditions[condition]["symptoms"].append(symptom)
-                else:
+            add_symptom_data(SYMPTOM_CONDITION_MAP[symptom_lower], symptom)
+            continue
+
+        # Erkin matn - barcha kalitlar bitta o'tishda
+        scores = SYMPTOM_KEY_MATCHER.scores(symptom_lower)
+        full_keys = [key for kind, key in scores if kind == 'key']
+        if full_keys:
+            for key in full_keys:
+                add_symptom_data(SYMPTOM_CONDITION_MAP[key], symptom)
+            continue
+
+        # Qisman moslik - eng ko'p ball olgan kalit
+        if scores:
+            _, best_key = max(scores, key=scores.get)
+            for condition in SYMPTOM_CONDITION_MAP[best_key]["conditions"][:2]:
+                if condition not in all_conditions:
                     all_conditions[condition] = {"name": condition, "count": 1, "symptoms": [symptom]}
 
-            for spec in data["specializations"]:
-                if spec in all_specs:
-                    all_specs[spec]["count"] += 1
-                else:
-                    all_specs[spec] = {"name": spec, "count": 1}
-
-            if data.get("first_aid"):
-                all_first_aid.extend(data["first_aid"])
-
-            if urgency_order.get(data["urgency"], 0) > urgency_order.get(max_urgency, 0):
-                max_urgency = data["urgency"]
-
-        # Qisman moslik
-        else:
-            for key, data in SYMPTOM_CONDITION_MAP.items():
-                if symptom_lower in key or key in symptom_lower:
-                    for condition in data["conditions"][:2]:
-                        if condition not in all_conditions:
-                            all_conditions[condition] = {"name": condition, "count": 1, "symptoms": [symptom]}
-                    break
-
     # Natijalarni formatlash
     sorted_conditions = sorted(all_conditions.values(), key=lambda x: x["count"], reverse=True)[:5]
     sorted_specs = sorted(all_specs.values(), key=lambda x: x["count"], reverse=True)[:3]
@@ -345,6 +417,89 @@ def analyze_symptoms_local(symptoms: list, age: int = None, gender: str = None,
     return result
 
 
+# ==================== ASYNC JOBS ====================
+JOB_STREAM_TIMEOUT = 60  # sekund
+JOB_STREAM_INTERVAL = 0.5
+
+
+def can_view_job(user, job):
+    """Egasi bor vazifa natijasi (tibbiy ma'lumot) faqat egasiga yoki adminga"""
+    if job.user_id is None:
+        return True
+    return user is not None and user.is_authenticated and (user.pk == job.user_id or user.is_staff)
+
+
+async def _stream_user(request):
+    """
+    SSE foydalanuvchisi - EventSource header yubora olmaydi, shuning uchun
+    ?token=<access token> (yoki Authorization: Bearer, yoki sessiya).
+    """
+    from chat.middleware import get_user_from_token
+
+    token = request.GET.get('token')
+    if not token:
+        parts = request.headers.get('Authorization', '').split()
+        if len(parts) == 2 and parts[0].lower() == 'bearer':
+            token = parts[1]
+    if token:
+        return await get_user_from_token(token)
+    return await request.auser()
+
+
+def job_to_dict(job):
+    data = {
+        'job_id': str(job.id),
+        'status': job.status,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == 'done':
+        data['result'] = job.result
+    elif job.status == 'failed':
+        data['error'] = job.error
+    return data
+
+
+async def job_stream(request, job_id):
+    """
+    Async tahlil natijasi - Server-Sent Events.
+    Holat o'zgarganda "status" hodisasi, tugaganda "result" hodisasi yuboriladi.
+    Async view - kutish paytida worker band qilinmaydi (ASGI).
+    Egasi bor vazifa uchun ?token=<access token> kerak.
+    """
+    import asyncio
+    import time
+
+    job = await AIAnalysisJob.objects.filter(pk=job_id).afirst()
+    if job is None or not can_view_job(await _stream_user(request), job):
+        return JsonResponse({'error': 'Vazifa topilmadi'}, status=404)
+
+    async def events():
+        last_status = None
+        deadline = time.monotonic() + JOB_STREAM_TIMEOUT
+        while time.monotonic() < deadline:
+            job = await ai_jobs.aexpire_stale(await AIAnalysisJob.objects.aget(pk=job_id))
+            if job.status != last_status:
+                last_status = job.status
+                yield sse_event('status', {'status': job.status})
+            if job.is_finished:
+                yield sse_event('result', job_to_dict(job))
+                return
+            yield ": keep-alive\n\n"
+            await asyncio.sleep(JOB_STREAM_INTERVAL)
+        yield sse_event('timeout', {})
+
+    return event_stream_response(events())
+
+
+def event_stream_response(events):
+    """SSE javobi - proksi (nginx) buferlashini o'chirib"""
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ==================== AI CONSULTATION VIEWSET ====================
 from .throttling import AIServiceThrottle, AIServiceAnonThrottle, SymptomCheckThrottle
 
@@ -375,55 +530,186 @@ class AIConsultationViewSet(viewsets.ViewSet):
         if not symptoms_text:
             return Response({'error': 'Iltimos, alomatlaringizni kiriting'}, status=400)
 
-        try:
-            # Gemini bilan tahlil
-            if GEMINI_AVAILABLE:
-                api_key = getattr(settings, 'GEMINI_API_KEY', None)
-                if api_key:
-                    try:
-                        result = self._analyze_with_gemini(symptoms_text, api_key)
-                        doctors = self._find_doctors(result.get('specialization_key', 'terapevt'))
-
-                        # Bazaga saqlash
-                        if request.user.is_authenticated:
-                            AIConsultation.objects.create(
-                                user=request.user,
-                                symptoms=symptoms_text,
-                                ai_analysis=result.get('analysis', ''),
-                                urgency_level=result.get('severity', "o'rta"),
-                                recommended_specialist=result.get('specialization', 'Terapevt'),
-                                first_aid_tips=result.get('first_aid', []),
-                                warnings=result.get('warning_signs', [])
-                            )
-
-                        return Response({
-                            'success': True,
-                            'symptoms': symptoms_text,
-                            **result,
-                            'recommended_doctors': doctors,
-                            'disclaimer': '⚠️ Bu AI tahlili faqat ma\'lumot uchun.'
-                        })
-                    except Exception as e:
-                        print(f"Gemini error: {e}")
-
-            # Lokal tahlil
-            result = self._local_analysis(symptoms_text)
-            doctors = self._find_doctors(result.get('specialization_key', 'terapevt'))
+        # Shaxsiy promptlar (tibbiy tarix bilan) cache dan o'tkazib yuboriladi
+        personalized = bool(request.data.get('personalized') or request.data.get('medical_history'))
+        user_id = request.user.pk if request.user.is_authenticated else None
+
+        # Async rejim - vazifa navbatga qo'yiladi, natija polling/SSE orqali olinadi
+        if request.data.get('async') or request.query_params.get('mode') == 'async':
+            try:
+                job = ai_jobs.submit(symptoms_text, user_id, self._build_analysis,
+                                     symptoms_text, user_id, personalized)
+            except ai_jobs.QueueFull:
+                return Response(
+                    {'success': False, 'error': 'Server band, birozdan keyin qayta urinib ko\'ring'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '5'}
+                )
 
             return Response({
                 'success': True,
-                'symptoms': symptoms_text,
-                **result,
-                'recommended_doctors': doctors,
-                'disclaimer': '⚠️ Bu AI tahlili faqat ma\'lumot uchun.'
-            })
+                'job_id': str(job.id),
+                'status': job.status,
+                'poll_url': f'/api/ai/consultations/jobs/{job.id}/',
+                'stream_url': f'/api/ai/jobs/{job.id}/stream/',
+            }, status=status.HTTP_202_ACCEPTED)
 
+        try:
+            return Response(self._build_analysis(symptoms_text, user_id, personalized))
         except Exception as e:
             return Response({'success': False, 'error': str(e)}, status=500)
 
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>[0-9a-f-]+)',
+            permission_classes=[AllowAny], throttle_classes=[])
+    def job_status(self, request, job_id=None):
+        """Async tahlil holati (polling)"""
+        job = AIAnalysisJob.objects.filter(pk=job_id).first()
+        if not job or not can_view_job(request.user, job):
+            return Response({'error': 'Vazifa topilmadi'}, status=404)
+        return Response(job_to_dict(ai_jobs.expire_stale(job)))
+
+    def _build_analysis(self, symptoms_text: str, user_id=None, personalized: bool = False) -> dict:
+        """To'liq tahlil javobi (sync va async rejim uchun umumiy)"""
+        with meter.request('consultation') as metered:
+            return self._analysis_response(symptoms_text, user_id, personalized, metered)
+
+    def _analysis_response(self, symptoms_text: str, user_id, personalized: bool, metered) -> dict:
+        # Lokal klassifikator - ishonchli bo'lsa LLM chaqirilmaydi
+        if not personalized:
+            result = self._classifier_analysis(symptoms_text)
+            if result is not None:
+                metered.path = 'classifier'
+                return {
+                    'success': True,
+                    'symptoms': symptoms_text,
+                    **result,
+                    'recommended_doctors': self._find_doctors(result['specialization_key']),
+                    'disclaimer': '⚠️ Bu AI tahlili faqat ma\'lumot uchun.'
+                }
+
+        # Gemini bilan tahlil
+        if GEMINI_AVAILABLE:
+            api_key = getattr(settings, 'GEMINI_API_KEY', None)
+            if api_key:
+                try:
+                    result = consultation_cache.get(symptoms_text, personalized=personalized)
+                    cached = result is not None
+                    if cached:
+                        metered.path = 'cache'
+                    else:
+                        result = self._coalesced_gemini(symptoms_text, api_key, personalized)
+                        # Model chaqirilmagan bo'lsa - boshqa so'rov natijasi kutildi
+                        metered.path = 'llm' if metered.attempts else 'coalesced'
+                    doctors = self._find_doctors(result.get('specialization_key', 'terapevt'))
+
+                    # Bazaga saqlash
+                    if user_id:
+                        AIConsultation.objects.create(
+                            user_id=user_id,
+                            symptoms=symptoms_text,
+                            ai_analysis=result.get('analysis', ''),
+                            urgency_level=result.get('severity', "o'rta"),
+                            recommended_specialist=result.get('specialization', 'Terapevt'),
+                            first_aid_tips=result.get('first_aid', []),
+                            warnings=result.get('warning_signs', [])
+                        )
+
+                    return {
+                        'success': True,
+                        'symptoms': symptoms_text,
+                        **result,
+                        'recommended_doctors': doctors,
+                        'cached': cached,
+                        'disclaimer': '⚠️ Bu AI tahlili faqat ma\'lumot uchun.'
+                    }
+                except Exception as e:
+                    print(f"Gemini error: {e}")
+                    metered.path = 'local_fallback'
+
+        # Lokal tahlil
+        if metered.path != 'local_fallback':
+            metered.path = 'local'
+        result = self._local_analysis(symptoms_text)
+        doctors = self._find_doctors(result.get('specialization_key', 'terapevt'))
+
+        return {
+            'success': True,
+            'symptoms': symptoms_text,
+            **result,
+            'recommended_doctors': doctors,
+            'disclaimer': '⚠️ Bu AI tahlili faqat ma\'lumot uchun.'
+        }
+
+    def _coalesced_gemini(self, symptoms: str, api_key: str, personalized: bool) -> dict:
+        """
+        Gemini tahlili - bir xil alomatlar bilan bir vaqtda kelgan so'rovlar bitta
+        chaqiruvni kutadi. Shaxsiy so'rovlar birlashtirilmaydi.
+        """
+        def call():
+            # Bo'sh LLM slot bo'lmasa (LLMBusy) - lokal tahlilga o'tiladi
+            with ai_jobs.llm_slot():
+                result = self._analyze_with_gemini(symptoms, api_key)
+            consultation_cache.set(symptoms, result, personalized=personalized)
+            return result
+
+        key = None if personalized else consultation_cache.make_key(symptoms)
+        if key is None:
+            return call()
+        return analysis_flight.do(key, call)
+
+    def _classifier_analysis(self, symptoms: str):
+        """
+        Tarixiy tekshiruvlardan o'qitilgan klassifikator. Ikkala bosh (mutaxassis, daraja)
+        ishonchli bo'lmasa None - so'rov LLM ga o'tadi. Natija AIConsultation ga yozilmaydi,
+        aks holda model o'z bashoratlaridan qayta o'qiydi.
+        """
+        classifier = get_classifier()
+        if classifier is None:
+            return None
+        prediction = classifier.confident(symptoms)
+        if prediction is None:
+            return None
+
+        spec_key, spec_probability = prediction['specialization']
+        severity, severity_probability = prediction['urgency']
+        category = local_analysis_category(symptoms)
+        result = self._local_analysis(symptoms)
+        if category == 'emergency' or (category is not None and result['specialization_key'] != spec_key):
+            # Qoidalar boshqa yo'nalishni ko'rsatadi - matn va tavsiya bir-biriga zid bo'lmasligi uchun LLM ga
+            return None
+
+        specialization = next(
+            (name for name in SPECIALIZATION_INFO if name.lower() == spec_key), spec_key.capitalize()
+        )
+        if category is None:
+            # Qoidalar kategoriya topmadi - tahlil matni bashorat qilingan mutaxassislik bo'yicha
+            info = SPECIALIZATION_INFO.get(specialization, {})
+            result.update({
+                'analysis': (
+                    f'Sizning alomatlaringiz ("{symptoms}") {specialization.lower()} ko\'rigini talab qilishi mumkin'
+                    f'{" - " + info["desc"].lower() if info.get("desc") else ""}. '
+                    'Aniq tashxis uchun shifokorga ko\'rining.'
+                ),
+                'possible_conditions': [
+                    {'name': 'Umumiy holat', 'probability': 50,
+                     'description': f'{info.get("uz", specialization)} tekshiruvi kerak'}
+                ],
+                'when_to_see_doctor': f'3-5 kun ichida - {specialization.lower()}ga ko\'rining',
+            })
+        result.update({
+            'severity': severity,
+            'specialization_key': spec_key,
+            'specialization': specialization,
+            'source': 'classifier',
+            'confidence': {
+                'specialization': round(spec_probability, 3),
+                'severity': round(severity_probability, 3),
+            },
+        })
+        return result
+
     def _analyze_with_gemini(self, symptoms: str, api_key: str) -> dict:
-        """Gemini API bilan tahlil - retry logic bilan"""
-        import time
+        """Gemini API bilan tahlil - model breakerlari bilan"""
         import json
         import re
 
@@ -470,62 +756,42 @@ Javobni O'ZBEK TILIDA ber. Kasallik nomlarini O'zbek va Lotin tillarida ber (mas
 Har bir kasallik uchun ehtimollik foizini ber (0-100).
 Jiddiy holatlarni aniq belgilab ber."""
 
-        last_error = None
+        # Ochiq breakerli modellar kutmasdan o'tkazib yuboriladi
+        text = model_health.call(
+            models_to_try,
+            lambda model_name: generate_text(model_name, prompt, 'consultation')
+        ).strip()
 
-        for model_name in models_to_try:
-            for attempt in range(2):  # 2 marta urinish
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-                    text = response.text.strip()
-
-                    # JSON ni ajratib olish
-                    if '```' in text:
-                        match = re.search(r'```(?:json)?\s*([\s\S]*?)```', text)
-                        if match:
-                            text = match.group(1).strip()
-
-                    if not text.startswith('{'):
-                        start = text.find('{')
-                        end = text.rfind('}')
-                        if start != -1 and end != -1:
-                            text = text[start:end+1]
-
-                    result = json.loads(text)
-
-                    # Default qiymatlar
-                    if 'possible_conditions' not in result:
-                        result['possible_conditions'] = []
-                    if 'severity' not in result:
-                        result['severity'] = "o'rta"
-                    if 'specialization_key' not in result:
-                        result['specialization_key'] = 'terapevt'
-
-                    return result
+        # JSON ni ajratib olish
+        if '```' in text:
+            match = re.search(r'```(?:json)?\s*([\s\S]*?)```', text)
+            if match:
+                text = match.group(1).strip()
 
-                except Exception as e:
-                    last_error = e
-                    error_str = str(e).lower()
+        if not text.startswith('{'):
+            start = text.find('{')
+            end = text.rfind('}')
+            if start != -1 and end != -1:
+                text = text[start:end+1]
 
-                    # Quota xatosi - boshqa modelga o'tish
-                    if '429' in str(e) or 'quota' in error_str or 'rate' in error_str:
-                        print(f"Gemini quota error ({model_name}): {e}")
-                        time.sleep(1)  # 1 soniya kutish
-                        break  # Boshqa modelga o'tish
+        result = json.loads(text)
 
-                    # Boshqa xato - qayta urinish
-                    print(f"Gemini error ({model_name}, attempt {attempt + 1}): {e}")
-                    time.sleep(0.5)
+        # Default qiymatlar
+        if 'possible_conditions' not in result:
+            result['possible_conditions'] = []
+        if 'severity' not in result:
+            result['severity'] = "o'rta"
+        if 'specialization_key' not in result:
+            result['specialization_key'] = 'terapevt'
 
-        # Barcha urinishlar muvaffaqiyatsiz - xato qaytarish
-        raise last_error or Exception("Gemini API bilan bog'lanib bo'lmadi")
+        return result
 
     def _local_analysis(self, symptoms: str) -> dict:
-        """Lokal tahlil - yaxshilangan"""
-        symptoms_lower = symptoms.lower()
+        """Lokal tahlil - kategoriya kalit so'zlar avtomati bilan bitta o'tishda aniqlanadi"""
+        category = local_analysis_category(symptoms)
 
         # Shoshilinch holatlar
-        if any(w in symptoms_lower for w in ['hushdan ket', 'tutqanoq', 'qon ket', 'nafas olmayman']):
+        if category == 'emergency':
             return {
                 'analysis': 'SHOSHILINCH HOLAT! Bu alomatlar jiddiy tibbiy yordamni talab qiladi. Darhol 103 ga qo\'ng\'iroq qiling!',
                 'possible_conditions': [
@@ -541,7 +807,7 @@ Jiddiy holatlarni aniq belgilab ber."""
             }
 
         # Yurak va nafas
-        if any(w in symptoms_lower for w in ['yurak', 'ko\'krak og\'ri', 'nafas qisil', 'yurak uris']):
+        if category == 'cardio':
             return {
                 'analysis': 'Sizning alomatlaringiz yurak-qon tomir tizimi bilan bog\'liq bo\'lishi mumkin. Ko\'krak og\'rig\'i va nafas qisilishi jiddiy tekshiruvni talab qiladi.',
                 'possible_conditions': [
@@ -561,7 +827,7 @@ Jiddiy holatlarni aniq belgilab ber."""
             }
 
         # Bosh og'rig'i
-        if any(w in symptoms_lower for w in ['bosh og\'ri', 'migren', 'bosh aylan', 'bosh']):
+        if category == 'headache':
             return {
                 'analysis': 'Bosh og\'rig\'i va bosh aylanishi turli sabablarga ko\'ra yuzaga kelishi mumkin: stress, uyqusizlik, qon bosimi o\'zgarishi yoki migren.',
                 'possible_conditions': [
@@ -581,7 +847,7 @@ Jiddiy holatlarni aniq belgilab ber."""
             }
 
         # Isitma va gripp
-        if any(w in symptoms_lower for w in ['isitma', 'gripp', 'shamolla', 'sovuq', 'yo\'tal', 'burun']):
+        if category == 'cold':
             return {
                 'analysis': 'Sizning alomatlaringiz virusli infeksiya (ORVI) yoki grippga xos. Isitma organizmning infeksiyaga qarshi kurash belgisidir.',
                 'possible_conditions': [
@@ -601,7 +867,7 @@ Jiddiy holatlarni aniq belgilab ber."""
             }
 
         # Qorin og'rig'i
-        if any(w in symptoms_lower for w in ['qorin', 'oshqozon', 'ich', 'ko\'ngil aynish', 'qusish']):
+        if category == 'digestive':
             return {
                 'analysis': 'Qorin og\'rig\'i va hazm tizimi bilan bog\'liq alomatlar. Bu gastrit, zaharlanish yoki icak infeksiyasi bo\'lishi mumkin.',
                 'possible_conditions': [
@@ -621,7 +887,7 @@ Jiddiy holatlarni aniq belgilab ber."""
             }
 
         # Teri muammolari
-        if any(w in symptoms_lower for w in ['teri', 'toshma', 'qichish', 'allergiya', 'yara']):
+        if category == 'skin':
             return {
                 'analysis': 'Teri bilan bog\'liq alomatlar allergik reaksiya, dermatit yoki boshqa teri kasalliklari bo\'lishi mumkin.',
                 'possible_conditions': [
@@ -641,7 +907,7 @@ Jiddiy holatlarni aniq belgilab ber."""
             }
 
         # Bo'g'im va suyak og'rig'i
-        if any(w in symptoms_lower for w in ['bo\'g\'im', 'bel', 'suyak', 'tizza', 'oyoq', 'qo\'l og\'ri']):
+        if category == 'joints':
             return {
                 'analysis': 'Bo\'g\'im va suyak og\'riqlari artrit, artroz yoki muskulyar muammolar sababli bo\'lishi mumkin.',
                 'possible_conditions': [
@@ -661,7 +927,7 @@ Jiddiy holatlarni aniq belgilab ber."""
             }
 
         # Umumiy holsizlik
-        if any(w in symptoms_lower for w in ['holsiz', 'charchoq', 'kuchsiz', 'tez charchay']):
+        if category == 'fatigue':
             return {
                 'analysis': 'Holsizlik va charchoq ko\'p sabablarga ko\'ra bo\'lishi mumkin: anemiya, vitamin yetishmovchiligi, qalqonsimon bez muammolari yoki stress.',
                 'possible_conditions': [
@@ -702,37 +968,14 @@ Jiddiy holatlarni aniq belgilab ber."""
         if not DOCTORS_AVAILABLE:
             return []
 
-        doctors = []
         try:
-            spec_mapping = {
-                'terapevt': ['Terapevt', 'General'],
-                'kardiolog': ['Kardiolog', 'Cardio'],
-                'nevrolog': ['Nevrolog', 'Neuro'],
-                'pediatr': ['Pediatr'],
-                'dermatolog': ['Dermatolog'],
-                'lor': ['LOR', 'ENT'],
-            }
-
-            search_names = spec_mapping.get(specialization_key.lower(), ['Terapevt'])
-
-            for name in search_names:
-                specs = Specialization.objects.filter(name__icontains=name)
-                for spec in specs:
-                    for doc in Doctor.objects.filter(specialization=spec, is_available=True)[:3]:
-                        doctors.append({
-                            'id': str(doc.id),
-                            'name': f"Dr. {doc.user.first_name} {doc.user.last_name}" if doc.user else "Shifokor",
-                            'specialization': spec.name_uz or spec.name,
-                            'hospital': doc.hospital.name if doc.hospital else "N/A",
-                            'rating': float(doc.rating or 4.5),
-                            'price': int(doc.consultation_price or 0)
-                        })
-                        if len(doctors) >= 3:
-                            break
+            # Tayyor xarita - so'rov vaqtida DB ga murojaat yo'q
+            doctors = recommendations.get(specialization_key, limit=3) or recommendations.get('terapevt', limit=3)
         except Exception as e:
             print(f"Doctor search error: {e}")
+            return []
 
-        return doctors
+        return [{**doctor, 'name': f"Dr. {doctor['name']}" if doctor['name'] else "Shifokor"} for doctor in doctors]
 
 
 # ==================== SYMPTOM CHECK API ====================
@@ -891,4 +1134,64 @@ def ai_chat(request):
     return Response({
         'message': response,
         'suggestions': ["Alomatlarimni tekshir", "Shifokor qidirish"]
-    })
\ No newline at end of file
+    })
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+@throttle_classes([AIServiceThrottle, AIServiceAnonThrottle])
+def agent_chat_stream(request):
+    """
+    AI agent bilan suhbat - javob tokenlari SSE orqali kelishi bilan yuboriladi.
+
+    POST /api/ai/agent/stream/
+    {"message": "Boshim og'riyapti"}
+
+    Hodisalar: token, intent, action, response_delta, response, suggestions,
+    action_result, done (yoki error)
+    """
+    from .agent import HealthAgent
+
+    message = (request.data.get('message') or '').strip()
+    if not message:
+        return Response({'error': 'Xabar kiritilmagan'}, status=status.HTTP_400_BAD_REQUEST)
+
+    user = request.user if request.user.is_authenticated else None
+    agent = HealthAgent(user=user)
+
+    async def events():
+        # LLM oqimi bloklovchi - so'rov threadida qadamma-qadam, javob event loop dan yuboriladi
+        async for event, data in iterate_in_thread(agent.stream_message(message)):
+            yield sse_event(event, data)
+
+    return event_stream_response(events())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """AI natijalari cache statistikasi (hit-rate) va LLM modellari holati"""
+    return Response({
+        'caches': [c.stats() for c in ALL_CACHES],
+        'models': model_health.stats(),
+        'single_flight': [f.stats() for f in ALL_FLIGHTS],
+    })
+
+
+def prometheus_metrics(request):
+    """
+    LLM metrikasi - Prometheus text format (/metrics).
+    Oddiy Django view: scraper "Authorization: Bearer <METRICS_TOKEN>" yuboradi
+    (DRF JWT autentifikatsiyasi bu tokenni rad etgan bo'lardi), admin sessiyasi ham o'tadi.
+    """
+    from django.http import HttpResponse
+
+    token = getattr(settings, 'LLM_METERING', {}).get('METRICS_TOKEN')
+    authorized = bool(token) and request.META.get('HTTP_AUTHORIZATION', '') == f'Bearer {token}'
+    if not authorized and not IsAdminUser().has_permission(request, None):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    # Shu jarayonning hali yozilmagan agregatlari ham ko'rinsin
+    meter.flush()
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,17 +2,23 @@
 from django.contrib import admin
 
 try:
-    from .models import AirQualityRecord, UserAirQualityAlert
+    from .models import AirQualityDaily, AirQualityHourly, AirQualityRecord, UserAirQualityAlert
 
     @admin.register(AirQualityRecord)
     class AirQualityRecordAdmin(admin.ModelAdmin):
-        list_display = ['city', 'aqi', 'main_pollutant', 'temperature', 'recorded_at']
+        list_display = ['city', 'aqi', 'main_pollutant', 'temperature', 'measured_at', 'recorded_at']
         list_filter = ['city', 'recorded_at']
         search_fields = ['city']
         ordering = ['-recorded_at']
         readonly_fields = ['id', 'recorded_at']
 
 
+    @admin.register(AirQualityHourly, AirQualityDaily)
+    class AirQualityRollupAdmin(admin.ModelAdmin):
+        list_display = ['__str__', 'city', 'count', 'aqi_min', 'aqi_max']
+        list_filter = ['city']
+
+
     @admin.register(UserAirQualityAlert)
     class UserAirQualityAlertAdmin(admin.ModelAdmin):
         list_display = ['user', 'city', 'alert_threshold', 'is_enabled', 'has_asthma', 'created_at']
@@ -0,0 +1,206 @@
+# air_quality/history.py
+"""
+Havo sifati tarixi - IQAir o'lchovlari (AirQualityRecord) va ularning agregatlari.
+
+Har bir haqiqiy IQAir javobi (readings.refresh) bitta yozuv sifatida saqlanadi va shu
+tranzaksiyada soatlik (AirQualityHourly) hamda kunlik (AirQualityDaily, mahalliy sana)
+agregatlarga qo'shiladi: count, aqi_sum, aqi_min, aqi_max. Bir o'lchov (city, measured_at)
+bir marta hisoblanadi - IQAir soatiga bir yangilanadi, beat esa tez-tez so'raydi.
+
+Tarix istalgan oraliq uchun agregatlardan o'qiladi: oraliq HOURLY_MAX_SPAN dan katta yoki
+bir nuqta bir kundan keng bo'lsa kunlik jadval, aks holda soatlik. Qatorlar ko'p bo'lsa
+teng kenglikdagi `points` ta oraliqqa birlashtiriladi - 1 yillik grafik ~365 qator o'qiydi.
+"""
+import datetime
+import math
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_POINTS = 100
+MAX_POINTS = 500
+MAX_DAYS = 3 * 365
+HOURLY_MAX_SPAN = datetime.timedelta(days=31)
+
+
+# ---------- Yozish ----------
+
+def _bump(model, lookup, aqi):
+    updated = model.objects.filter(**lookup).update(
+        count=F('count') + 1,
+        aqi_sum=F('aqi_sum') + aqi,
+        aqi_min=Least('aqi_min', aqi),
+        aqi_max=Greatest('aqi_max', aqi),
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=1, aqi_sum=aqi, aqi_min=aqi, aqi_max=aqi, **lookup)
+    except IntegrityError:
+        # Boshqa worker shu oraliqni hozirgina yaratdi
+        _bump(model, lookup, aqi)
+
+
+def record(city_info, api_data):
+    """IQAir javobini saqlash va agregatlarga qo'shish; yangi o'lchov bo'lsa True"""
+    from .models import AirQualityDaily, AirQualityHourly, AirQualityRecord
+
+    pollution = api_data.get('current', {}).get('pollution', {})
+    weather = api_data.get('current', {}).get('weather', {})
+    aqi = pollution.get('aqius')
+    if aqi is None:
+        return False
+    measured_at = parse_datetime(pollution.get('ts') or '') or timezone.now()
+    if timezone.is_naive(measured_at):
+        measured_at = timezone.make_aware(measured_at, datetime.timezone.utc)
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                AirQualityRecord.objects.create(
+                    city=city_info['city'],
+                    state=city_info['state'],
+                    country=city_info['country'],
+                    aqi=aqi,
+                    main_pollutant=pollution.get('mainus') or 'p2',
+                    temperature=weather.get('tp'),
+                    humidity=weather.get('hu'),
+                    wind_speed=weather.get('ws'),
+                    measured_at=measured_at,
+                )
+        except IntegrityError:
+            # Bu o'lchov allaqachon saqlangan - faqat tasdiqlangan vaqti yangilanadi (readings.stored_entry)
+            AirQualityRecord.objects.filter(
+                city=city_info['city'], measured_at=measured_at
+            ).update(recorded_at=timezone.now())
+            return False
+
+        hour = measured_at.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        _bump(AirQualityHourly, {'city': city_info['city'], 'hour': hour}, aqi)
+        _bump(AirQualityDaily, {'city': city_info['city'], 'date': timezone.localdate(measured_at)}, aqi)
+    return True
+
+
+# ---------- O'qish ----------
+
+def parse_range(params, default_days=7):
+    """
+    So'rov parametrlari -> (start, end, points).
+    `start`/`end` (sana yoki ISO vaqt) yoki `days`; `points` - nuqtalar soni.
+    `days` bilan points berilmasa kuniga bitta nuqta (DEFAULT_POINTS gacha). Noto'g'ri qiymatda ValueError.
+    """
+    end = _parse_moment(params.get('end'), end_of_day=True)
+    start = _parse_moment(params.get('start'))
+    if start is None:
+        days = _integer(params.get('days'), default_days, 'days')
+        if not 1 <= days <= MAX_DAYS:
+            raise ValueError(f"days 1 dan {MAX_DAYS} gacha bo'lishi kerak")
+        # Bugun bilan birga `days` ta to'liq kun (mahalliy vaqt)
+        end = end or _day_start(timezone.localdate() + datetime.timedelta(days=1))
+        start = end - datetime.timedelta(days=days)
+        default_points = min(days, DEFAULT_POINTS)
+    else:
+        default_points = DEFAULT_POINTS
+    end = end or timezone.now()
+    if start >= end:
+        raise ValueError("start end dan oldin bo'lishi kerak")
+    if end - start > datetime.timedelta(days=MAX_DAYS):
+        raise ValueError(f"Oraliq {MAX_DAYS} kundan oshmasligi kerak")
+
+    points = _integer(params.get('points'), default_points, 'points')
+    return start, end, max(1, min(points, MAX_POINTS))
+
+
+def _integer(value, default, name):
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} butun son bo'lishi kerak")
+
+
+def _day_start(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def _parse_moment(value, end_of_day=False):
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is not None:
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(f"Noto'g'ri sana: {value}")
+    return _day_start(date + datetime.timedelta(days=1) if end_of_day else date)
+
+
+def _rows(city, start, end, daily):
+    """[(oraliq boshi, count, aqi_sum, aqi_min, aqi_max)] o'sish tartibida"""
+    from .models import AirQualityDaily, AirQualityHourly
+
+    fields = ('count', 'aqi_sum', 'aqi_min', 'aqi_max')
+    if daily:
+        rows = AirQualityDaily.objects.filter(
+            city=city, date__gte=timezone.localdate(start),
+            date__lte=timezone.localdate(end - datetime.timedelta(microseconds=1))
+        ).order_by('date').values_list('date', *fields)
+        return [(_day_start(date), *rest) for date, *rest in rows]
+    first_hour = start.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return list(AirQualityHourly.objects.filter(
+        city=city, hour__gte=first_hour, hour__lt=end
+    ).order_by('hour').values_list('hour', *fields))
+
+
+def series(city, start, end, points=DEFAULT_POINTS):
+    """
+    Shahar tarixi: {'resolution', 'points': [{'time', 'aqi', 'min', 'max', 'count'}], 'statistics'}.
+    Ma'lumot yo'q oraliqlar tashlab ketiladi (to'qib chiqarilmaydi).
+    """
+    span = end - start
+    daily = span > HOURLY_MAX_SPAN or span / points >= datetime.timedelta(days=1)
+    rows = _rows(city, start, end, daily)
+
+    if len(rows) <= points:
+        buckets = [list(row) for row in rows]
+    else:
+        # Teng kenglikdagi (butun kun/soat) oraliqlar, `points` tadan oshmaydi; o'rtacha count bo'yicha
+        unit = datetime.timedelta(days=1) if daily else datetime.timedelta(hours=1)
+        width = unit * math.ceil(span / unit / points)
+        grouped = {}
+        for moment, count, total, low, high in rows:
+            index = min(max(int((moment - start) / width), 0), points - 1)
+            bucket = grouped.get(index)
+            if bucket is None:
+                grouped[index] = [start + width * index, count, total, low, high]
+            else:
+                bucket[1] += count
+                bucket[2] += total
+                bucket[3] = min(bucket[3], low)
+                bucket[4] = max(bucket[4], high)
+        buckets = [grouped[index] for index in sorted(grouped)]
+
+    count = sum(bucket[1] for bucket in buckets)
+    return {
+        'resolution': 'daily' if daily else 'hourly',
+        'points': [
+            {
+                'time': moment,
+                'aqi': round(total / bucket_count),
+                'min': low,
+                'max': high,
+                'count': bucket_count,
+            }
+            for moment, bucket_count, total, low, high in buckets
+        ],
+        'statistics': {
+            'average': round(sum(bucket[2] for bucket in buckets) / count, 1) if count else None,
+            'min': min((bucket[3] for bucket in buckets), default=None),
+            'max': max((bucket[4] for bucket in buckets), default=None),
+        },
+    }
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('air_quality', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AirQualityDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('aqi_sum', models.PositiveIntegerField(default=0)),
+                ('aqi_min', models.IntegerField()),
+                ('aqi_max', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Kunlik havo sifati',
+                'verbose_name_plural': 'Kunlik havo sifati',
+                'ordering': ['city', 'date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AirQualityHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=100)),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('aqi_sum', models.PositiveIntegerField(default=0)),
+                ('aqi_min', models.IntegerField()),
+                ('aqi_max', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Soatlik havo sifati',
+                'verbose_name_plural': 'Soatlik havo sifati',
+                'ordering': ['city', 'hour'],
+            },
+        ),
+        migrations.AddField(
+            model_name='airqualityrecord',
+            name='measured_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='airqualityrecord',
+            constraint=models.UniqueConstraint(fields=('city', 'measured_at'), name='unique_air_quality_measurement'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='airqualitydaily',
+            unique_together={('city', 'date')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='airqualityhourly',
+            unique_together={('city', 'hour')},
+        ),
+    ]
@@ -18,10 +18,15 @@ class AirQualityRecord(models.Model):
     humidity = models.FloatField(null=True, blank=True)
     wind_speed = models.FloatField(null=True, blank=True)
 
+    # IQAir o'lchov vaqti (pollution.ts) - bir o'lchov ikki marta saqlanmaydi
+    measured_at = models.DateTimeField(null=True, blank=True)
     recorded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-recorded_at']
+        constraints = [
+            models.UniqueConstraint(fields=['city', 'measured_at'], name='unique_air_quality_measurement'),
+        ]
         verbose_name = 'Havo sifati yozuvi'
         verbose_name_plural = 'Havo sifati yozuvlari'
 
@@ -29,6 +34,46 @@ class AirQualityRecord(models.Model):
         return f"{self.city} - AQI: {self.aqi} ({self.recorded_at.strftime('%Y-%m-%d %H:%M')})"
 
 
+class AirQualityHourly(models.Model):
+    """Shahar bo'yicha soatlik AQI agregati (AirQualityRecord yozilganda yangilanadi)"""
+    city = models.CharField(max_length=100)
+    hour = models.DateTimeField()
+
+    count = models.PositiveIntegerField(default=0)
+    aqi_sum = models.PositiveIntegerField(default=0)
+    aqi_min = models.IntegerField()
+    aqi_max = models.IntegerField()
+
+    class Meta:
+        unique_together = ['city', 'hour']
+        ordering = ['city', 'hour']
+        verbose_name = 'Soatlik havo sifati'
+        verbose_name_plural = 'Soatlik havo sifati'
+
+    def __str__(self):
+        return f"{self.city} {self.hour:%Y-%m-%d %H:00}: {self.aqi_sum / self.count:.0f}"
+
+
+class AirQualityDaily(models.Model):
+    """Shahar bo'yicha kunlik AQI agregati (mahalliy sana)"""
+    city = models.CharField(max_length=100)
+    date = models.DateField()
+
+    count = models.PositiveIntegerField(default=0)
+    aqi_sum = models.PositiveIntegerField(default=0)
+    aqi_min = models.IntegerField()
+    aqi_max = models.IntegerField()
+
+    class Meta:
+        unique_together = ['city', 'date']
+        ordering = ['city', 'date']
+        verbose_name = 'Kunlik havo sifati'
+        verbose_name_plural = 'Kunlik havo sifati'
+
+    def __str__(self):
+        return f"{self.city} {self.date}: {self.aqi_sum / self.count:.0f}"
+
+
 class UserAirQualityAlert(models.Model):
     """Foydalanuvchi havo sifati ogohlantirishlari"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -0,0 +1,435 @@
+# air_quality/readings.py
+"""
+Joriy havo sifati - IQAir dan olish va workerlar o'rtasida umumiy cache (stale-while-revalidate).
+
+Har bir shahar uchun Django cache da bitta yozuv: {'data', 'fetched_at', 'retry_at'}.
+    - retry_at gacha - darhol qaytariladi
+    - retry_at dan keyin (STALE_TTL gacha saqlanadi) - darhol qaytariladi, fonda yangilanadi
+    - yozuv yo'q yoki retry_at o'tgan - avval bazadagi oxirgi o'lchov (AirQualityRecord)
+      olinadi (beat boshqa jarayonda yangilagan bo'lishi mumkin), u ham yo'q bo'lsa demo
+Foydalanuvchi so'rovi IQAir ni hech qachon kutmaydi. Yangilash cache.add() lock bilan -
+barcha workerlardan bir shahar uchun bir vaqtda bitta so'rov. IQAir ishlamasa oxirgi haqiqiy
+ma'lumot STALE_TTL gacha berilaveradi (is_stale=True).
+refresh_air_quality (Celery beat) get_cities dagi barcha shaharlarni muddati tugashidan oldin yangilaydi.
+Cache jarayonga xos bo'lsa (LocMemCache) beat faqat o'z cache ini isitadi - web jarayonlar
+yangi ma'lumotni bazadan oladi va IQAir ga o'zlari murojaat qilmaydi.
+Har bir haqiqiy javob tarix uchun saqlanadi (history.record).
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from . import history
+
+logger = logging.getLogger(__name__)
+
+# IQAir API key
+IQAIR_API_KEY = getattr(settings, 'IQAIR_API_KEY', None) or os.environ.get('IQAIR_API_KEY', '')
+
+AQ_SETTINGS = getattr(settings, 'AIR_QUALITY', {})
+FRESH_TTL = AQ_SETTINGS.get('FRESH_TTL', 60 * 60)
+STALE_TTL = AQ_SETTINGS.get('STALE_TTL', 60 * 60 * 12)
+RETRY_TTL = AQ_SETTINGS.get('RETRY_TTL', 60 * 5)
+REFRESH_AHEAD = AQ_SETTINGS.get('REFRESH_AHEAD', 60 * 20)
+REFRESH_SPACING = AQ_SETTINGS.get('REFRESH_SPACING', 13)
+LOCK_TIMEOUT = 60
+KEY_PREFIX = 'air_quality:current:'
+
+
+def get_aqi_info(aqi: int) -> dict:
+    """AQI qiymatiga qarab ma'lumot"""
+    if aqi <= 50:
+        return {
+            'level': 'Yaxshi',
+            'level_en': 'Good',
+            'level_color': 'green',
+            'recommendation': 'Tashqarida faoliyat uchun qulay.',
+            'diseases': [],
+            'icon': '😊',
+            'bg_gradient': 'from-green-400 to-green-600'
+        }
+    elif aqi <= 100:
+        return {
+            'level': "O'rtacha",
+            'level_en': 'Moderate',
+            'level_color': 'yellow',
+            'recommendation': "Sezgir odamlar ehtiyot bo'lishi kerak.",
+            'diseases': ['Astma (ehtiyotkorlik)'],
+            'icon': '😐',
+            'bg_gradient': 'from-yellow-400 to-yellow-600'
+        }
+    elif aqi <= 150:
+        return {
+            'level': 'Sezgir guruhlar uchun zararli',
+            'level_en': 'Unhealthy for Sensitive Groups',
+            'level_color': 'orange',
+            'recommendation': 'Astma va yurak kasalligi bo\'lganlar ehtiyot bo\'lsin.',
+            'diseases': ['Astma', 'Bronxit', 'Allergiya'],
+            'icon': '😷',
+            'bg_gradient': 'from-orange-400 to-orange-600'
+        }
+    elif aqi <= 200:
+        return {
+            'level': 'Zararli',
+            'level_en': 'Unhealthy',
+            'level_color': 'red',
+            'recommendation': 'Tashqarida uzoq vaqt bo\'lishdan saqlaning.',
+            'diseases': ['Astma', 'Bronxit', 'Allergiya', 'Yurak kasalliklari'],
+            'icon': '🤢',
+            'bg_gradient': 'from-red-500 to-red-700'
+        }
+    elif aqi <= 300:
+        return {
+            'level': 'Juda zararli',
+            'level_en': 'Very Unhealthy',
+            'level_color': 'purple',
+            'recommendation': 'Tashqariga chiqishdan saqlaning.',
+            'diseases': ['Astma', 'Bronxit', "O'pka kasalliklari", 'Yurak kasalliklari'],
+            'icon': '🤮',
+            'bg_gradient': 'from-purple-600 to-purple-800'
+        }
+    else:
+        return {
+            'level': 'Xavfli',
+            'level_en': 'Hazardous',
+            'level_color': 'maroon',
+            'recommendation': 'Uyda qoling! Derazalarni yoping.',
+            'diseases': ['Barcha nafas kasalliklari', 'Yurak kasalliklari', "O'tkir allergiya"],
+            'icon': '☠️',
+            'bg_gradient': 'from-red-900 to-gray-900'
+        }
+
+
+def fetch_from_iqair(city: str, state: str, country: str) -> dict:
+    """IQAir API dan ma'lumot olish"""
+    if not IQAIR_API_KEY:
+        logger.warning("IQAir API key not configured")
+        return None
+
+    try:
+        url = "http://api.airvisual.com/v2/city"
+        params = {
+            'city': city,
+            'state': state,
+            'country': country,
+            'key': IQAIR_API_KEY
+        }
+
+        logger.info(f"IQAir API request: city={city}, state={state}, country={country}")
+        response = requests.get(url, params=params, timeout=10)
+
+        logger.info(f"IQAir API response status: {response.status_code}")
+
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('status') == 'success':
+                logger.info(f"IQAir API SUCCESS for {city}")
+                return data['data']
+            else:
+                error_msg = data.get('data', {}).get('message', 'Unknown error')
+                logger.warning(f"IQAir API error: {error_msg}")
+        else:
+            logger.warning(f"IQAir API HTTP {response.status_code}: {response.text[:200]}")
+
+        return None
+
+    except requests.exceptions.Timeout:
+        logger.warning("IQAir API timeout")
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"IQAir request error: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"IQAir unexpected error: {e}")
+        return None
+
+
+def get_demo_data(city: str = 'Toshkent') -> dict:
+    """Demo ma'lumotlar"""
+    base_aqi = {
+        'Toshkent': 75, 'Tashkent': 75,
+        'Samarqand': 55, 'Samarkand': 55,
+        'Buxoro': 65, 'Bukhara': 65,
+        "Farg'ona": 60, 'Fergana': 60,
+        'Namangan': 58,
+        'Andijon': 62, 'Andijan': 62,
+    }.get(city, 70)
+
+    aqi = base_aqi + random.randint(-15, 15)
+    aqi = max(25, min(aqi, 180))
+
+    aqi_info = get_aqi_info(aqi)
+
+    return {
+        'aqi': aqi,
+        'level': aqi_info['level'],
+        'level_en': aqi_info['level_en'],
+        'level_color': aqi_info['level_color'],
+        'recommendation': aqi_info['recommendation'],
+        'diseases': aqi_info['diseases'],
+        'icon': aqi_info['icon'],
+        'bg_gradient': aqi_info['bg_gradient'],
+        'main_pollutant': 'pm25',
+        'main_pollutant_name': 'PM2.5',
+        'weather': {
+            'temperature': random.randint(18, 32),
+            'humidity': random.randint(35, 65),
+            'wind_speed': round(random.uniform(1.5, 6), 1),
+            'pressure': random.randint(1012, 1022),
+            'icon': '01d',
+            'description': 'Ochiq havo'
+        },
+        'city': city,
+        'country': "O'zbekiston",
+        'is_demo': True,
+        'timestamp': timezone.now().isoformat()
+    }
+
+
+# IQAir API uchun O'zbekiston shaharlari mapping
+# IQAir API aniq shahar/state/country nomlarini talab qiladi
+# To'g'ri nomlarni https://www.iqair.com/uzbekistan dan olish mumkin
+CITY_MAPPING = {
+    # Toshkent - IQAir da "Toshkent Shahri" state nomi bilan
+    'Tashkent': {'city': 'Tashkent', 'state': 'Toshkent Shahri', 'country': 'Uzbekistan', 'name_uz': 'Toshkent'},
+    'Toshkent': {'city': 'Tashkent', 'state': 'Toshkent Shahri', 'country': 'Uzbekistan', 'name_uz': 'Toshkent'},
+
+    # Boshqa shaharlar
+    'Samarkand': {'city': 'Samarkand', 'state': 'Samarkand', 'country': 'Uzbekistan', 'name_uz': 'Samarqand'},
+    'Samarqand': {'city': 'Samarkand', 'state': 'Samarkand', 'country': 'Uzbekistan', 'name_uz': 'Samarqand'},
+    'Bukhara': {'city': 'Bukhara', 'state': 'Bukhara', 'country': 'Uzbekistan', 'name_uz': 'Buxoro'},
+    'Buxoro': {'city': 'Bukhara', 'state': 'Bukhara', 'country': 'Uzbekistan', 'name_uz': 'Buxoro'},
+    'Namangan': {'city': 'Namangan', 'state': 'Namangan', 'country': 'Uzbekistan', 'name_uz': 'Namangan'},
+    'Andijan': {'city': 'Andijan', 'state': 'Andijan', 'country': 'Uzbekistan', 'name_uz': 'Andijon'},
+    'Andijon': {'city': 'Andijan', 'state': 'Andijan', 'country': 'Uzbekistan', 'name_uz': 'Andijon'},
+    'Fergana': {'city': 'Fergana', 'state': 'Fergana', 'country': 'Uzbekistan', 'name_uz': "Farg'ona"},
+    "Farg'ona": {'city': 'Fergana', 'state': 'Fergana', 'country': 'Uzbekistan', 'name_uz': "Farg'ona"},
+    'Nukus': {'city': 'Nukus', 'state': 'Karakalpakstan', 'country': 'Uzbekistan', 'name_uz': 'Nukus'},
+    'Karshi': {'city': 'Karshi', 'state': 'Kashkadarya', 'country': 'Uzbekistan', 'name_uz': 'Qarshi'},
+    'Qarshi': {'city': 'Karshi', 'state': 'Kashkadarya', 'country': 'Uzbekistan', 'name_uz': 'Qarshi'},
+    'Urgench': {'city': 'Urgench', 'state': 'Khorezm', 'country': 'Uzbekistan', 'name_uz': 'Urganch'},
+    'Urganch': {'city': 'Urgench', 'state': 'Khorezm', 'country': 'Uzbekistan', 'name_uz': 'Urganch'},
+    'Jizzakh': {'city': 'Jizzakh', 'state': 'Jizzakh', 'country': 'Uzbekistan', 'name_uz': 'Jizzax'},
+    'Jizzax': {'city': 'Jizzakh', 'state': 'Jizzakh', 'country': 'Uzbekistan', 'name_uz': 'Jizzax'},
+}
+
+
+
+# get_cities ro'yxati - beat shu shaharlarni yangilab turadi
+CITIES = [
+    {'name': 'Toshkent', 'name_en': 'Tashkent', 'state': 'Tashkent', 'is_capital': True},
+    {'name': 'Samarqand', 'name_en': 'Samarkand', 'state': 'Samarkand', 'is_capital': False},
+    {'name': 'Buxoro', 'name_en': 'Bukhara', 'state': 'Bukhara', 'is_capital': False},
+    {'name': 'Namangan', 'name_en': 'Namangan', 'state': 'Namangan', 'is_capital': False},
+    {'name': 'Andijon', 'name_en': 'Andijan', 'state': 'Andijan', 'is_capital': False},
+    {'name': "Farg'ona", 'name_en': 'Fergana', 'state': 'Fergana', 'is_capital': False},
+    {'name': 'Qarshi', 'name_en': 'Karshi', 'state': 'Qashqadaryo', 'is_capital': False},
+    {'name': 'Nukus', 'name_en': 'Nukus', 'state': 'Karakalpakstan', 'is_capital': False},
+    {'name': 'Urganch', 'name_en': 'Urgench', 'state': 'Khorezm', 'is_capital': False},
+    {'name': 'Jizzax', 'name_en': 'Jizzakh', 'state': 'Jizzakh', 'is_capital': False},
+]
+
+POLLUTANT_NAMES = {
+    'p2': 'PM2.5', 'p1': 'PM10', 'o3': 'Ozon',
+    'n2': 'NO2', 's2': 'SO2', 'co': 'CO'
+}
+
+
+def resolve_city(name):
+    """Shahar nomi (o'zbekcha yoki inglizcha) -> IQAir city/state/country; noma'lum bo'lsa Toshkent"""
+    return CITY_MAPPING.get(name) or CITY_MAPPING['Tashkent']
+
+
+def build_payload(api_data, city_name_uz):
+    """IQAir javobi -> API ko'rinishi"""
+    pollution = api_data.get('current', {}).get('pollution', {})
+    weather = api_data.get('current', {}).get('weather', {})
+
+    aqi = pollution.get('aqius', 50)
+    aqi_info = get_aqi_info(aqi)
+    main_pollutant = pollution.get('mainus', 'p2')
+
+    return {
+        'aqi': aqi,
+        'level': aqi_info['level'],
+        'level_en': aqi_info['level_en'],
+        'level_color': aqi_info['level_color'],
+        'recommendation': aqi_info['recommendation'],
+        'diseases': aqi_info['diseases'],
+        'icon': aqi_info['icon'],
+        'bg_gradient': aqi_info['bg_gradient'],
+        'main_pollutant': main_pollutant,
+        'main_pollutant_name': POLLUTANT_NAMES.get(main_pollutant, 'PM2.5'),
+        'weather': {
+            'temperature': weather.get('tp', 20),
+            'humidity': weather.get('hu', 50),
+            'wind_speed': weather.get('ws', 3),
+            'pressure': weather.get('pr', 1015),
+            'icon': weather.get('ic', '01d'),
+            'description': ''
+        },
+        'city': city_name_uz,
+        'country': "O'zbekiston",
+        'is_demo': False,
+        'timestamp': pollution.get('ts', timezone.now().isoformat())
+    }
+
+
+# ============ CACHE ============
+
+def cache_key(city_info):
+    return KEY_PREFIX + city_info['city']
+
+
+def all_cache_keys():
+    return sorted({cache_key(city_info) for city_info in CITY_MAPPING.values()})
+
+
+def stored_entry(city_info):
+    """Bazadagi oxirgi o'lchov -> cache yozuvi ko'rinishida; o'lchov yo'q bo'lsa None"""
+    from .models import AirQualityRecord
+
+    record = AirQualityRecord.objects.filter(
+        city=city_info['city'], measured_at__isnull=False
+    ).order_by('-measured_at').first()
+    if record is None:
+        return None
+    api_data = {'current': {
+        'pollution': {'aqius': record.aqi, 'mainus': record.main_pollutant, 'ts': record.measured_at.isoformat()},
+        'weather': {
+            key: value for key, value in
+            (('tp', record.temperature), ('hu', record.humidity), ('ws', record.wind_speed))
+            if value is not None
+        },
+    }}
+    fetched_at = record.recorded_at.timestamp()
+    return {
+        'data': build_payload(api_data, city_info['name_uz']),
+        'fetched_at': fetched_at,
+        'retry_at': fetched_at + FRESH_TTL,
+    }
+
+
+def current(city_info):
+    """Shahar uchun joriy ma'lumot - cache yoki bazadan; eskirgan yoki yo'q bo'lsa fonda yangilanadi"""
+    key = cache_key(city_info)
+    entry = cache.get(key)
+    now = time.time()
+    if entry is None or now >= entry['retry_at']:
+        stored = stored_entry(city_info)
+        if stored is not None and (entry is None or stored['fetched_at'] > entry['fetched_at']):
+            entry = stored
+            cache.set(key, entry, max(entry['fetched_at'] + STALE_TTL - now, RETRY_TTL))
+    if entry is None:
+        schedule_refresh(city_info)
+        return dict(get_demo_data(city_info['name_uz']), is_stale=True)
+
+    if now >= entry['retry_at']:
+        schedule_refresh(city_info)
+    return dict(entry['data'], is_stale=now - entry['fetched_at'] >= FRESH_TTL)
+
+
+def refresh(city_info):
+    """IQAir dan olib cache ga yozish; muvaffaqiyatli bo'lsa True"""
+    key = cache_key(city_info)
+    now = time.time()
+    api_data = fetch_from_iqair(city_info['city'], city_info['state'], city_info['country'])
+    if api_data:
+        entry = {
+            'data': build_payload(api_data, city_info['name_uz']),
+            'fetched_at': now,
+            'retry_at': now + FRESH_TTL,
+        }
+        cache.set(key, entry, STALE_TTL)
+        try:
+            history.record(city_info, api_data)
+        except Exception:
+            logger.exception(f"Air quality record failed: {city_info['city']}")
+        return True
+
+    entry = cache.get(key)
+    remaining = entry['fetched_at'] + STALE_TTL - now if entry else 0
+    if entry and not entry['data'].get('is_demo') and remaining > 0:
+        # Oxirgi haqiqiy ma'lumot qoladi, qayta urinish RETRY_TTL dan keyin
+        entry['retry_at'] = now + RETRY_TTL
+        cache.set(key, entry, remaining)
+    else:
+        logger.warning(f"Using DEMO data for {city_info['city']} (IQAir API failed)")
+        cache.set(key, {
+            'data': get_demo_data(city_info['name_uz']),
+            'fetched_at': now,
+            'retry_at': now + RETRY_TTL,
+        }, STALE_TTL)
+    return False
+
+
+def _lock_key(city_info):
+    return cache_key(city_info) + ':lock'
+
+
+def refresh_locked(city_info):
+    """Boshqa worker hozir shu shaharni yangilayotgan bo'lsa None"""
+    lock_key = _lock_key(city_info)
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        return None
+    try:
+        return refresh(city_info)
+    finally:
+        cache.delete(lock_key)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='air-quality')
+        return _executor
+
+
+def schedule_refresh(city_info):
+    """Fonda yangilash (so'rov kutmaydi)"""
+    _get_executor().submit(_run, city_info)
+
+
+def _run(city_info):
+    try:
+        refresh_locked(city_info)
+    except Exception:
+        logger.exception(f"Air quality refresh failed: {city_info['city']}")
+
+
+def refresh_all(ahead=REFRESH_AHEAD, spacing=REFRESH_SPACING):
+    """get_cities shaharlaridan muddati ahead sekund ichida tugaydiganlarini yangilash; yangilanganlar soni"""
+    if isinstance(caches['default'], (LocMemCache, DummyCache)):
+        logger.warning(
+            "Air quality: cache jarayonga xos (CACHE_REDIS_URL yo'q) - beat faqat bazaga yozadi, "
+            "web jarayonlar ma'lumotni AirQualityRecord dan oladi"
+        )
+    refreshed = 0
+    last_fetch = None
+    for city in CITIES:
+        city_info = resolve_city(city['name_en'])
+        entry = cache.get(cache_key(city_info))
+        if entry is not None and entry['retry_at'] - time.time() > ahead:
+            continue
+        if last_fetch is not None and spacing:
+            time.sleep(max(0.0, last_fetch + spacing - time.monotonic()))  # IQAir daqiqalik limiti
+        result = refresh_locked(city_info)
+        if result is not None:
+            last_fetch = time.monotonic()
+            refreshed += result
+    return refreshed
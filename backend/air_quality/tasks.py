@@ -0,0 +1,16 @@
+# air_quality/tasks.py
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='air_quality.tasks.refresh_air_quality')
+def refresh_air_quality():
+    """Shaharlar havo sifatini cache muddati tugashidan oldin yangilash"""
+    from .readings import refresh_all
+
+    refreshed = refresh_all()
+    if refreshed:
+        logger.info(f"Air quality refreshed: {refreshed} cities")
+    return refreshed
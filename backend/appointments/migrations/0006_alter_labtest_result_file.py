@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:48
+
+import config.media_store
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_labtest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='labtest',
+            name='result_file',
+            field=models.FileField(blank=True, null=True, storage=config.media_store.media_storage, upload_to='lab_results/%Y/%m/', verbose_name='Natija fayli'),
+        ),
+    ]
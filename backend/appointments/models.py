@@ -3,6 +3,8 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from config.media_store import media_storage
+
 
 class Appointment(models.Model):
     STATUS_CHOICES = [
@@ -286,7 +288,7 @@ class LabTest(models.Model):
     price = models.DecimalField(max_digits=12, decimal_places=2, verbose_name='Narxi')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='booked')
     results = models.JSONField(default=dict, blank=True, verbose_name='Natijalar')
-    result_file = models.FileField(upload_to='lab_results/%Y/%m/', null=True, blank=True, verbose_name='Natija fayli')
+    result_file = models.FileField(upload_to='lab_results/%Y/%m/', storage=media_storage, null=True, blank=True, verbose_name='Natija fayli')
     result_summary = models.TextField(blank=True, default='', verbose_name='Natija xulosasi')
     notes = models.TextField(blank=True, default='', verbose_name='Izoh')
     doctor_notes = models.TextField(blank=True, default='', verbose_name='Shifokor izohi')
@@ -1,5 +1,7 @@
 # appointments/serializers.py
 from rest_framework import serializers
+
+from config.media_store import thumbnail_urls
 from .models import Appointment, Prescription, MedicalRecord, Allergy, ChronicCondition
 
 
@@ -183,6 +185,7 @@ class LabTestSerializer(serializers.ModelSerializer):
     hospital_name = serializers.SerializerMethodField()
     user_name = serializers.SerializerMethodField()
     result_file_url = serializers.SerializerMethodField()
+    result_file_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         from .models import LabTest
@@ -191,7 +194,7 @@ class LabTestSerializer(serializers.ModelSerializer):
             'id', 'user_name', 'hospital', 'hospital_name',
             'test_type', 'test_type_display', 'test_name', 'description',
             'date', 'time', 'price', 'status', 'status_display',
-            'results', 'result_file', 'result_file_url', 'result_summary',
+            'results', 'result_file', 'result_file_url', 'result_file_thumbnails', 'result_summary',
             'notes', 'doctor_notes', 'is_paid', 'is_urgent',
             'created_at', 'completed_at'
         ]
@@ -211,6 +214,9 @@ class LabTestSerializer(serializers.ModelSerializer):
             return obj.result_file.url
         return None
 
+    def get_result_file_thumbnails(self, obj):
+        return thumbnail_urls(obj.result_file, self.context.get('request'))
+
 
 class LabTestCreateSerializer(serializers.ModelSerializer):
     """Laboratoriya tahlili yaratish"""
@@ -0,0 +1,190 @@
+# chat/calls.py
+"""
+Video/audio qo'ng'iroq - holat o'zgarishlari va signaling.
+
+Bazaga faqat holat o'tishlari yoziladi (ringing -> active -> ended, declined, missed),
+har biri shartli UPDATE - ikki qurilmadan bir vaqtda javob berilsa ham bittasi o'tadi.
+SDP offer/answer qo'ng'iroq boshlanishi va qabul qilinishi bilan birga saqlanadi
+(keyin ulangan qurilma uchun); renegotiation SDP va ICE candidate lar bazaga
+yozilmaydi - WebSocket orqali suhbatdoshga uzatiladi (chat.realtime).
+
+Hodisalar (ikkala ishtirokchiga):
+    call.incoming  - yangi qo'ng'iroq (+ sdp offer)
+    call.answer    - qabul qilindi (+ sdp answer)
+    call.declined  - rad etildi
+    call.ended     - tugadi
+    call.missed    - javobsiz (RING_TIMEOUT)
+Faqat suhbatdoshga: call.offer, call.ice
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChatRoom, VideoCall
+from .realtime import push_to_users
+
+ACTIVE_STATUSES = ('pending', 'ringing', 'active')
+RINGING_STATUSES = ('pending', 'ringing')
+# Shu vaqtda javob berilmasa - missed
+RING_TIMEOUT = timedelta(seconds=45)
+
+
+class CallError(Exception):
+    """Qo'ng'iroq amali bajarilmadi - HTTP view va consumer bir xil xabar qaytaradi"""
+
+    def __init__(self, message, status=400, call=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.call = call
+
+
+def call_payload(call):
+    return {
+        'call_id': str(call.id),
+        'room_id': str(call.room_id),
+        'caller': {
+            'id': str(call.caller_id),
+            'name': call.caller.get_full_name(),
+        },
+        'receiver': {
+            'id': str(call.receiver_id),
+            'name': call.receiver.get_full_name(),
+        },
+        'status': call.status,
+        'is_video': call.is_video,
+        'started_at': call.started_at.isoformat() if call.started_at else None,
+        'ended_at': call.ended_at.isoformat() if call.ended_at else None,
+        'duration': call.duration,
+    }
+
+
+def peer_id(call, user):
+    return call.receiver_id if user.pk == call.caller_id else call.caller_id
+
+
+def get_call_for_user(call_id, user):
+    """Qo'ng'iroq - foydalanuvchi ishtirokchi bo'lmasa None"""
+    try:
+        call = VideoCall.objects.select_related('caller', 'receiver').get(id=call_id)
+    except (VideoCall.DoesNotExist, ValueError, ValidationError):
+        return None
+    if user.pk not in (call.caller_id, call.receiver_id):
+        return None
+    return call
+
+
+def _push(call, event, **extra):
+    push_to_users([call.caller_id, call.receiver_id], event, {'call': call_payload(call), **extra})
+
+
+def _transition(call, from_statuses, status, **fields):
+    """Shartli holat o'tishi; boshqa so'rov oldinroq o'zgartirgan bo'lsa CallError"""
+    updated = VideoCall.objects.filter(pk=call.pk, status__in=from_statuses).update(status=status, **fields)
+    if not updated:
+        call.refresh_from_db(fields=['status'])
+        raise CallError('Qo\'ng\'iroq holati mos emas', call=call)
+    call.status = status
+    for field, value in fields.items():
+        setattr(call, field, value)
+
+
+def start_call(room, caller, is_video=True, offer=''):
+    expire_stale_calls(room=room)
+
+    with transaction.atomic():
+        # Bir xonada bir vaqtda ikkita qo'ng'iroq ochilmasligi uchun
+        ChatRoom.objects.select_for_update().filter(pk=room.pk).first()
+        active_call = VideoCall.objects.filter(room=room, status__in=ACTIVE_STATUSES).first()
+        if active_call:
+            raise CallError('Bu xonada faol qo\'ng\'iroq mavjud', call=active_call)
+
+        receiver = room.doctor if caller.pk == room.patient_id else room.patient
+        call = VideoCall.objects.create(
+            room=room,
+            caller=caller,
+            receiver=receiver,
+            is_video=is_video,
+            status='ringing',
+            caller_offer=offer or ''
+        )
+
+    # Notifikatsiya yuborish
+    try:
+        from notifications.views import create_notification
+        create_notification(
+            user=receiver,
+            title='Kiruvchi qo\'ng\'iroq',
+            message=f'{caller.first_name} {"video" if is_video else "audio"} qo\'ng\'iroq qilmoqda',
+            notif_type='incoming_call'
+        )
+    except:
+        pass
+
+    _push(call, 'call.incoming', sdp=call.caller_offer)
+    return call
+
+
+def answer_call(call, user, answer=''):
+    if user.pk != call.receiver_id:
+        raise CallError('Siz bu qo\'ng\'iroqni qabul qila olmaysiz', status=403)
+
+    _transition(call, RINGING_STATUSES, 'active', started_at=timezone.now(), receiver_answer=answer or '')
+    _push(call, 'call.answer', sdp=call.receiver_answer)
+    return call
+
+
+def decline_call(call, user):
+    """Qabul qiluvchi - declined, qo'ng'iroq qiluvchi (bekor qilish) - ended"""
+    if call.status not in ACTIVE_STATUSES:
+        raise CallError('Qo\'ng\'iroq allaqachon tugagan')
+
+    status = 'declined' if user.pk == call.receiver_id else 'ended'
+    _finish(call, status)
+    _push(call, f'call.{status}')
+    return call
+
+
+def end_call(call, user):
+    if call.status not in ACTIVE_STATUSES:
+        raise CallError('Qo\'ng\'iroq allaqachon tugagan')
+
+    _finish(call, 'ended')
+
+    # Chat xabariga qo'shish (hisoblagich va oxirgi xabar ham yangilanadi)
+    from .services import create_message
+    create_message(
+        call.room,
+        user,
+        f'{"Video" if call.is_video else "Audio"} qo\'ng\'iroq: {call.duration_formatted}',
+        message_type='system',
+        notify=False
+    )
+
+    _push(call, 'call.ended')
+    return call
+
+
+def _finish(call, status):
+    ended_at = timezone.now()
+    duration = int((ended_at - call.started_at).total_seconds()) if call.started_at else 0
+    _transition(call, ACTIVE_STATUSES, status, ended_at=ended_at, duration=duration)
+
+
+def expire_stale_calls(**filters):
+    """RING_TIMEOUT dan oshgan jiringlayotgan qo'ng'iroqlar -> missed; soni"""
+    cutoff = timezone.now() - RING_TIMEOUT
+    stale = VideoCall.objects.select_related('caller', 'receiver').filter(
+        status__in=RINGING_STATUSES, created_at__lt=cutoff, **filters
+    )
+    expired = 0
+    for call in stale:
+        try:
+            _transition(call, RINGING_STATUSES, 'missed', ended_at=timezone.now())
+        except CallError:
+            continue
+        _push(call, 'call.missed')
+        expired += 1
+    return expired
@@ -0,0 +1,255 @@
+# chat/consumers.py
+"""
+Chat WebSocket - ws/chat/?token=<JWT access token>
+
+Bitta ulanish foydalanuvchining barcha xonalariga xizmat qiladi (chat.realtime).
+Mijoz -> server:
+    {"type": "message.send", "room_id": ..., "content": ..., "message_type": "text", "client_id": ...}
+    {"type": "message.read", "room_id": ...}
+    {"type": "typing", "room_id": ..., "is_typing": true}
+    {"type": "ping"}                                             - har ~25 s (onlayn holat heartbeat)
+Qo'ng'iroq (chat.calls):
+    {"type": "call.start", "room_id": ..., "is_video": true, "sdp": <offer>}
+    {"type": "call.answer", "call_id": ..., "sdp": <answer>}
+    {"type": "call.decline" | "call.end", "call_id": ...}
+    {"type": "call.offer", "call_id": ..., "sdp": ...}          - suhbatdoshga uzatiladi
+    {"type": "call.ice", "call_id": ..., "candidate": {...}}     - suhbatdoshga uzatiladi
+Server -> mijoz: message.ack, message.new, message.read, message.deleted, typing, pong, error, presence,
+    call.incoming, call.answer, call.declined, call.ended, call.missed, call.offer, call.ice
+"""
+import time
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import calls, presence, services
+from .realtime import apush_to_users, read_receipt, user_group
+
+MAX_CONTENT_LENGTH = 5000
+# Bir xil "yozmoqda" holati shu oraliqdan tez-tez qayta yuborilmaydi
+TYPING_INTERVAL = 3
+MAX_SDP_LENGTH = 20000
+# Qo'ng'iroq tugagani haqidagi hodisalar - socket keshidan o'chiriladi
+CALL_FINISHED_EVENTS = ('call.declined', 'call.ended', 'call.missed')
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.user = user
+        self.group = user_group(user.pk)
+        # room_id -> ChatRoom - har xabarda xona qayta o'qilmaydi
+        self.rooms = {}
+        self.typing_sent = {}
+        # call_id -> suhbatdosh id - ICE/offer uzatishda baza o'qilmaydi
+        self.calls = {}
+
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+        await database_sync_to_async(presence.tracker.connected)(user.pk)
+
+    async def disconnect(self, code):
+        if getattr(self, 'group', None):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+            await database_sync_to_async(presence.tracker.disconnected)(self.user.pk)
+
+    async def receive_json(self, content, **kwargs):
+        if presence.tracker.seen(self.user.pk):
+            await database_sync_to_async(presence.tracker.flush)()
+
+        handler = {
+            'message.send': self.handle_send,
+            'message.read': self.handle_read,
+            'typing': self.handle_typing,
+            'ping': self.handle_ping,
+            'call.start': self.handle_call_start,
+            'call.answer': self.handle_call_answer,
+            'call.decline': self.handle_call_decline,
+            'call.end': self.handle_call_end,
+            'call.offer': self.handle_call_relay,
+            'call.ice': self.handle_call_relay,
+        }.get(content.get('type'))
+        if handler is None:
+            await self.send_error("Noma'lum amal", content)
+            return
+        await handler(content)
+
+    async def send_error(self, error, content=None):
+        await self.send_json({
+            'type': 'error',
+            'error': error,
+            'client_id': (content or {}).get('client_id'),
+        })
+
+    async def participants(self, room_id):
+        """(patient_id, doctor_id) - foydalanuvchi xona ishtirokchisi bo'lmasa None"""
+        room_id = str(room_id or '')
+        if room_id not in self.rooms:
+            room = await database_sync_to_async(services.get_room_for_user)(room_id, self.user)
+            if room is None:
+                return None
+            self.rooms[room_id] = room
+        room = self.rooms[room_id]
+        return room.patient_id, room.doctor_id
+
+    # ---------- Mijoz amallari ----------
+
+    async def handle_ping(self, content):
+        await self.send_json({'type': 'pong'})
+
+    async def handle_send(self, content):
+        text = (content.get('content') or '').strip()
+        if not text or len(text) > MAX_CONTENT_LENGTH:
+            await self.send_error("Xabar bo'sh yoki juda uzun", content)
+            return
+        message_type = content.get('message_type', 'text')
+        if message_type not in ('text', 'image', 'file', 'voice'):
+            message_type = 'text'
+
+        room_id = str(content.get('room_id') or '')
+        members = await self.participants(room_id)
+        if members is None:
+            await self.send_error("Ruxsat yo'q", content)
+            return
+
+        payload = await database_sync_to_async(self._create_message)(room_id, text, message_type)
+        await self.send_json({'type': 'message.ack', 'client_id': content.get('client_id'), 'message': payload})
+        await apush_to_users(self.channel_layer, members, 'message.new', {'message': payload})
+
+    def _create_message(self, room_id, text, message_type):
+        room = self.rooms[room_id]
+        _, payload = services.create_message(room, self.user, text, message_type, push=False)
+        return payload
+
+    async def handle_read(self, content):
+        room_id = str(content.get('room_id') or '')
+        members = await self.participants(room_id)
+        if members is None:
+            await self.send_error("Ruxsat yo'q", content)
+            return
+
+        receipt = await database_sync_to_async(self._mark_read)(room_id)
+        if receipt is not None:
+            await apush_to_users(self.channel_layer, members, 'message.read', receipt)
+
+    def _mark_read(self, room_id):
+        room = self.rooms[room_id]
+        count, read_at = services.mark_room_read(room, self.user, push=False)
+        return read_receipt(room, self.user, read_at, count) if count else None
+
+    async def handle_typing(self, content):
+        room_id = str(content.get('room_id') or '')
+        members = await self.participants(room_id)
+        if members is None:
+            return
+        is_typing = bool(content.get('is_typing', True))
+
+        # Bazaga yozilmaydi; bir xil holat TYPING_INTERVAL ichida qayta yuborilmaydi
+        now = time.monotonic()
+        last_state, last_sent = self.typing_sent.get(room_id, (None, 0.0))
+        if last_state == is_typing and now - last_sent < TYPING_INTERVAL:
+            return
+        self.typing_sent[room_id] = (is_typing, now)
+
+        others = [user_id for user_id in members if user_id != self.user.pk]
+        await apush_to_users(self.channel_layer, others, 'typing', {
+            'room_id': room_id,
+            'user_id': str(self.user.pk),
+            'is_typing': is_typing,
+        })
+
+    # ---------- Qo'ng'iroq ----------
+
+    async def handle_call_start(self, content):
+        sdp = content.get('sdp') or ''
+        if len(sdp) > MAX_SDP_LENGTH:
+            await self.send_error('SDP juda katta', content)
+            return
+        room_id = str(content.get('room_id') or '')
+        if await self.participants(room_id) is None:
+            await self.send_error("Ruxsat yo'q", content)
+            return
+        await self.call_action(
+            content, calls.start_call, self.rooms[room_id], self.user,
+            is_video=bool(content.get('is_video', True)), offer=sdp
+        )
+
+    async def handle_call_answer(self, content):
+        sdp = content.get('sdp') or ''
+        if len(sdp) > MAX_SDP_LENGTH:
+            await self.send_error('SDP juda katta', content)
+            return
+        await self.call_action(content, self._with_call(calls.answer_call), content.get('call_id'), answer=sdp)
+
+    async def handle_call_decline(self, content):
+        if await self.call_action(content, self._with_call(calls.decline_call), content.get('call_id')):
+            self.calls.pop(str(content.get('call_id')), None)
+
+    async def handle_call_end(self, content):
+        if await self.call_action(content, self._with_call(calls.end_call), content.get('call_id')):
+            self.calls.pop(str(content.get('call_id')), None)
+
+    def _with_call(self, action):
+        def run(call_id, **kwargs):
+            call = calls.get_call_for_user(call_id, self.user)
+            if call is None:
+                raise calls.CallError("Ruxsat yo'q", status=403)
+            return action(call, self.user, **kwargs)
+        return run
+
+    async def call_action(self, content, action, *args, **kwargs):
+        """Holat o'tishi bazada; hodisalar (call.*) servis tomonidan ikkala ishtirokchiga yuboriladi"""
+        try:
+            await database_sync_to_async(action)(*args, **kwargs)
+        except (calls.CallError, ValueError) as e:
+            await self.send_error(getattr(e, 'message', "Noto'g'ri so'rov"), content)
+            return False
+        return True
+
+    async def handle_call_relay(self, content):
+        """SDP renegotiation va ICE candidate - bazaga yozilmaydi, suhbatdoshga uzatiladi"""
+        call_id = str(content.get('call_id') or '')
+        peer = self.calls.get(call_id)
+        if peer is None:
+            peer = await database_sync_to_async(self._call_peer)(call_id)
+            if peer is None:
+                await self.send_error("Qo'ng'iroq faol emas", content)
+                return
+            self.calls[call_id] = peer
+
+        if content['type'] == 'call.offer':
+            data = {'sdp': content.get('sdp') or ''}
+            if len(data['sdp']) > MAX_SDP_LENGTH:
+                await self.send_error('SDP juda katta', content)
+                return
+        else:
+            data = {'candidate': content.get('candidate')}
+        await apush_to_users(self.channel_layer, [peer], content['type'], {
+            'call_id': call_id,
+            'from_user': str(self.user.pk),
+            **data,
+        })
+
+    def _call_peer(self, call_id):
+        call = calls.get_call_for_user(call_id, self.user)
+        if call is None or call.status not in calls.ACTIVE_STATUSES:
+            return None
+        return calls.peer_id(call, self.user)
+
+    # ---------- Channel layer hodisalari ----------
+
+    async def chat_event(self, event):
+        name, data = event['event'], event['data']
+        if name.startswith('call.') and 'call' in data:
+            call = data['call']
+            if name in CALL_FINISHED_EVENTS:
+                self.calls.pop(call['call_id'], None)
+            else:
+                mine = str(self.user.pk)
+                self.calls[call['call_id']] = call['receiver']['id'] if call['caller']['id'] == mine else call['caller']['id']
+        await self.send_json({'type': name, **data})
@@ -0,0 +1,138 @@
+# chat/management/commands/channel_layer_benchmark.py
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Bitta xabar ~ chat message.new hodisasi hajmida
+PAD = 'x' * 400
+
+
+def run_worker(index, options, ready, finished, results):
+    """Alohida jarayon: kanallar guruhlarga qo'shiladi, boshqa workerlarning guruhlariga yuboradi"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from config.channel_layers import BroadcastChannelLayer
+
+    results.put((index, asyncio.run(_worker(index, options, ready, finished, BroadcastChannelLayer))))
+
+
+async def _worker(index, options, ready, finished, layer_class):
+    loop = asyncio.get_running_loop()
+    layer = layer_class(transport=options['transport'], capacity=100000, socket_dir=options['socket_dir'])
+    workers, per_worker = options['workers'], options['channels']
+
+    channels = []
+    for i in range(per_worker):
+        channel = await layer.new_channel()
+        await layer.group_add(f'bench.{index}.{i}', channel)
+        channels.append(channel)
+    await asyncio.sleep(0.5)  # listener ulansin
+    await loop.run_in_executor(None, ready.wait)
+
+    latencies = []
+    last_received = [0.0]
+
+    async def receiver(channel):
+        while True:
+            message = await layer.receive(channel)
+            now = time.time()
+            latencies.append(now - message['t'])
+            last_received[0] = now
+
+    tasks = [asyncio.create_task(receiver(channel)) for channel in channels]
+
+    others = [w for w in range(workers) if w != index] or [index]
+    interval = workers / options['rate'] if options['rate'] else 0
+    started = time.time()
+    for n in range(options['messages']):
+        group = f'bench.{random.choice(others)}.{random.randrange(per_worker)}'
+        await layer.group_send(group, {'type': 'bench', 't': time.time(), 'pad': PAD})
+        if interval:
+            await asyncio.sleep(max(0.0, started + (n + 1) * interval - time.time()))
+        elif n % 50 == 0:
+            await asyncio.sleep(0)
+    sent_done = time.time()
+    await loop.run_in_executor(None, finished.wait)
+
+    # Yetkazish tugashini kutish: 1 s yangi xabar bo'lmasa
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        await asyncio.sleep(0.2)
+        if time.time() - max(last_received[0], sent_done) > 1:
+            break
+
+    for task in tasks:
+        task.cancel()
+    await layer.close()
+    return {
+        'sent': options['messages'],
+        'received': len(latencies),
+        'latencies': latencies,
+        'started': started,
+        'last_received': last_received[0],
+    }
+
+
+class Command(BaseCommand):
+    help = "Channel layer: bir nechta worker jarayoni o'rtasida xabar/s va yetkazish kechikishi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transport', default='auto', help='auto, unix, postgres, redis')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--channels', type=int, default=250, help='Har workerdagi ulanishlar (guruhlar)')
+        parser.add_argument('--messages', type=int, default=5000, help='Har worker yuboradigan xabarlar')
+        parser.add_argument('--rate', type=float, default=2000,
+                            help="Kechikish o'lchovi uchun jami xabar/s (o'tkazuvchanlik o'lchovi - cheklovsiz)")
+        parser.add_argument('--socket-dir', default=None)
+
+    def handle(self, *args, **options):
+        if options['workers'] < 2:
+            raise CommandError('Kamida 2 ta worker kerak')
+        if options['transport'] == 'auto':
+            from config.channel_layers import make_transport
+            options['transport'] = type(make_transport('auto', {})).__name__.replace('SocketTransport', '').replace('Transport', '').lower()
+
+        self.stdout.write(
+            f"Transport: {options['transport']}, {options['workers']} worker x {options['channels']} ulanish"
+        )
+        for title, rate in (("O'tkazuvchanlik (cheklovsiz)", 0), (f"Kechikish ({options['rate']:g} xabar/s)", options['rate'])):
+            self._report(title, self._run(dict(options, rate=rate)))
+
+    def _run(self, options):
+        context = multiprocessing.get_context('spawn')
+        workers = options['workers']
+        ready, finished = context.Barrier(workers), context.Barrier(workers)
+        results = context.Queue()
+        processes = [
+            context.Process(target=run_worker, args=(i, options, ready, finished, results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get(timeout=300)[1] for _ in processes]
+        for process in processes:
+            process.join()
+        return collected
+
+    def _report(self, title, results):
+        sent = sum(r['sent'] for r in results)
+        received = sum(r['received'] for r in results)
+        latencies = sorted(latency for r in results for latency in r['latencies'])
+        wall = max(r['last_received'] for r in results) - min(r['started'] for r in results)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{title}'))
+        self.stdout.write(f'  yuborildi {sent}, yetkazildi {received} ({sent - received} yo\'qoldi)')
+        if not latencies:
+            return
+        self.stdout.write(f'  {received / wall:.0f} xabar/s ({wall:.2f} s)')
+        self.stdout.write(
+            f'  kechikish: p50 {statistics.median(latencies) * 1000:.2f} ms, '
+            f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms, '
+            f'max {latencies[-1] * 1000:.2f} ms'
+        )
@@ -0,0 +1,171 @@
+# chat/management/commands/chat_push_benchmark.py
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from chat.models import ChatRoom, Message
+
+EMAIL_DOMAIN = 'chat-bench.local'
+
+
+class Command(BaseCommand):
+    help = "Chat: HTTP polling va WebSocket push ni taqqoslash (N ta bir vaqtdagi xona)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=1000)
+        parser.add_argument('--history', type=int, default=30, help='Har xonadagi mavjud xabarlar')
+        parser.add_argument('--poll-interval', type=float, default=3.0, help='Mijoz polling oralig\'i (sekund)')
+        parser.add_argument('--poll-sample', type=int, default=200, help="O'lchanadigan polling so'rovlari")
+        parser.add_argument('--send-window', type=float, default=10.0,
+                            help="Push: xabarlar shu oraliqqa tasodifiy tarqatiladi (0 - hammasi bir vaqtda)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help="Test ma'lumotlarini o'chirmaslik")
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self._cleanup()
+        rooms = self._seed(options['rooms'], options['history'])
+        try:
+            polling = self._bench_polling(rooms, options['poll_sample'])
+            push = asyncio.run(self._bench_push(rooms, options['send_window']))
+            self._report(options, polling, push)
+        finally:
+            if not options['keep']:
+                self._cleanup()
+
+    # ---------- Ma'lumotlar ----------
+
+    def _seed(self, n_rooms, history):
+        User = get_user_model()
+        self.stdout.write(f'{n_rooms} ta xona, har birida {history} ta xabar yaratilmoqda...')
+        users = []
+        for i in range(n_rooms * 2):
+            user = User(
+                email=f'bench-{i}@{EMAIL_DOMAIN}', username=f'bench-{i}-{uuid.uuid4().hex[:6]}',
+                first_name='Bench', last_name=str(i), user_type='patient' if i % 2 == 0 else 'doctor',
+            )
+            user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users, batch_size=500)
+
+        rooms = [ChatRoom(patient=users[2 * i], doctor=users[2 * i + 1]) for i in range(n_rooms)]
+        ChatRoom.objects.bulk_create(rooms, batch_size=500)
+
+        messages = [
+            Message(room=room, sender=room.patient if j % 2 == 0 else room.doctor,
+                    content=f'Xabar {j}', is_read=True)
+            for room in rooms for j in range(history)
+        ]
+        Message.objects.bulk_create(messages, batch_size=2000)
+        return rooms
+
+    def _cleanup(self):
+        get_user_model().objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+
+    # ---------- Polling ----------
+
+    def _bench_polling(self, rooms, sample):
+        """Mijoz har oraliqda get_messages + get_unread_count chaqiradi"""
+        from chat.views import get_messages, get_unread_count
+
+        factory = APIRequestFactory()
+        timings, queries, sizes = [], [], []
+        for room in random.sample(rooms, min(sample, len(rooms))):
+            user = random.choice([room.patient, room.doctor])
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as captured:
+                request = factory.get(f'/api/chat/rooms/{room.id}/messages/')
+                force_authenticate(request, user=user)
+                response = get_messages(request, room_id=str(room.id))
+                response.render()
+                unread_request = factory.get('/api/chat/unread/')
+                force_authenticate(unread_request, user=user)
+                get_unread_count(unread_request).render()
+            timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            sizes.append(len(response.content))
+        return {'timings': timings, 'queries': queries, 'sizes': sizes}
+
+    # ---------- Push ----------
+
+    async def _bench_push(self, rooms, window):
+        """Har ikki ishtirokchi ulanadi; har xonada bemor xabar yuboradi, shifokor qabul qilguncha vaqt"""
+        from channels.testing import WebsocketCommunicator
+        from chat.consumers import ChatConsumer
+
+        application = ChatConsumer.as_asgi()
+
+        async def connect(user):
+            communicator = WebsocketCommunicator(application, '/ws/chat/')
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect()
+            assert connected
+            return communicator
+
+        started = time.perf_counter()
+        sockets = []
+        for room in rooms:
+            sockets.append((room, await connect(room.patient), await connect(room.doctor)))
+        connect_time = time.perf_counter() - started
+
+        latencies = []
+
+        async def exchange(room, patient, doctor):
+            await asyncio.sleep(random.uniform(0, window))
+            sent = time.perf_counter()
+            await patient.send_json_to({
+                'type': 'message.send', 'room_id': str(room.id), 'content': 'Salom, doktor', 'client_id': '1',
+            })
+            while True:
+                event = await doctor.receive_json_from(timeout=60)
+                if event['type'] == 'message.new':
+                    latencies.append(time.perf_counter() - sent)
+                    return
+
+        started = time.perf_counter()
+        await asyncio.gather(*(exchange(*triple) for triple in sockets))
+        wall = time.perf_counter() - started
+
+        for _, patient, doctor in sockets:
+            await patient.disconnect()
+            await doctor.disconnect()
+        return {'latencies': latencies, 'wall': wall, 'connect_time': connect_time,
+                'connections': len(sockets) * 2, 'window': window}
+
+    # ---------- Hisobot ----------
+
+    def _report(self, options, polling, push):
+        n_rooms = options['rooms']
+        interval = options['poll_interval']
+        clients = n_rooms * 2
+
+        poll_ms = statistics.mean(polling['timings']) * 1000
+        poll_queries = statistics.mean(polling['queries'])
+        poll_bytes = statistics.mean(polling['sizes'])
+        polls_per_sec = clients / interval
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nPolling ({clients} mijoz, har {interval:g}s)'))
+        self.stdout.write(f'  bitta poll: {poll_ms:.1f} ms, {poll_queries:.1f} SQL so\'rov, {poll_bytes / 1024:.1f} KB javob')
+        self.stdout.write(f'  yuklama: {polls_per_sec:.0f} so\'rov/s, {polls_per_sec * poll_queries:.0f} SQL/s, '
+                          f'{polls_per_sec * poll_ms / 1000:.1f} CPU-sekund/s, '
+                          f'{polls_per_sec * poll_bytes / 1024 / 1024:.1f} MB/s')
+        self.stdout.write('  yuklama xabar bo\'lmasa ham o\'zgarmaydi')
+        self.stdout.write(f'  yetkazish kechikishi: o\'rtacha ~{interval / 2 * 1000:.0f} ms, eng yomon ~{interval * 1000:.0f} ms')
+
+        latencies = sorted(push['latencies'])
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nPush ({push["connections"]} WebSocket ulanish)'))
+        self.stdout.write(f'  ulanish: {push["connect_time"]:.2f} s')
+        self.stdout.write(f'  {len(latencies)} xabar {push["wall"]:.2f} s da ({len(latencies) / push["wall"]:.0f} xabar/s)')
+        sending = f'{push["window"]:g}s ichida tarqatilgan' if push['window'] else 'hammasi bir vaqtda'
+        self.stdout.write(f'  yetkazish kechikishi: p50 {p50:.1f} ms, p99 {p99:.1f} ms ({sending})')
+        self.stdout.write('  bo\'sh turganda: 0 so\'rov/s - yuklama faqat haqiqiy xabarlar soniga bog\'liq')
@@ -0,0 +1,17 @@
+# chat/management/commands/rebuild_chat_search.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from chat.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Chat qidiruv indeksini qayta qurish (normallashtirish qoidalari o'zgarganda)"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'{indexed} ta xabar indekslandi ({time.perf_counter() - started:.1f} s)'
+        ))
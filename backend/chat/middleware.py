@@ -0,0 +1,66 @@
+# chat/middleware.py
+"""
+WebSocket uchun JWT autentifikatsiya va HTTP faollikni onlayn holatga yozish.
+Brauzer WebSocket ga header qo'sha olmaydi - token query string da keladi:
+    ws/chat/?token=<access token>
+"Authorization: Bearer ..." header ham qabul qilinadi (mobil mijozlar).
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+
+from . import presence
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError, AuthenticationFailed
+
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def token_from_scope(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if query.get('token'):
+        return query['token'][0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0].lower() == 'bearer':
+                return parts[1]
+    return None
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Token to'g'ri bo'lsa scope['user'] ni almashtiradi, aks holda sessiya foydalanuvchisi qoladi"""
+
+    async def __call__(self, scope, receive, send):
+        token = token_from_scope(scope)
+        if token:
+            user = await get_user_from_token(token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
+
+
+class PresenceMiddleware:
+    """
+    Autentifikatsiyalangan HTTP so'rov - onlayn holat heartbeat.
+    DRF (JWT) foydalanuvchini view ichida aniqlaydi va request.user ga yozadi - shuning uchun javobdan keyin.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and presence.tracker.seen(user.pk):
+            presence.tracker.flush()
+        return response
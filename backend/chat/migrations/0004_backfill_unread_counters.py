@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 21:10
+
+from django.db import migrations
+from django.db.models import Count, F, Max, Q
+
+
+def fill_unread_counters(apps, schema_editor):
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    ChatNotification = apps.get_model('chat', 'ChatNotification')
+
+    rooms = ChatRoom.objects.annotate(
+        patient_unread=Count('messages', filter=Q(
+            messages__is_read=False, messages__is_deleted=False, messages__sender=F('doctor'))),
+        doctor_unread=Count('messages', filter=Q(
+            messages__is_read=False, messages__is_deleted=False, messages__sender=F('patient'))),
+        last_at=Max('messages__created_at'),
+    )
+    for room in rooms.iterator():
+        for user_id, unread in ((room.patient_id, room.patient_unread), (room.doctor_id, room.doctor_unread)):
+            ChatNotification.objects.update_or_create(
+                user_id=user_id,
+                room_id=room.id,
+                defaults={'unread_count': unread, 'last_notified_at': room.last_at},
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_message_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_unread_counters, migrations.RunPython.noop),
+    ]
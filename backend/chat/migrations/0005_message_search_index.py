@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_search_index(apps, schema_editor):
+    from chat.search import tokenize
+
+    Message = apps.get_model('chat', 'Message')
+    MessageSearchTerm = apps.get_model('chat', 'MessageSearchTerm')
+    messages = Message.objects.filter(is_deleted=False).exclude(message_type='system').select_related('room')
+    rows = []
+    for message in messages.iterator(chunk_size=1000):
+        terms = {term for term, _, _ in tokenize(message.content)}
+        rows.extend(
+            MessageSearchTerm(user_id=user_id, term=term, message_id=message.pk,
+                              room_id=message.room_id, created_at=message.created_at)
+            for user_id in (message.room.patient_id, message.room.doctor_id) for term in terms
+        )
+        if len(rows) >= 5000:
+            MessageSearchTerm.objects.bulk_create(rows)
+            rows = []
+    MessageSearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_backfill_unread_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField()),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chat.message')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chat.chatroom')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'term', 'created_at', 'message'], name='chat_messag_user_id_79572b_idx')],
+            },
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
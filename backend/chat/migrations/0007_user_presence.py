@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_user_avatar'),
+        ('chat', '0006_alter_message_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPresence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='presence', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('is_online', models.BooleanField(default=False)),
+                ('expires_at', models.FloatField()),
+                ('last_seen', models.FloatField()),
+                ('connections', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Onlayn holat',
+                'verbose_name_plural': 'Onlayn holatlar',
+                'indexes': [models.Index(fields=['is_online', 'expires_at'], name='chat_userpr_is_onli_92445c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def rebuild_search_index(apps, schema_editor):
+    """O'zbek kirill so'zlari endi lotin yozuvi bilan bir xil normallashtiriladi"""
+    from chat.search import tokenize
+
+    Message = apps.get_model('chat', 'Message')
+    MessageSearchTerm = apps.get_model('chat', 'MessageSearchTerm')
+    MessageSearchTerm.objects.all().delete()
+    messages = Message.objects.filter(is_deleted=False).exclude(message_type='system').select_related('room')
+    rows = []
+    for message in messages.iterator(chunk_size=1000):
+        terms = {term for term, _, _ in tokenize(message.content)}
+        rows.extend(
+            MessageSearchTerm(user_id=user_id, term=term, message_id=message.pk,
+                              room_id=message.room_id, created_at=message.created_at)
+            for user_id in (message.room.patient_id, message.room.doctor_id) for term in terms
+        )
+        if len(rows) >= 5000:
+            MessageSearchTerm.objects.bulk_create(rows)
+            rows = []
+    MessageSearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_user_presence'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from config.media_store import media_storage
+
 
 class ChatRoom(models.Model):
     """Chat xonasi - Bemor va Shifokor o'rtasida"""
@@ -45,6 +47,16 @@ class ChatRoom(models.Model):
     def __str__(self):
         return f"Chat: {self.patient} - {self.doctor}"
 
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        # Har ikki ishtirokchi uchun o'qilmagan xabarlar hisoblagichi
+        if is_new:
+            ChatNotification.objects.bulk_create(
+                [ChatNotification(user_id=user_id, room=self) for user_id in (self.patient_id, self.doctor_id)],
+                ignore_conflicts=True
+            )
+
     @property
     def patient_name(self):
         return f"{self.patient.first_name} {self.patient.last_name}"
@@ -80,7 +92,7 @@ class Message(models.Model):
     content = models.TextField()
 
     # Fayl/rasm uchun
-    file = models.FileField(upload_to='chat_files/', blank=True, null=True)
+    file = models.FileField(upload_to='chat_files/', storage=media_storage, blank=True, null=True)
     file_name = models.CharField(max_length=255, blank=True)
     file_size = models.PositiveIntegerField(null=True, blank=True)
 
@@ -103,19 +115,51 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Keyset sahifalash (before/after) va delta sync (since)
+            models.Index(fields=['room', 'created_at', 'id']),
+            models.Index(fields=['room', 'updated_at', 'id']),
+        ]
         verbose_name = 'Xabar'
         verbose_name_plural = 'Xabarlar'
 
     def __str__(self):
         return f"{self.sender}: {self.content[:50]}"
 
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        # Qidiruv indeksi (yangi xabar - qo'shish, tahrir - qayta yozish)
+        from .search import index_message
+        index_message(self, replace=not is_new)
+
     @property
     def sender_name(self):
         return f"{self.sender.first_name} {self.sender.last_name}"
 
 
+class MessageSearchTerm(models.Model):
+    """Qidiruv indeksi - har ishtirokchi uchun xabardagi normallashtirilgan so'zlar (chat.search)"""
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False  # (user, term, ...) indeksi yetarli
+    )
+    term = models.CharField(max_length=64)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='+')
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'term', 'created_at', 'message']),
+        ]
+
+
 class ChatNotification(models.Model):
-    """Chat bildirishnomalari"""
+    """Chat bildirishnomalari - ishtirokchining xonadagi o'qilmagan xabarlar hisoblagichi (chat.services)"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -197,4 +241,30 @@ class VideoCall(models.Model):
         seconds = self.duration % 60
         if hours > 0:
             return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        return f"{minutes:02d}:{seconds:02d}"
\ No newline at end of file
+        return f"{minutes:02d}:{seconds:02d}"
+
+class UserPresence(models.Model):
+    """
+    Onlayn holat (chat.presence, BACKEND='db').
+    Vaqtlar - unix sekund (float); expires_at gacha heartbeat bo'lmasa - offline.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='presence'
+    )
+    is_online = models.BooleanField(default=False)  # suhbatdoshlarga oxirgi yuborilgan holat
+    expires_at = models.FloatField()
+    last_seen = models.FloatField()
+    connections = models.PositiveIntegerField(default=0)  # ochiq WebSocket ulanishlari
+
+    class Meta:
+        verbose_name = 'Onlayn holat'
+        verbose_name_plural = 'Onlayn holatlar'
+        indexes = [
+            models.Index(fields=['is_online', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {'online' if self.is_online else 'offline'}"
@@ -0,0 +1,417 @@
+# chat/presence.py
+"""
+Onlayn holat - workerlar o'rtasida umumiy TTL ombori bilan.
+
+Foydalanuvchi onlayn, agar oxirgi heartbeat dan TTL o'tmagan bo'lsa. Heartbeat manbalari:
+    - WebSocket ulanish/uzilish (ChatConsumer) - darhol yoziladi
+    - WebSocket xabarlari (ping ham) va autentifikatsiyalangan HTTP so'rovlar (PresenceMiddleware)
+Heartbeatlar jarayon ichida yig'iladi va FLUSH_INTERVAL da bir marta, bitta batched amal bilan
+yoziladi (jarayondagi ochiq socketlar egalari ham shu yozuvga qo'shiladi) - socketlar va
+so'rovlar qancha bo'lishidan qat'i nazar, jarayon har bir foydalanuvchi uchun interval ichida
+ko'pi bilan bir marta yozadi.
+
+Ombor (settings.PRESENCE['BACKEND']):
+    db    - UserPresence jadvali, shartli UPDATE lar (SQLite / PostgreSQL)
+    redis - sorted set (user -> expires_at) + Lua skriptlar
+    local - jarayon xotirasi (testlar va bitta jarayon uchun)
+
+Holat o'zgarganda (online <-> offline) suhbatdoshlarga 'presence' hodisasi yuboriladi.
+Uzilishsiz TTL tugaganlari expire_presence (Celery beat) orqali offline bo'ladi.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_SETTINGS = getattr(settings, 'PRESENCE', {})
+TTL = PRESENCE_SETTINGS.get('TTL', 60)
+FLUSH_INTERVAL = PRESENCE_SETTINGS.get('FLUSH_INTERVAL', 20)
+EXPIRE_BATCH = 1000
+
+
+class LocalPresenceStore:
+    """Jarayon ichidagi holatlar - testlar uchun (workerlar o'rtasida umumiy emas)"""
+
+    def __init__(self):
+        # user_id -> [is_online, expires_at, last_seen, connections]
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def connect(self, user_id, now, ttl):
+        with self._lock:
+            row = self._rows.get(user_id)
+            came = row is None or not row[0] or row[1] < now
+            connections = 1 if came else row[3] + 1
+            self._rows[user_id] = [True, now + ttl, now, connections]
+        return came
+
+    def disconnect(self, user_id, now):
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return False
+            if row[3] > 1 and row[0] and row[1] >= now:
+                row[2:] = [now, row[3] - 1]
+                return False
+            went = row[0]
+            self._rows[user_id] = [False, now, now, 0]
+        return went
+
+    def touch(self, user_ids, now, ttl):
+        came = []
+        with self._lock:
+            for user_id in user_ids:
+                row = self._rows.get(user_id)
+                if row is None or not row[0] or row[1] < now:
+                    came.append(user_id)
+                connections = row[3] if row else 0
+                self._rows[user_id] = [True, now + ttl, now, connections]
+        return came
+
+    def expire(self, now):
+        gone = []
+        with self._lock:
+            for user_id, row in self._rows.items():
+                if row[0] and row[1] < now:
+                    row[0], row[3] = False, 0
+                    gone.append(user_id)
+        return gone
+
+    def lookup(self, user_ids, now):
+        with self._lock:
+            rows = {user_id: self._rows.get(user_id) for user_id in user_ids}
+        return {
+            user_id: (row[0] and row[1] >= now, row[2])
+            for user_id, row in rows.items() if row is not None
+        }
+
+
+class DatabasePresenceStore:
+    """
+    UserPresence jadvali. Har bir holat o'tishi shartli UPDATE - ikki worker bir vaqtda
+    ulansa ham 'online' hodisasi bir marta yuboriladi.
+    """
+
+    def connect(self, user_id, now, ttl):
+        from .models import UserPresence
+
+        rows = UserPresence.objects.filter(user_id=user_id)
+        for _ in range(3):
+            # Allaqachon onlayn - faqat ulanishlar soni
+            if rows.filter(is_online=True, expires_at__gte=now).update(
+                connections=F('connections') + 1, expires_at=now + ttl, last_seen=now
+            ):
+                return False
+            if rows.filter(Q(is_online=False) | Q(expires_at__lt=now)).update(
+                is_online=True, connections=1, expires_at=now + ttl, last_seen=now
+            ):
+                return True
+            try:
+                with transaction.atomic():
+                    UserPresence.objects.create(
+                        user_id=user_id, is_online=True, connections=1, expires_at=now + ttl, last_seen=now
+                    )
+                return True
+            except IntegrityError:
+                continue  # Boshqa worker hozirgina yaratdi
+        return False
+
+    def disconnect(self, user_id, now):
+        from .models import UserPresence
+
+        rows = UserPresence.objects.filter(user_id=user_id)
+        if rows.filter(connections__gt=1, is_online=True, expires_at__gte=now).update(
+            connections=F('connections') - 1, last_seen=now
+        ):
+            return False
+        return bool(rows.filter(is_online=True).update(
+            is_online=False, connections=0, expires_at=now, last_seen=now
+        ))
+
+    def touch(self, user_ids, now, ttl):
+        from .models import UserPresence
+
+        alive = set(UserPresence.objects.filter(
+            user_id__in=user_ids, is_online=True, expires_at__gte=now
+        ).values_list('user_id', flat=True))
+        if alive:
+            UserPresence.objects.filter(user_id__in=alive, is_online=True).update(
+                expires_at=now + ttl, last_seen=now
+            )
+
+        came = []
+        alive = {str(user_id) for user_id in alive}
+        for user_id in user_ids:
+            if str(user_id) in alive:
+                continue
+            if UserPresence.objects.filter(user_id=user_id).filter(
+                Q(is_online=False) | Q(expires_at__lt=now)
+            ).update(is_online=True, expires_at=now + ttl, last_seen=now):
+                came.append(user_id)
+                continue
+            try:
+                with transaction.atomic():
+                    UserPresence.objects.create(
+                        user_id=user_id, is_online=True, expires_at=now + ttl, last_seen=now
+                    )
+                came.append(user_id)
+            except IntegrityError:
+                pass  # Boshqa worker hozirgina onlayn qildi (hodisani u yuboradi)
+        return came
+
+    def expire(self, now):
+        from .models import UserPresence
+
+        expired = UserPresence.objects.filter(is_online=True, expires_at__lt=now)
+        gone = []
+        for user_id in list(expired.values_list('user_id', flat=True)[:EXPIRE_BATCH]):
+            # Shu orada heartbeat kelgan bo'lsa o'tkazib yuboriladi
+            if expired.filter(user_id=user_id).update(is_online=False, connections=0):
+                gone.append(user_id)
+        return gone
+
+    def lookup(self, user_ids, now):
+        from .models import UserPresence
+
+        rows = UserPresence.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'is_online', 'expires_at', 'last_seen'
+        )
+        return {
+            str(user_id): (is_online and expires_at >= now, last_seen)
+            for user_id, is_online, expires_at, last_seen in rows
+        }
+
+
+class RedisPresenceStore:
+    """
+    Redis: presence:expires (sorted set, user -> expires_at, faqat onlayn deb e'lon qilinganlar),
+    presence:connections va presence:seen (hash). Har bir amal - bitta Lua skript.
+    """
+
+    CONNECT = """
+local now = tonumber(ARGV[1])
+local expires = tonumber(redis.call('ZSCORE', KEYS[1], ARGV[3]))
+local came = 0
+if expires and expires >= now then
+    redis.call('HINCRBY', KEYS[2], ARGV[3], 1)
+else
+    redis.call('HSET', KEYS[2], ARGV[3], 1)
+    came = 1
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('HSET', KEYS[3], ARGV[3], ARGV[1])
+return came
+"""
+
+    DISCONNECT = """
+local now = tonumber(ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[2], ARGV[1])
+if redis.call('HINCRBY', KEYS[2], ARGV[2], -1) > 0 then
+    local expires = tonumber(redis.call('ZSCORE', KEYS[1], ARGV[2]))
+    if expires and expires >= now then
+        return 0
+    end
+end
+redis.call('HDEL', KEYS[2], ARGV[2])
+return redis.call('ZREM', KEYS[1], ARGV[2])
+"""
+
+    TOUCH = """
+local now = tonumber(ARGV[1])
+local came = {}
+for i = 3, #ARGV do
+    local expires = tonumber(redis.call('ZSCORE', KEYS[1], ARGV[i]))
+    if not expires or expires < now then
+        table.insert(came, ARGV[i])
+    end
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[i])
+    redis.call('HSET', KEYS[3], ARGV[i], ARGV[1])
+end
+return came
+"""
+
+    EXPIRE = """
+local gone = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #gone > 0 then
+    redis.call('ZREM', KEYS[1], unpack(gone))
+    redis.call('HDEL', KEYS[2], unpack(gone))
+end
+return gone
+"""
+
+    def __init__(self, url, prefix='presence:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.keys = [prefix + 'expires', prefix + 'connections', prefix + 'seen']
+        self._connect = self.client.register_script(self.CONNECT)
+        self._disconnect = self.client.register_script(self.DISCONNECT)
+        self._touch = self.client.register_script(self.TOUCH)
+        self._expire = self.client.register_script(self.EXPIRE)
+
+    def connect(self, user_id, now, ttl):
+        return bool(self._connect(keys=self.keys, args=[now, ttl, str(user_id)]))
+
+    def disconnect(self, user_id, now):
+        return bool(self._disconnect(keys=self.keys, args=[now, str(user_id)]))
+
+    def touch(self, user_ids, now, ttl):
+        return self._touch(keys=self.keys, args=[now, ttl, *map(str, user_ids)])
+
+    def expire(self, now):
+        return self._expire(keys=self.keys, args=[now, EXPIRE_BATCH])
+
+    def lookup(self, user_ids, now):
+        user_ids = [str(user_id) for user_id in user_ids]
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zmscore(self.keys[0], user_ids)
+        pipe.hmget(self.keys[2], user_ids)
+        expires, seen = pipe.execute()
+        return {
+            user_id: (expires_at is not None and expires_at >= now, float(last_seen))
+            for user_id, expires_at, last_seen in zip(user_ids, expires, seen)
+            if last_seen is not None
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_presence_store():
+    """settings.PRESENCE['BACKEND'] bo'yicha ombor (jarayonda bitta)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = PRESENCE_SETTINGS.get('BACKEND', 'db')
+            if backend == 'redis':
+                _store = RedisPresenceStore(PRESENCE_SETTINGS['REDIS_URL'])
+            elif backend == 'local':
+                _store = LocalPresenceStore()
+            else:
+                _store = DatabasePresenceStore()
+        return _store
+
+
+# ---------- Jarayon ichidagi heartbeatlar ----------
+
+class PresenceTracker:
+    """Jarayondagi ochiq socketlar va faollik - FLUSH_INTERVAL da bitta touch() ga birlashtiriladi"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, timer=time.time):
+        self.flush_interval = flush_interval
+        self.timer = timer
+        self._sockets = Counter()
+        self._active = set()
+        self._lock = threading.Lock()
+        # Jarayondagi birinchi faollik darhol yoziladi
+        self._last_flush = time.monotonic() - flush_interval
+
+    def connected(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            self._sockets[user_id] += 1
+        if get_presence_store().connect(user_id, self.timer(), TTL):
+            notify([user_id], True)
+
+    def disconnected(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            self._sockets[user_id] -= 1
+            if self._sockets[user_id] <= 0:
+                del self._sockets[user_id]
+        if get_presence_store().disconnect(user_id, self.timer()):
+            notify([user_id], False)
+
+    def seen(self, user_id):
+        """Faollikni yozib qo'yish; flush() vaqti kelgan bo'lsa True (chaqiruvchi flush qiladi)"""
+        with self._lock:
+            self._active.add(str(user_id))
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.monotonic()
+        return due
+
+    def flush(self):
+        """Yig'ilgan heartbeatlarni bitta batched amal bilan yozish; yozilgan foydalanuvchilar soni"""
+        with self._lock:
+            user_ids = self._active | set(self._sockets)
+            self._active = set()
+            self._last_flush = time.monotonic()
+        if not user_ids:
+            return 0
+
+        try:
+            came = get_presence_store().touch(sorted(user_ids), self.timer(), TTL)
+        except Exception as e:
+            logger.warning(f"Presence flush error: {e}")
+            with self._lock:
+                self._active |= user_ids
+            return 0
+        if came:
+            notify(came, True)
+        return len(user_ids)
+
+
+tracker = PresenceTracker()
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc).isoformat() if value else None
+
+
+def lookup(user_ids):
+    """{user_id (str): {'is_online', 'last_seen'}} - barcha foydalanuvchilar uchun bitta so'rov"""
+    user_ids = [str(user_id) for user_id in user_ids]
+    if not user_ids:
+        return {}
+    try:
+        found = get_presence_store().lookup(user_ids, time.time())
+    except Exception as e:
+        logger.warning(f"Presence lookup error: {e}")
+        found = {}
+    result = {}
+    for user_id in user_ids:
+        is_online, last_seen = found.get(user_id, (False, None))
+        result[user_id] = {'is_online': is_online, 'last_seen': _timestamp(last_seen)}
+    return result
+
+
+def notify(user_ids, is_online):
+    """Holati o'zgargan foydalanuvchilar haqida ularning suhbatdoshlariga 'presence' hodisasi"""
+    from .models import ChatRoom
+    from .realtime import push_to_users
+
+    user_ids = {str(user_id) for user_id in user_ids}
+    peers = {user_id: set() for user_id in user_ids}
+    rooms = ChatRoom.objects.filter(Q(patient_id__in=user_ids) | Q(doctor_id__in=user_ids))
+    for patient_id, doctor_id in rooms.values_list('patient_id', 'doctor_id'):
+        patient_id, doctor_id = str(patient_id), str(doctor_id)
+        if patient_id in peers:
+            peers[patient_id].add(doctor_id)
+        if doctor_id in peers:
+            peers[doctor_id].add(patient_id)
+
+    last_seen = _timestamp(time.time())
+    for user_id, user_peers in peers.items():
+        if user_peers:
+            push_to_users(user_peers, 'presence', {
+                'user_id': user_id,
+                'is_online': is_online,
+                'last_seen': last_seen,
+            })
+
+
+def expire():
+    """TTL tugagan onlayn foydalanuvchilar -> offline (hodisa bilan); soni"""
+    gone = get_presence_store().expire(time.time())
+    if gone:
+        notify(gone, False)
+    return len(gone)
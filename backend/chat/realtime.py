@@ -0,0 +1,83 @@
+# chat/realtime.py
+"""
+Chat real-time hodisalari (Django Channels).
+
+Har bir foydalanuvchining barcha WebSocket ulanishlari bitta guruhda: chat_user_<id>.
+Hodisa xona ishtirokchilarining guruhlariga yuboriladi - mijoz xonalarga alohida
+obuna bo'lmaydi, xonalar ro'yxati (unread, oxirgi xabar) ham shu oqimdan yangilanadi.
+
+Hodisalar (mijozga {"type": <event>, ...} ko'rinishida):
+    message.new      - yangi xabar
+    message.read     - o'qildi (read receipt)
+    message.deleted  - xabar o'chirildi
+    typing           - yozmoqda
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from config.media_store import thumbnail_urls
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f'chat_user_{user_id}'
+
+
+def group_message(event, data):
+    """Channel layer xabari - ChatConsumer.chat_event ga yetib boradi"""
+    return {'type': 'chat.event', 'event': event, 'data': data}
+
+
+def message_payload(message, room):
+    """Xabar - HTTP (get_messages) va WebSocket uchun bir xil ko'rinish"""
+    return {
+        'id': str(message.id),
+        'room_id': str(room.id),
+        'sender_id': str(message.sender_id),
+        'sender': 'patient' if message.sender_id == room.patient_id else 'doctor',
+        'sender_name': message.sender_name,
+        'content': message.content,
+        'message_type': message.message_type,
+        'file_url': message.file.url if message.file else None,
+        'file_thumbnails': thumbnail_urls(message.file),
+        'is_read': message.is_read,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def read_receipt(room, reader, read_at, count):
+    return {
+        'room_id': str(room.id),
+        'reader_id': str(reader.pk),
+        'read_at': read_at.isoformat(),
+        'count': count,
+    }
+
+
+def push_to_users(user_ids, event, data):
+    """
+    Sync koddan (HTTP view) hodisa yuborish - tranzaksiya commit bo'lgandan keyin.
+    Channel layer ishlamasa xabar baribir saqlangan: mijoz keyingi sync da oladi.
+    """
+    layer = get_channel_layer()
+    if layer is None:
+        return
+
+    def send():
+        for user_id in set(user_ids):
+            try:
+                async_to_sync(layer.group_send)(user_group(user_id), group_message(event, data))
+            except Exception as e:
+                logger.warning(f"Chat push error ({event}): {e}")
+
+    transaction.on_commit(send)
+
+
+async def apush_to_users(layer, user_ids, event, data):
+    """Async koddan (consumer) hodisa yuborish"""
+    for user_id in set(user_ids):
+        await layer.group_send(user_group(user_id), group_message(event, data))
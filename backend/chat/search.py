@@ -0,0 +1,210 @@
+# chat/search.py
+"""
+Chat xabarlari bo'yicha qidiruv - har bir ishtirokchi uchun o'z indeksi (MessageSearchTerm).
+
+Matn so'zlarga bo'linadi va normallashtiriladi (indeks va so'rovda bir xil):
+    - kichik harf, apostroflar (o'/oʻ/o‘, g', tutuq belgisi) olib tashlanadi
+    - kirill -> lotin (o'zbek kirill va lotin yozuvi bir xil topiladi), ё -> е
+    - yengil o'zbek va rus qo'shimchalarini kesish (kitoblarimizdan -> kitob, врачами -> врач);
+      ў/қ/ғ/ҳ siz kirill so'z aniq rus bo'lmasa (щ/ы/ь yo'q) ikkala asosdan qisqarog'i olinadi,
+      shuning uchun "Дориларни" va "dorilarni" bir xil
+Qidiruv - barcha so'zlar bo'lgan xabarlar (AND), yangidan eskiga, (created_at, id) keyset.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+APOSTROPHES = "'ʻʼ‘’`´"
+WORD_RE = re.compile(r"[^\W_]+(?:[%s][^\W_]+)*" % APOSTROPHES)
+APOSTROPHE_TABLE = str.maketrans('', '', APOSTROPHES)
+
+MIN_STEM = 3
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 6
+SNIPPET_LENGTH = 120
+
+CYRILLIC_TO_LATIN = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'j', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch',
+    'ш': 'sh', 'щ': 'sh', 'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+})
+UZBEK_CYRILLIC = set('ўқғҳ')
+RUSSIAN_ONLY = set('щыь')
+
+# O'zbek: so'z = asos + ko'plik + egalik + kelishik; oxiridan boshlab kesiladi
+UZBEK_SUFFIXES = (
+    ('gacha', 'ning', 'dan', 'tan', 'da', 'ta', 'ga', 'ka', 'qa', 'ni'),
+    ('imiz', 'ingiz', 'lari', 'ing', 'im', 'si', 'i'),
+    ('lar',),
+)
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ая', 'яя', 'ое', 'ее',
+    'ые', 'ие', 'ый', 'ий', 'ой', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ей',
+    'ию', 'ия', 'ь', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю',
+), key=len, reverse=True)
+
+
+def _strip(word, suffixes):
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def _uzbek_stem(word):
+    # O'zgarmay qolguncha - "dori" va "dorilarni" bir xil asosga kelishi uchun
+    previous = None
+    while word != previous:
+        previous = word
+        for group in UZBEK_SUFFIXES:
+            word = _strip(word, group)
+    return word
+
+
+def normalize_word(word):
+    """Bitta so'z -> indeks termini ('' - indekslanmaydi)"""
+    word = unicodedata.normalize('NFKC', word).lower().translate(APOSTROPHE_TABLE).replace('ё', 'е')
+    letters = set(word)
+    if any('а' <= ch <= 'я' for ch in word) and not UZBEK_CYRILLIC & letters:
+        # Rus tili bo'lishi mumkin (o'zbek kirilining o'ziga xos harflari yo'q)
+        russian = _uzbek_stem(_strip(word, RUSSIAN_ENDINGS).translate(CYRILLIC_TO_LATIN))
+        if RUSSIAN_ONLY & letters:
+            word = russian
+        else:
+            # O'zbek kirili ham bo'lishi mumkin: "кечаси" -> kecha (rus yo'li - kechas)
+            uzbek = _uzbek_stem(word.translate(CYRILLIC_TO_LATIN))
+            word = uzbek if len(uzbek) <= len(russian) else russian
+    else:
+        word = _uzbek_stem(word.translate(CYRILLIC_TO_LATIN))
+    return word[:MAX_TERM_LENGTH] if len(word) >= 2 else ''
+
+
+def tokenize(text):
+    """[(termin, boshlanish, tugash)] - matndagi o'rni bilan (snippet uchun)"""
+    tokens = []
+    for match in WORD_RE.finditer(text or ''):
+        term = normalize_word(match.group())
+        if term:
+            tokens.append((term, match.start(), match.end()))
+    return tokens
+
+
+def query_terms(query):
+    terms = []
+    for term, _, _ in tokenize(query):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+# ---------- Indeks ----------
+
+def index_message(message, room=None, replace=False):
+    """Xabar terminlarini ikkala ishtirokchi indeksiga yozish (o'chirilgan xabar - indeksdan olib tashlash)"""
+    from .models import MessageSearchTerm
+
+    with transaction.atomic():
+        if replace:
+            MessageSearchTerm.objects.filter(message_id=message.pk).delete()
+        rows = _postings(message, room or message.room)
+        MessageSearchTerm.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _postings(message, room):
+    from .models import MessageSearchTerm
+
+    if message.is_deleted or message.message_type == 'system':
+        return []
+    terms = {term for term, _, _ in tokenize(message.content)}
+    return [
+        MessageSearchTerm(
+            user_id=user_id, term=term, message_id=message.pk,
+            room_id=room.pk, created_at=message.created_at
+        )
+        for user_id in (room.patient_id, room.doctor_id) for term in terms
+    ]
+
+
+def remove_message(message_id):
+    from .models import MessageSearchTerm
+
+    MessageSearchTerm.objects.filter(message_id=message_id).delete()
+
+
+def rebuild_index(batch_size=1000):
+    """Butun indeksni qayta qurish (normallashtirish qoidalari o'zgarganda)"""
+    from .models import Message, MessageSearchTerm
+
+    messages = Message.objects.filter(is_deleted=False).exclude(message_type='system').select_related('room')
+    indexed, rows = 0, []
+    with transaction.atomic():
+        MessageSearchTerm.objects.all().delete()
+        for message in messages.iterator(chunk_size=batch_size):
+            rows.extend(_postings(message, message.room))
+            indexed += 1
+            if len(rows) >= 5000:
+                MessageSearchTerm.objects.bulk_create(rows)
+                rows = []
+        MessageSearchTerm.objects.bulk_create(rows)
+    return indexed
+
+
+# ---------- Qidiruv ----------
+
+def search_messages(user, terms, before=None, room_id=None, limit=20):
+    """
+    Foydalanuvchi indeksidan barcha terminlar bo'lgan xabarlar, yangidan eskiga.
+    Eng uzun termin (odatda eng kam uchraydigan) (user, term, created_at) indeksi bo'yicha
+    tartiblangan holda o'qiladi, qolganlari shu xabar uchun EXISTS bilan tekshiriladi.
+    Natija: (xabarlar, yana_bormi).
+    """
+    from .models import Message, MessageSearchTerm
+
+    driver, *others = sorted(terms, key=len, reverse=True)
+    postings = MessageSearchTerm.objects.filter(user=user, term=driver)
+    if room_id is not None:
+        postings = postings.filter(room_id=room_id)
+    if before is not None:
+        moment, pk = before
+        postings = postings.filter(Q(created_at__lt=moment) | Q(created_at=moment, message_id__lt=pk))
+    for term in others:
+        postings = postings.filter(Exists(MessageSearchTerm.objects.filter(
+            user=user, term=term, created_at=OuterRef('created_at'), message_id=OuterRef('message_id')
+        )))
+
+    ids = list(postings.order_by('-created_at', '-message_id').values_list('message_id', flat=True)[:limit + 1])
+    has_more = len(ids) > limit
+    ids = ids[:limit]
+    messages = Message.objects.filter(id__in=ids, is_deleted=False).select_related('sender', 'room')
+    by_id = {message.id: message for message in messages}
+    return [by_id[pk] for pk in ids if pk in by_id], has_more
+
+
+def snippet(content, terms, length=SNIPPET_LENGTH):
+    """Topilgan so'zlar atrofidagi parcha va ulardagi belgilar [(boshlanish, tugash)] (parcha ichida)"""
+    wanted = set(terms)
+    matches = [(start, end) for term, start, end in tokenize(content) if term in wanted]
+    if len(content) <= length:
+        return content, [list(match) for match in matches]
+
+    first = matches[0][0] if matches else 0
+    start = max(0, min(first - length // 3, len(content) - length))
+    end = start + length
+    # So'z o'rtasidan kesmaslik
+    if start > 0:
+        space = content.find(' ', start, first if matches else start + 20)
+        start = space + 1 if space != -1 else start
+    if end < len(content):
+        space = content.rfind(' ', start, end)
+        end = space if space > start else end
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(content) else ''
+    shift = len(prefix) - start
+    highlights = [[s + shift, e + shift] for s, e in matches if s >= start and e <= end]
+    return prefix + content[start:end] + suffix, highlights
@@ -0,0 +1,254 @@
+# chat/services.py
+"""
+Chat amallari - HTTP view lar va WebSocket consumer uchun umumiy.
+Har bir amal o'zgarishni saqlaydi va ishtirokchilarga hodisa yuboradi (chat.realtime).
+"""
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import search
+from .models import ChatNotification, ChatRoom, Message
+from .realtime import message_payload, push_to_users, read_receipt
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# since tokeni shu oraliqdan yangiroq bo'lmaydi - kechikib commit bo'lgan
+# yozuvlar o'tkazib yuborilmaydi (mijoz xabarlarni id bo'yicha yangilaydi)
+SYNC_OVERLAP = timedelta(seconds=2)
+NIL_ID = uuid.UUID(int=0)
+
+
+def get_room_for_user(room_id, user):
+    """Xona - foydalanuvchi ishtirokchi bo'lmasa (yoki xona yo'q) None"""
+    try:
+        room = ChatRoom.objects.get(id=room_id)
+    except (ChatRoom.DoesNotExist, ValueError, ValidationError):
+        return None
+    if user.pk not in (room.patient_id, room.doctor_id):
+        return None
+    return room
+
+
+def other_participant_id(room, user):
+    return room.doctor_id if user.pk == room.patient_id else room.patient_id
+
+
+def create_message(room, sender, content, message_type='text', push=True, notify=True):
+    """
+    Xabar yaratish, xona oxirgi xabarini yangilash, bildirishnoma va message.new hodisasi.
+    Hammasi bitta tranzaksiyada (bitta commit).
+    """
+    with transaction.atomic():
+        message = Message.objects.create(
+            room=room,
+            sender=sender,
+            content=content,
+            message_type=message_type
+        )
+
+        # Room ni yangilash (faqat shu maydonlar - room obyekti eskirgan bo'lishi mumkin)
+        room.last_message = content[:100]
+        room.last_message_at = message.created_at
+        room.save(update_fields=['last_message', 'last_message_at', 'updated_at'])
+
+        # Suhbatdoshning o'qilmagan xabarlar hisoblagichi
+        add_unread(room, other_participant_id(room, sender), 1, notified_at=message.created_at)
+
+        # Notifikatsiya yuborish
+        if notify:
+            try:
+                from notifications.views import create_notification
+                with transaction.atomic():
+                    other_user = room.doctor if sender.pk == room.patient_id else room.patient
+                    create_notification(
+                        user=other_user,
+                        title='Yangi xabar',
+                        message=f'{sender.first_name}: {content[:50]}...' if len(content) > 50 else f'{sender.first_name}: {content}',
+                        notif_type='new_message'
+                    )
+            except:
+                pass
+
+    payload = message_payload(message, room)
+    if push:
+        push_to_users([room.patient_id, room.doctor_id], 'message.new', {'message': payload})
+    return message, payload
+
+
+def mark_room_read(room, user, push=True, message_ids=None):
+    """
+    Suhbatdoshning o'qilmagan xabarlarini o'qilgan deb belgilash; (soni, vaqt).
+    message_ids berilsa - faqat shu xabarlar (mijozga haqiqatda yetkazilganlari).
+    updated_at ham yangilanadi - yuboruvchi is_read o'zgarishini delta sync da oladi.
+    """
+    read_at = timezone.now()
+    messages = Message.objects.filter(room=room, is_read=False, is_deleted=False).exclude(sender_id=user.pk)
+    if message_ids is not None:
+        if not message_ids:
+            return 0, read_at
+        messages = messages.filter(id__in=message_ids)
+
+    with transaction.atomic():
+        count = messages.update(
+            is_read=True,
+            read_at=read_at,
+            updated_at=read_at
+        )
+        if message_ids is None:
+            # Hammasi o'qildi - hisoblagich ham 0 (agar biror sabab bilan siljigan bo'lsa ham)
+            ChatNotification.objects.filter(room=room, user_id=user.pk).update(unread_count=0)
+        elif count:
+            add_unread(room, user.pk, -count)
+
+    if count and push:
+        push_to_users([room.patient_id, room.doctor_id], 'message.read', read_receipt(room, user, read_at, count))
+    return count, read_at
+
+
+def delete_message(message, push=True):
+    """Xabarni o'chirilgan deb belgilash, hisoblagich va oxirgi xabarni tuzatish, message.deleted hodisasi"""
+    room = message.room
+    now = timezone.now()
+    changes = {'is_deleted': True, 'content': "Bu xabar o'chirildi", 'updated_at': now}
+
+    with transaction.atomic():
+        # Shartli UPDATE - bir vaqtdagi mark_room_read bilan hisoblagich ikki marta kamaymaydi
+        alive = Message.objects.filter(pk=message.pk, is_deleted=False)
+        was_unread = alive.filter(is_read=False).update(**changes)
+        if was_unread:
+            add_unread(room, room.doctor_id if message.sender_id == room.patient_id else room.patient_id, -1)
+        elif not alive.update(**changes):
+            return
+        for field, value in changes.items():
+            setattr(message, field, value)
+        search.remove_message(message.pk)
+
+        if room.last_message_at and message.created_at >= room.last_message_at:
+            refresh_last_message(room)
+
+    if push:
+        push_to_users([room.patient_id, room.doctor_id], 'message.deleted', {
+            'room_id': str(room.id),
+            'message_id': str(message.id),
+        })
+
+
+def add_unread(room, user_id, delta, notified_at=None):
+    """Ishtirokchining o'qilmagan xabarlar hisoblagichini atomar o'zgartirish (0 dan pastga tushmaydi)"""
+    fields = {'unread_count': Greatest(F('unread_count') + delta, 0)}
+    if notified_at is not None:
+        fields['last_notified_at'] = notified_at
+    counters = ChatNotification.objects.filter(room=room, user_id=user_id)
+    if counters.update(**fields):
+        return
+    try:
+        with transaction.atomic():
+            ChatNotification.objects.create(
+                room=room, user_id=user_id, unread_count=max(delta, 0), last_notified_at=notified_at
+            )
+    except IntegrityError:
+        # Boshqa so'rov yaratib ulgurdi
+        counters.update(**fields)
+
+
+def refresh_last_message(room):
+    """Oxirgi xabar o'chirilganda xona ko'rinishini oldingi xabarga qaytarish"""
+    last = Message.objects.filter(room=room, is_deleted=False).order_by('-created_at', '-id').first()
+    room.last_message = last.content[:100] if last else ''
+    room.last_message_at = last.created_at if last else None
+    room.save(update_fields=['last_message', 'last_message_at'])
+
+
+def unread_counts(room):
+    """Xabarlardan qayta hisoblash - {user_id: soni} (tekshirish va tuzatish uchun)"""
+    base = Message.objects.filter(room=room, is_read=False, is_deleted=False)
+    return {
+        room.patient_id: base.filter(sender_id=room.doctor_id).count(),
+        room.doctor_id: base.filter(sender_id=room.patient_id).count(),
+    }
+
+
+# ---------- Tarix: keyset sahifalash va delta sync ----------
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment, pk):
+    """(vaqt, id) -> URL uchun xavfsiz satr"""
+    raw = f'{moment.isoformat()}|{pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        raw = urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        moment, pk = raw.split('|', 1)
+        moment = datetime.fromisoformat(moment)
+        pk = uuid.UUID(pk)
+    except ValueError:
+        raise InvalidCursor(value)
+    if timezone.is_naive(moment):
+        raise InvalidCursor(value)
+    return moment, pk
+
+
+def sync_floor():
+    """Hozirgi holat uchun since tokeni (SYNC_OVERLAP oldinroq)"""
+    return timezone.now() - SYNC_OVERLAP, NIL_ID
+
+
+def _newer(field, cursor):
+    moment, pk = cursor
+    return Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk})
+
+
+def _older(field, cursor):
+    moment, pk = cursor
+    return Q(**{f'{field}__lt': moment}) | Q(**{field: moment, 'id__lt': pk})
+
+
+def message_page(room, before=None, after=None, limit=PAGE_SIZE):
+    """
+    (created_at, id) bo'yicha bitta sahifa - o'sish tartibida; (xabarlar, yana_bormi).
+    after berilsa - undan keyingi eng eski xabarlar, aks holda before dan oldingi
+    (yoki umuman) eng yangi xabarlar.
+    """
+    messages = Message.objects.filter(room=room, is_deleted=False).select_related('sender')
+    if before is not None:
+        messages = messages.filter(_older('created_at', before))
+    if after is not None:
+        messages = messages.filter(_newer('created_at', after))
+        rows = list(messages.order_by('created_at', 'id')[:limit + 1])
+        return rows[:limit], len(rows) > limit
+
+    rows = list(messages.order_by('-created_at', '-id')[:limit + 1])
+    return rows[:limit][::-1], len(rows) > limit
+
+
+def message_changes(room, since, limit=PAGE_SIZE):
+    """
+    since tokenidan keyin o'zgargan xabarlar (yangi, tahrirlangan, o'chirilgan, o'qilgan)
+    updated_at bo'yicha; (xabarlar, yana_bormi, keyingi token).
+    """
+    floor = sync_floor()
+    rows = list(
+        Message.objects.filter(room=room)
+        .filter(_newer('updated_at', since))
+        .select_related('sender')
+        .order_by('updated_at', 'id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    token = (rows[-1].updated_at, rows[-1].id) if rows else since
+    if not has_more and token > floor:
+        token = max(floor, since)
+    return rows, has_more, token
@@ -0,0 +1,27 @@
+# chat/tasks.py
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='chat.tasks.expire_stale_calls')
+def expire_stale_calls():
+    """Javob berilmagan qo'ng'iroqlarni missed qilish (ishtirokchilarga call.missed)"""
+    from .calls import expire_stale_calls as expire
+
+    expired = expire()
+    if expired:
+        logger.info(f"Stale calls expired: {expired}")
+    return expired
+
+
+@shared_task(name='chat.tasks.expire_presence')
+def expire_presence():
+    """Heartbeat TTL tugagan foydalanuvchilarni offline qilish (suhbatdoshlarga presence)"""
+    from .presence import expire
+
+    expired = expire()
+    if expired:
+        logger.info(f"Presence expired: {expired}")
+    return expired
@@ -1,3 +1,32 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .search import normalize_word, query_terms, tokenize
+
+
+class NormalizeWordTests(SimpleTestCase):
+    """O'zbek kirill va lotin yozuvi bir xil terminga, rus shakllari bitta asosga"""
+
+    def test_uzbek_cyrillic_matches_latin(self):
+        pairs = [
+            ('Дориларни', 'dorilarni'),
+            ('дори', 'dorilar'),
+            ('кечаси', 'kechasi'),
+            ('таблетка', 'tabletka'),
+            ('китобларимиздан', 'kitoblarimizdan'),
+            ('қачон', 'qachon'),
+        ]
+        for cyrillic, latin in pairs:
+            with self.subTest(word=cyrillic):
+                self.assertEqual(normalize_word(cyrillic), normalize_word(latin))
+
+    def test_russian_forms(self):
+        for word in ['врач', 'врача', 'врачи', 'врачами']:
+            with self.subTest(word=word):
+                self.assertEqual(normalize_word(word), 'vrach')
+        self.assertEqual(normalize_word('головы'), normalize_word('голову'))
+
+    def test_query_finds_cyrillic_message(self):
+        terms = {term for term, _, _ in tokenize('Дориларни қачон ичаман?')}
+        for query in ['dorilar', 'дори', 'Qachon']:
+            with self.subTest(query=query):
+                self.assertTrue(set(query_terms(query)) <= terms)
@@ -20,6 +20,9 @@ urlpatterns = [
     # Unread
     path('unread/', views.get_unread_count, name='unread-count'),
 
+    # Search
+    path('search/', views.search_messages, name='chat-search'),
+
     # Delete
     path('messages/<str:message_id>/delete/', views.delete_message, name='delete-message'),
 
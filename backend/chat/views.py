@@ -3,10 +3,13 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from django.db.models import Q, Count, Max
-from django.utils import timezone
+from django.db.models import Q, F, Sum, FilteredRelation
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
+from config.media_store import thumbnail_url
 from .models import ChatRoom, Message, ChatNotification, VideoCall
+from .realtime import message_payload
+from . import calls, presence, search, services
 
 
 @api_view(['GET'])
@@ -20,6 +23,7 @@ def chat_root(request):
             'messages': '/api/chat/rooms/{room_id}/messages/',
             'send': '/api/chat/rooms/{room_id}/send/',
             'start': '/api/chat/start/{doctor_id}/',
+            'search': '/api/chat/search/?q=...',
         }
     })
 
@@ -27,34 +31,34 @@ def chat_root(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chat_rooms(request):
-    """Foydalanuvchining barcha chat xonalari"""
+    """Foydalanuvchining barcha chat xonalari - bitta so'rov (hisoblagich ChatNotification da)"""
 
     user = request.user
     rooms = ChatRoom.objects.filter(
         Q(patient=user) | Q(doctor=user),
         is_active=True
-    ).select_related('patient', 'doctor').order_by('-updated_at')
+    ).annotate(
+        my_counter=FilteredRelation('notifications', condition=Q(notifications__user=user)),
+        unread=Coalesce(F('my_counter__unread_count'), 0),
+    ).select_related(
+        'patient', 'doctor', 'doctor__doctor_profile__specialization'
+    ).order_by('-updated_at')
+
+    rooms = list(rooms)
+    # Barcha suhbatdoshlarning onlayn holati - bitta so'rov
+    online = presence.lookup({room.doctor_id if room.patient_id == user.pk else room.patient_id for room in rooms})
 
     result = []
     for room in rooms:
-        is_patient = room.patient == user
+        is_patient = room.patient_id == user.pk
         other_user = room.doctor if is_patient else room.patient
 
-        # Unread count
-        unread = Message.objects.filter(
-            room=room,
-            is_read=False
-        ).exclude(sender=user).count()
-
-        # Specialty olish
+        # Specialty (faqat suhbatdosh shifokor bo'lsa)
         specialty = 'Shifokor'
-        try:
-            from doctors.models import Doctor
-            doctor_profile = Doctor.objects.filter(user=other_user).first()
+        if is_patient:
+            doctor_profile = getattr(other_user, 'doctor_profile', None)
             if doctor_profile:
-                specialty = doctor_profile.specialty
-        except:
-            pass
+                specialty = doctor_profile.specialization.name_uz or doctor_profile.specialization.name
 
         result.append({
             'id': str(room.id),
@@ -62,10 +66,12 @@ def get_chat_rooms(request):
             'doctor_name': f"Dr. {other_user.first_name} {other_user.last_name}".strip() or other_user.email,
             'doctor_specialty': specialty,
             'doctor_avatar': other_user.avatar.url if other_user.avatar else None,
+            'doctor_avatar_thumbnail': thumbnail_url(other_user.avatar),
             'last_message': room.last_message,
             'last_message_at': room.last_message_at.isoformat() if room.last_message_at else None,
-            'unread_count': unread,
-            'is_online': True  # TODO: implement online status
+            'unread_count': room.unread,
+            'is_online': online[str(other_user.id)]['is_online'],
+            'last_seen': online[str(other_user.id)]['last_seen'],
         })
 
     return Response(result)
@@ -74,7 +80,18 @@ def get_chat_rooms(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_messages(request, room_id):
-    """Chat xonasidagi xabarlar"""
+    """
+    Chat xonasidagi xabarlar.
+
+    Parametrlar (ixtiyoriy):
+        limit   - sahifa hajmi (standart 50, ko'pi bilan 200)
+        before  - shu cursordan oldingi xabarlar (eski tarix)
+        after   - shu cursordan keyingi xabarlar
+        since   - sync tokenidan keyingi o'zgarishlar (yangi, tahrirlangan, o'chirilgan)
+    Parametr bo'lsa javob: {messages, deleted, has_more, before, after, sync}.
+    Parametrsiz - eski mijozlar uchun oxirgi MAX_PAGE_SIZE ta xabar ro'yxati.
+    Faqat javobda yetkazilgan xabarlar o'qilgan deb belgilanadi.
+    """
 
     room = get_object_or_404(ChatRoom, id=room_id)
 
@@ -82,29 +99,57 @@ def get_messages(request, room_id):
     if request.user not in [room.patient, room.doctor]:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    messages = Message.objects.filter(
-        room=room,
-        is_deleted=False
-    ).select_related('sender').order_by('created_at')
+    params = request.query_params
+    if not any(name in params for name in ('limit', 'before', 'after', 'since')):
+        messages, _ = services.message_page(room, limit=services.MAX_PAGE_SIZE)
+        _mark_delivered(room, request.user, messages)
+        return Response([message_payload(msg, room) for msg in messages])
 
-    # Xabarlarni o'qilgan deb belgilash
-    messages.filter(is_read=False).exclude(sender=request.user).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
+    try:
+        limit = min(max(int(params.get('limit', services.PAGE_SIZE)), 1), services.MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'error': 'limit butun son bo\'lishi kerak'}, status=400)
 
-    result = [{
-        'id': str(msg.id),
-        'sender': 'patient' if msg.sender == room.patient else 'doctor',
-        'sender_name': msg.sender_name,
-        'content': msg.content,
-        'message_type': msg.message_type,
-        'file_url': msg.file.url if msg.file else None,
-        'is_read': msg.is_read,
-        'created_at': msg.created_at.isoformat()
-    } for msg in messages]
+    try:
+        cursors = {
+            name: services.decode_cursor(params[name])
+            for name in ('before', 'after', 'since') if params.get(name)
+        }
+    except services.InvalidCursor:
+        return Response({'error': 'Noto\'g\'ri cursor'}, status=400)
+
+    deleted = []
+    if 'since' in cursors:
+        changed, has_more, sync = services.message_changes(room, cursors['since'], limit)
+        messages = [msg for msg in changed if not msg.is_deleted]
+        deleted = [str(msg.id) for msg in changed if msg.is_deleted]
+    else:
+        sync = services.sync_floor()
+        messages, has_more = services.message_page(
+            room, before=cursors.get('before'), after=cursors.get('after'), limit=limit
+        )
 
-    return Response(result)
+    _mark_delivered(room, request.user, messages)
+
+    return Response({
+        'messages': [message_payload(msg, room) for msg in messages],
+        'deleted': deleted,
+        'has_more': has_more,
+        'before': services.encode_cursor(messages[0].created_at, messages[0].id) if messages else None,
+        'after': services.encode_cursor(messages[-1].created_at, messages[-1].id) if messages else None,
+        'sync': services.encode_cursor(*sync),
+    })
+
+
+def _mark_delivered(room, user, messages):
+    """Yetkazilgan o'qilmagan xabarlarni o'qilgan deb belgilash (suhbatdoshga read receipt)"""
+    unread = [msg for msg in messages if not msg.is_read and msg.sender_id != user.pk]
+    if not unread:
+        return
+    _, read_at = services.mark_room_read(room, user, message_ids=[msg.id for msg in unread])
+    for msg in unread:
+        msg.is_read = True
+        msg.read_at = read_at
 
 
 @api_view(['POST'])
@@ -122,41 +167,10 @@ def send_message(request, room_id):
     if request.user not in [room.patient, room.doctor]:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    # Xabar yaratish
-    message = Message.objects.create(
-        room=room,
-        sender=request.user,
-        content=content,
-        message_type=message_type
-    )
-
-    # Room ni yangilash
-    room.last_message = content[:100]
-    room.last_message_at = timezone.now()
-    room.save()
-
-    # Notifikatsiya yuborish
-    try:
-        from notifications.views import create_notification
-        other_user = room.doctor if request.user == room.patient else room.patient
-        create_notification(
-            user=other_user,
-            title='Yangi xabar',
-            message=f'{request.user.first_name}: {content[:50]}...' if len(content) > 50 else f'{request.user.first_name}: {content}',
-            notif_type='new_message'
-        )
-    except:
-        pass
+    # Xabar yaratish - ishtirokchilarning WebSocket ulanishlariga ham yuboriladi
+    message, payload = services.create_message(room, request.user, content, message_type)
 
-    return Response({
-        'id': str(message.id),
-        'sender': 'patient' if message.sender == room.patient else 'doctor',
-        'sender_name': message.sender_name,
-        'content': message.content,
-        'message_type': message.message_type,
-        'is_read': False,
-        'created_at': message.created_at.isoformat()
-    }, status=201)
+    return Response(payload, status=201)
 
 
 @api_view(['POST'])
@@ -193,13 +207,7 @@ def mark_as_read(request, room_id):
     if request.user not in [room.patient, room.doctor]:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    Message.objects.filter(
-        room=room,
-        is_read=False
-    ).exclude(sender=request.user).update(
-        is_read=True,
-        read_at=timezone.now()
-    )
+    services.mark_room_read(room, request.user)
 
     return Response({'success': True})
 
@@ -209,20 +217,61 @@ def mark_as_read(request, room_id):
 def get_unread_count(request):
     """Jami o'qilmagan xabarlar soni"""
 
-    user = request.user
-    rooms = ChatRoom.objects.filter(
-        Q(patient=user) | Q(doctor=user),
-        is_active=True
-    )
-
-    total_unread = Message.objects.filter(
-        room__in=rooms,
-        is_read=False
-    ).exclude(sender=user).count()
+    total_unread = ChatNotification.objects.filter(
+        user=request.user,
+        room__is_active=True
+    ).aggregate(total=Sum('unread_count'))['total'] or 0
 
     return Response({'unread_count': total_unread})
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_messages(request):
+    """
+    Foydalanuvchi suhbatlari bo'yicha qidiruv.
+
+    Parametrlar: q (majburiy), room_id, limit (standart 20, ko'pi bilan 50), before (cursor).
+    Javob: {results: [{message, snippet, highlights}], has_more, before}.
+    highlights - snippet ichidagi topilgan so'zlar [boshlanish, tugash].
+    """
+    params = request.query_params
+    terms = search.query_terms(params.get('q', ''))
+    if not terms:
+        return Response({'error': 'Qidiruv so\'zi kiritilmagan'}, status=400)
+
+    try:
+        limit = min(max(int(params.get('limit', 20)), 1), 50)
+    except ValueError:
+        return Response({'error': 'limit butun son bo\'lishi kerak'}, status=400)
+
+    try:
+        before = services.decode_cursor(params['before']) if params.get('before') else None
+    except services.InvalidCursor:
+        return Response({'error': 'Noto\'g\'ri cursor'}, status=400)
+
+    room_id = params.get('room_id') or None
+    if room_id is not None and services.get_room_for_user(room_id, request.user) is None:
+        return Response({'error': 'Ruxsat yo\'q'}, status=403)
+
+    messages, has_more = search.search_messages(request.user, terms, before=before, room_id=room_id, limit=limit)
+
+    results = []
+    for message in messages:
+        text, highlights = search.snippet(message.content, terms)
+        results.append({
+            'message': message_payload(message, message.room),
+            'snippet': text,
+            'highlights': highlights,
+        })
+
+    return Response({
+        'results': results,
+        'has_more': has_more,
+        'before': services.encode_cursor(messages[-1].created_at, messages[-1].id) if messages else None,
+    })
+
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_message(request, message_id):
@@ -233,14 +282,28 @@ def delete_message(request, message_id):
     if message.sender != request.user:
         return Response({'error': 'Faqat o\'z xabaringizni o\'chira olasiz'}, status=403)
 
-    message.is_deleted = True
-    message.content = "Bu xabar o'chirildi"
-    message.save()
+    services.delete_message(message)
 
     return Response({'success': True})
 
 
 # ============== VIDEO CALL ==============
+# Holat o'zgarishlari chat WebSocket ga ham yuboriladi (chat.calls); bu endpointlar
+# WebSocket siz mijozlar va qayta ulanishdagi holatni tiklash uchun.
+
+def _call_error(error):
+    body = {'error': error.message}
+    if error.call is not None:
+        body.update({'call_id': str(error.call.id), 'status': error.call.status})
+    return Response(body, status=error.status)
+
+
+def _get_call(request, call_id):
+    call = get_object_or_404(VideoCall.objects.select_related('caller', 'receiver', 'room'), id=call_id)
+    if request.user.pk not in (call.caller_id, call.receiver_id):
+        return None
+    return call
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -251,139 +314,66 @@ def start_video_call(request, room_id):
     if request.user not in [room.patient, room.doctor]:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    # Faol qo'ng'iroq bor-yo'qligini tekshirish
-    active_call = VideoCall.objects.filter(
-        room=room,
-        status__in=['pending', 'ringing', 'active']
-    ).first()
-
-    if active_call:
-        return Response({
-            'error': 'Bu xonada faol qo\'ng\'iroq mavjud',
-            'call_id': str(active_call.id),
-            'status': active_call.status
-        }, status=400)
-
-    receiver = room.doctor if request.user == room.patient else room.patient
-    is_video = request.data.get('is_video', True)
-
-    call = VideoCall.objects.create(
-        room=room,
-        caller=request.user,
-        receiver=receiver,
-        is_video=is_video,
-        status='ringing'
-    )
-
-    # Notifikatsiya yuborish
     try:
-        from notifications.views import create_notification
-        create_notification(
-            user=receiver,
-            title='Kiruvchi qo\'ng\'iroq',
-            message=f'{request.user.first_name} {"video" if is_video else "audio"} qo\'ng\'iroq qilmoqda',
-            notif_type='incoming_call'
+        call = calls.start_call(
+            room,
+            request.user,
+            is_video=request.data.get('is_video', True),
+            offer=request.data.get('sdp', '')
         )
-    except:
-        pass
+    except calls.CallError as e:
+        return _call_error(e)
 
-    return Response({
-        'call_id': str(call.id),
-        'room_id': str(room.id),
-        'caller': {
-            'id': str(request.user.id),
-            'name': request.user.get_full_name()
-        },
-        'receiver': {
-            'id': str(receiver.id),
-            'name': receiver.get_full_name()
-        },
-        'is_video': is_video,
-        'status': 'ringing'
-    }, status=201)
+    return Response(calls.call_payload(call), status=201)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def answer_call(request, call_id):
     """Qo'ng'iroqqa javob berish"""
-    call = get_object_or_404(VideoCall, id=call_id)
-
-    if request.user != call.receiver:
+    call = _get_call(request, call_id)
+    if call is None:
         return Response({'error': 'Siz bu qo\'ng\'iroqni qabul qila olmaysiz'}, status=403)
 
-    if call.status not in ['pending', 'ringing']:
-        return Response({'error': 'Qo\'ng\'iroq holati mos emas'}, status=400)
-
-    call.status = 'active'
-    call.started_at = timezone.now()
-    call.save()
+    try:
+        calls.answer_call(call, request.user, answer=request.data.get('sdp', ''))
+    except calls.CallError as e:
+        return _call_error(e)
 
-    return Response({
-        'call_id': str(call.id),
-        'status': 'active',
-        'started_at': call.started_at.isoformat()
-    })
+    return Response(calls.call_payload(call))
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def decline_call(request, call_id):
     """Qo'ng'iroqni rad etish"""
-    call = get_object_or_404(VideoCall, id=call_id)
-
-    if request.user not in [call.caller, call.receiver]:
+    call = _get_call(request, call_id)
+    if call is None:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    if call.status in ['ended', 'missed', 'declined']:
-        return Response({'error': 'Qo\'ng\'iroq allaqachon tugagan'}, status=400)
-
-    if request.user == call.receiver:
-        call.status = 'declined'
-    else:
-        call.status = 'ended'
-
-    call.ended_at = timezone.now()
-    call.save()
+    try:
+        calls.decline_call(call, request.user)
+    except calls.CallError as e:
+        return _call_error(e)
 
-    return Response({
-        'call_id': str(call.id),
-        'status': call.status
-    })
+    return Response(calls.call_payload(call))
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def end_call(request, call_id):
     """Qo'ng'iroqni tugatish"""
-    call = get_object_or_404(VideoCall, id=call_id)
-
-    if request.user not in [call.caller, call.receiver]:
+    call = _get_call(request, call_id)
+    if call is None:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    if call.status == 'ended':
-        return Response({'error': 'Qo\'ng\'iroq allaqachon tugagan'}, status=400)
-
-    call.status = 'ended'
-    call.ended_at = timezone.now()
-
-    if call.started_at:
-        call.duration = int((call.ended_at - call.started_at).total_seconds())
-
-    call.save()
-
-    # Chat xabariga qo'shish
-    Message.objects.create(
-        room=call.room,
-        sender=request.user,
-        message_type='system',
-        content=f'{"Video" if call.is_video else "Audio"} qo\'ng\'iroq: {call.duration_formatted}'
-    )
+    try:
+        calls.end_call(call, request.user)
+    except calls.CallError as e:
+        return _call_error(e)
 
     return Response({
-        'call_id': str(call.id),
-        'status': 'ended',
-        'duration': call.duration,
+        **calls.call_payload(call),
         'duration_formatted': call.duration_formatted
     })
 
@@ -392,37 +382,23 @@ def end_call(request, call_id):
 @permission_classes([IsAuthenticated])
 def get_call_status(request, call_id):
     """Qo'ng'iroq holatini olish"""
-    call = get_object_or_404(VideoCall, id=call_id)
-
-    if request.user not in [call.caller, call.receiver]:
+    call = _get_call(request, call_id)
+    if call is None:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    return Response({
-        'call_id': str(call.id),
-        'room_id': str(call.room.id),
-        'caller': {
-            'id': str(call.caller.id),
-            'name': call.caller.get_full_name()
-        },
-        'receiver': {
-            'id': str(call.receiver.id),
-            'name': call.receiver.get_full_name()
-        },
-        'status': call.status,
-        'is_video': call.is_video,
-        'started_at': call.started_at.isoformat() if call.started_at else None,
-        'duration': call.duration
-    })
+    return Response(calls.call_payload(call))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_incoming_call(request):
-    """Kiruvchi qo'ng'iroqni tekshirish"""
+    """Kiruvchi qo'ng'iroqni tekshirish (WebSocket ulanganda holatni tiklash uchun)"""
+    calls.expire_stale_calls(receiver=request.user)
+
     call = VideoCall.objects.filter(
         receiver=request.user,
         status='ringing'
-    ).order_by('-created_at').first()
+    ).select_related('caller').order_by('-created_at').first()
 
     if not call:
         return Response({'has_incoming_call': False})
@@ -431,13 +407,14 @@ def get_incoming_call(request):
         'has_incoming_call': True,
         'call': {
             'call_id': str(call.id),
-            'room_id': str(call.room.id),
+            'room_id': str(call.room_id),
             'caller': {
                 'id': str(call.caller.id),
                 'name': call.caller.get_full_name(),
                 'avatar': call.caller.avatar.url if call.caller.avatar else None
             },
             'is_video': call.is_video,
+            'sdp': call.caller_offer,
             'created_at': call.created_at.isoformat()
         }
     })
@@ -452,17 +429,17 @@ def get_call_history(request, room_id):
     if request.user not in [room.patient, room.doctor]:
         return Response({'error': 'Ruxsat yo\'q'}, status=403)
 
-    calls = VideoCall.objects.filter(room=room).order_by('-created_at')[:20]
+    history = VideoCall.objects.filter(room=room).select_related('caller').order_by('-created_at')[:20]
 
     result = [{
         'id': str(call.id),
         'caller': call.caller.get_full_name(),
-        'is_outgoing': call.caller == request.user,
+        'is_outgoing': call.caller_id == request.user.pk,
         'status': call.status,
         'is_video': call.is_video,
         'duration': call.duration,
         'duration_formatted': call.duration_formatted,
         'created_at': call.created_at.isoformat()
-    } for call in calls]
+    } for call in history]
 
     return Response(result)
\ No newline at end of file
@@ -9,13 +9,17 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 # Django ASGI application
 django_asgi_app = get_asgi_application()
 
+# Django yuklangandan keyin (modellar kerak)
+from chat.middleware import JWTAuthMiddleware  # noqa: E402
+from chat.routing import websocket_urlpatterns  # noqa: E402
+
 # ASGI application
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    # WebSocket support (for future real-time features)
-    # "websocket": AuthMiddlewareStack(
-    #     URLRouter([
-    #         # WebSocket URL patterns will be added here
-    #     ])
-    # ),
-})
\ No newline at end of file
+    # WebSocket - chat (JWT: ws/chat/?token=...)
+    "websocket": AuthMiddlewareStack(
+        JWTAuthMiddleware(
+            URLRouter(websocket_urlpatterns)
+        )
+    ),
+})
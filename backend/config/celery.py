@@ -13,6 +13,7 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Tasks modullarini avtomatik topish
 app.autodiscover_tasks()
+app.autodiscover_tasks(['config'], related_name='media_store')
 
 # Beat schedule - har kuni soat 8:00 da eslatmalar yuboriladi
 app.conf.beat_schedule = {
@@ -30,6 +31,42 @@ app.conf.beat_schedule = {
         'task': 'medicines.tasks.send_medicine_reminders',
         'schedule': crontab(minute='*/30'),  # Har 30 daqiqada
     },
+    'cleanup-ai-jobs': {
+        'task': 'ai_service.tasks.cleanup_ai_jobs',
+        'schedule': crontab(hour=3, minute=0),  # Har kuni soat 3:00 da
+    },
+    'cleanup-throttle-buckets': {
+        'task': 'ai_service.tasks.cleanup_throttle_buckets',
+        'schedule': crontab(minute=15),  # Har soatda
+    },
+    'compact-llm-usage': {
+        'task': 'ai_service.tasks.compact_llm_usage',
+        'schedule': crontab(hour=3, minute=30),  # Har kuni soat 3:30 da
+    },
+    'rollup-symptom-stats': {
+        'task': 'ai_service.tasks.rollup_symptom_stats',
+        'schedule': crontab(minute='*/10'),  # Har 10 daqiqada
+    },
+    'expire-stale-calls': {
+        'task': 'chat.tasks.expire_stale_calls',
+        'schedule': crontab(),  # Har daqiqada
+    },
+    'warm-map-tiles': {
+        'task': 'hospitals.tasks.warm_map_tiles',
+        'schedule': crontab(minute='*/10'),  # Har 10 daqiqada
+    },
+    'expire-presence': {
+        'task': 'chat.tasks.expire_presence',
+        'schedule': crontab(),  # Har daqiqada
+    },
+    'refresh-air-quality': {
+        'task': 'air_quality.tasks.refresh_air_quality',
+        'schedule': crontab(minute='*/30'),  # Har 30 daqiqada; har shahar soatiga bir marta (IQAir: 10 x 24 = 240 so'rov/kun)
+    },
+    'sweep-media': {
+        'task': 'config.media_store.sweep_media',
+        'schedule': crontab(minute=40),  # Har soatda
+    },
 }
 
 app.conf.timezone = 'Asia/Tashkent'
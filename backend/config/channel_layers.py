@@ -0,0 +1,454 @@
+# config/channel_layers.py
+"""
+Bir nechta worker jarayoni uchun channel layer - tashqi broker talab qilinmaydi.
+
+Har jarayon o'z kanallari va guruhlarini xotirada saqlaydi (InMemoryChannelLayer);
+group_send va boshqa jarayondagi kanalga send transport orqali barcha jarayonlarga
+tarqatiladi, har jarayon faqat o'zidagi a'zolarga yetkazadi.
+
+Transportlar (CHANNEL_LAYERS CONFIG 'transport'):
+    postgres - LISTEN/NOTIFY, mavjud baza orqali (bir nechta host ham)
+    unix     - bitta hostdagi jarayonlar, unix datagram socketlar (SQLite / dev)
+    redis    - Redis protokolli server pub/sub (Redis, Valkey, KeyDB ...)
+    auto     - baza PostgreSQL bo'lsa postgres, aks holda unix
+
+Yetkazish kafolati InMemoryChannelLayer bilan bir xil: eng ko'pi bilan bir marta,
+kanal to'lsa yoki jarayon tushib qolsa xabar yo'qoladi. Xabarlar JSON bo'lishi kerak.
+"""
+import asyncio
+import atexit
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import select
+import socket
+import stat
+import string
+import tempfile
+import threading
+import time
+import uuid
+from copy import deepcopy
+
+from channels.layers import InMemoryChannelLayer
+
+logger = logging.getLogger(__name__)
+
+
+def default_socket_dir():
+    """Foydalanuvchi va loyiha (BASE_DIR) bo'yicha alohida katalog - boshqa deploy lar aralashmaydi"""
+    from django.conf import settings
+
+    namespace = hashlib.sha256(str(settings.BASE_DIR).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f'healthhub-channels-{os.getuid()}-{namespace}')
+
+
+def private_dir(path):
+    """Faqat shu foydalanuvchi yoza oladigan katalog (0700); begona yoki symlink bo'lsa xato"""
+    from django.core.exceptions import ImproperlyConfigured
+
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise ImproperlyConfigured(f"Channel layer socket dir {path} is not a private directory of this user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+class UnixSocketTransport:
+    """
+    Bitta hostdagi jarayonlar: har listener <dir>/<token>.sock ga bog'lanadi.
+    Katalog 0700 - boshqa foydalanuvchilar hodisa yubora olmaydi.
+    Publish thread navbatdagi xabarlarni bitta datagramga jamlab (qatorlar bilan)
+    katalogdagi barcha socketlarga yuboradi - sekin jarayon event loopni bloklamaydi.
+    """
+
+    MAX_DATAGRAM = 64 * 1024
+    SEND_TIMEOUT = 2
+
+    def __init__(self, socket_dir=None):
+        self.dir = private_dir(socket_dir or default_socket_dir())
+        self.own_path = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.settimeout(self.SEND_TIMEOUT)
+        self._peers = []
+        self._peers_mtime = None
+        self._publisher = QueuedPublisher(self._send_batch, 'channel-layer-unix-publish')
+
+    def _current_peers(self):
+        # Katalog o'zgarganda (jarayon qo'shildi/chiqdi) qayta o'qiladi
+        mtime = os.stat(self.dir).st_mtime_ns
+        if mtime != self._peers_mtime:
+            self._peers = [
+                entry.path for entry in os.scandir(self.dir)
+                if entry.name.endswith('.sock') and entry.path != self.own_path
+            ]
+            self._peers_mtime = mtime
+        return self._peers
+
+    def publish(self, payload):
+        self._publisher.publish(payload)
+
+    def _datagrams(self, batch):
+        datagram, size = [], 0
+        for payload in batch:
+            data = payload.encode()
+            if len(data) > self.MAX_DATAGRAM:
+                logger.warning(f"Channel layer: message too large ({len(data)} bytes), dropped")
+                continue
+            if size + len(data) + 1 > self.MAX_DATAGRAM:
+                yield b'\n'.join(datagram)
+                datagram, size = [], 0
+            datagram.append(data)
+            size += len(data) + 1
+        if datagram:
+            yield b'\n'.join(datagram)
+
+    def _send_batch(self, batch):
+        peers = self._current_peers()
+        for data in self._datagrams(batch):
+            for path in peers:
+                try:
+                    self._sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Jarayon tugagan - socket fayli qolib ketgan
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                except OSError as e:
+                    logger.warning(f"Channel layer: peer {os.path.basename(path)} unavailable ({e})")
+
+    def listen(self, token, callback, stopped):
+        self.own_path = os.path.join(self.dir, f'{token}.sock')
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        receiver.bind(self.own_path)
+        receiver.settimeout(1)
+        atexit.register(self._unlink_own)
+        try:
+            while not stopped.is_set():
+                try:
+                    data = receiver.recv(self.MAX_DATAGRAM)
+                except socket.timeout:
+                    continue
+                for payload in data.decode().split('\n'):
+                    callback(payload)
+        finally:
+            receiver.close()
+            self._unlink_own()
+
+    def _unlink_own(self):
+        try:
+            os.unlink(self.own_path)
+        except OSError:
+            pass
+
+
+class QueuedPublisher:
+    """Publish alohida thread da - event loop bloklanmaydi, navbatdagilar bitta round-trip da yuboriladi"""
+
+    BATCH = 200
+
+    def __init__(self, send_batch, name):
+        self._send_batch = send_batch
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+
+    def publish(self, payload):
+        self._queue.put(payload)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                logger.warning(f"Channel layer publish error ({len(batch)} messages dropped): {e}")
+
+
+class PostgresTransport:
+    """
+    LISTEN/NOTIFY (psycopg2). NOTIFY 8000 baytgacha - katta xabar bo'laklarga (#id:n:jami:...) bo'linadi,
+    bo'laklar bitta tranzaksiyada yuboriladi (birga va tartib bilan yetadi).
+    """
+
+    MAX_PAYLOAD = 7500
+    PART_TTL = 30  # sekund - bo'lagi yo'qolgan xabar shundan keyin tashlanadi
+
+    def __init__(self, alias='default', channel='healthhub_channels'):
+        self.alias = alias
+        self.channel = channel
+        self._publisher = QueuedPublisher(self._send_batch, 'channel-layer-pg-publish')
+        self._publish_conn = None
+        self._parts = {}  # message_id -> (birinchi bo'lak vaqti, {n: bo'lak})
+
+    def _connect(self):
+        from django.db import connections
+
+        wrapper = connections.create_connection(self.alias)
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        connection.autocommit = True
+        return connection
+
+    def publish(self, payload):
+        self._publisher.publish(payload)
+
+    def _chunks(self, payload):
+        if len(payload) <= self.MAX_PAYLOAD:
+            return [payload]
+        message_id = uuid.uuid4().hex[:12]
+        parts = [payload[i:i + self.MAX_PAYLOAD] for i in range(0, len(payload), self.MAX_PAYLOAD)]
+        return [f'#{message_id}:{n}:{len(parts)}:{part}' for n, part in enumerate(parts)]
+
+    def _send_batch(self, batch):
+        notifications = [chunk for payload in batch for chunk in self._chunks(payload)]
+        for attempt in range(2):
+            try:
+                if self._publish_conn is None or self._publish_conn.closed:
+                    self._publish_conn = self._connect()
+                with self._publish_conn.cursor() as cursor:
+                    cursor.execute('SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload',
+                                   [self.channel, notifications])
+                return
+            except Exception:
+                self._publish_conn = None
+                if attempt:
+                    raise
+
+    def _assemble(self, payload):
+        if not payload.startswith('#'):
+            return payload
+        message_id, n, total, part = payload[1:].split(':', 3)
+        entry = self._parts.get(message_id)
+        if entry is None:
+            now = time.monotonic()
+            self._drop_stale_parts(now)
+            entry = self._parts[message_id] = (now, {})
+        parts = entry[1]
+        parts[int(n)] = part
+        if len(parts) < int(total):
+            return None
+        del self._parts[message_id]
+        return ''.join(parts[i] for i in range(int(total)))
+
+    def _drop_stale_parts(self, now):
+        stale = [message_id for message_id, (started, _) in self._parts.items() if now - started > self.PART_TTL]
+        for message_id in stale:
+            del self._parts[message_id]
+        if stale:
+            logger.warning(f"Channel layer: dropped {len(stale)} incomplete chunked messages")
+
+    def listen(self, token, callback, stopped):
+        while not stopped.is_set():
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while not stopped.is_set():
+                    if select.select([connection], [], [], 1) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        payload = self._assemble(connection.notifies.pop(0).payload)
+                        if payload is not None:
+                            callback(payload)
+            except Exception as e:
+                logger.warning(f"Channel layer LISTEN error, reconnecting: {e}")
+                time.sleep(1)
+
+
+class RedisTransport:
+    """Redis protokolli server pub/sub"""
+
+    def __init__(self, url='redis://localhost:6379/2', channel='healthhub_channels'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._publisher = QueuedPublisher(self._send_batch, 'channel-layer-redis-publish')
+
+    def publish(self, payload):
+        self._publisher.publish(payload)
+
+    def _send_batch(self, batch):
+        pipe = self.client.pipeline(transaction=False)
+        for payload in batch:
+            pipe.publish(self.channel, payload)
+        pipe.execute()
+
+    def listen(self, token, callback, stopped):
+        while not stopped.is_set():
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                while not stopped.is_set():
+                    message = pubsub.get_message(timeout=1)
+                    if message is not None:
+                        callback(message['data'].decode())
+            except Exception as e:
+                logger.warning(f"Channel layer SUBSCRIBE error, reconnecting: {e}")
+                time.sleep(1)
+
+
+def make_transport(name, options):
+    if name == 'auto':
+        from django.db import connections
+        name = 'postgres' if connections['default'].vendor == 'postgresql' else 'unix'
+    if name == 'postgres':
+        return PostgresTransport(alias=options.get('database', 'default'))
+    if name == 'redis':
+        return RedisTransport(url=options.get('redis_url', 'redis://localhost:6379/2'))
+    if name == 'unix':
+        if not hasattr(socket, 'AF_UNIX'):
+            logger.warning("Channel layer: unix sockets unavailable, messages stay in this process")
+            return None
+        return UnixSocketTransport(socket_dir=options.get('socket_dir'))
+    raise ValueError(f"Unknown channel layer transport: {name}")
+
+
+def channel_owner(channel):
+    """specific.<token>!xxx -> token; umumiy kanal -> None"""
+    if '!' not in channel:
+        return None
+    return channel.split('!', 1)[0].rsplit('.', 1)[-1]
+
+
+class BroadcastChannelLayer(InMemoryChannelLayer):
+    """
+    InMemoryChannelLayer + jarayonlararo tarqatish.
+    Kanal nomida jarayon tokeni bor (specific.<token>!xxx) - send faqat o'sha jarayonda yetkaziladi.
+    """
+
+    def __init__(self, transport='auto', expiry=60, group_expiry=86400, capacity=100,
+                 channel_capacity=None, **options):
+        super().__init__(expiry=expiry, group_expiry=group_expiry, capacity=capacity,
+                         channel_capacity=channel_capacity)
+        self.transport_name = transport
+        self.options = options
+        self.token = uuid.uuid4().hex[:12]
+        self._transport = None
+        self._transport_lock = threading.Lock()
+        self._loop = None
+        self._listener = None
+        self._stopped = threading.Event()
+        self._sequence = itertools.count()
+        self._cleaned_at = 0.0
+
+    @property
+    def transport(self):
+        # Birinchi ishlatilganda (settings va baza tayyor bo'lganda) yaratiladi
+        if self._transport is None:
+            with self._transport_lock:
+                if self._transport is None:
+                    self._transport = make_transport(self.transport_name, self.options) or False
+        return self._transport or None
+
+    def _ensure_listening(self):
+        """Shu jarayonda kanal paydo bo'lganda - boshqa jarayonlardan xabar qabul qilish"""
+        self._loop = asyncio.get_running_loop()
+        if self._listener is not None or self.transport is None:
+            return
+        with self._transport_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self.transport.listen,
+                    args=(self.token, self._on_payload, self._stopped),
+                    name='channel-layer-listen',
+                    daemon=True,
+                )
+                self._listener.start()
+
+    def _publish(self, kind, name, message):
+        """
+        Payload: "<jarayon> <g|c> <guruh/kanal> <tartib>\t<json>" - sarlavha bo'yicha
+        boshqa jarayonlar keraksiz xabarni JSON o'qimasdan tashlab yuboradi.
+        Tartib raqami - NOTIFY bitta tranzaksiyadagi bir xil payloadlarni birlashtiradi.
+        """
+        if self.transport is not None:
+            header = f'{self.token} {kind} {name} {next(self._sequence)}'
+            self.transport.publish(header + '\t' + json.dumps(message, separators=(',', ':')))
+
+    # ---------- Channel layer API ----------
+
+    async def new_channel(self, prefix='specific.'):
+        self._ensure_listening()
+        return '%s.%s!%s' % (prefix, self.token, ''.join(random.choice(string.ascii_letters) for i in range(12)))
+
+    async def receive(self, channel):
+        self._ensure_listening()
+        return await super().receive(channel)
+
+    async def group_add(self, group, channel):
+        self._ensure_listening()
+        await super().group_add(group, channel)
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        owner = channel_owner(channel)
+        if owner != self.token:
+            self._publish('c', channel, message)
+        if owner is None or owner == self.token:
+            await super().send(channel, message)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        self._publish('g', group, message)
+        await super().group_send(group, message)
+
+    async def close(self):
+        self._stopped.set()
+
+    def _clean_expired(self):
+        # InMemoryChannelLayer har send/receive da barcha kanal va guruhlarni ko'rib chiqadi -
+        # minglab ulanishda bu asosiy xarajat; sekundiga bir marta yetarli
+        now = time.monotonic()
+        if now - self._cleaned_at >= 1:
+            self._cleaned_at = now
+            super()._clean_expired()
+
+    # ---------- Boshqa jarayondan kelgan xabarlar ----------
+
+    def _on_payload(self, payload):
+        """Listener thread - yetkazish event loop da"""
+        try:
+            header, body = payload.split('\t', 1)
+            origin, kind, name, _ = header.split(' ')
+        except ValueError:
+            logger.warning("Channel layer: malformed payload dropped")
+            return
+        if origin == self.token or not self._is_local(kind, name):
+            return
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, kind, name, json.loads(body))
+
+    def _is_local(self, kind, name):
+        if kind == 'g':
+            return name in self.groups
+        # Boshqa jarayonning kanali yoki shu yerda kutilmayotgan umumiy kanal - o'tkazib yuboriladi
+        owner = channel_owner(name)
+        return owner == self.token or (owner is None and name in self.channels)
+
+    def _deliver(self, kind, name, message):
+        if not self._is_local(kind, name):
+            return
+        channels = list(self.groups.get(name, {})) if kind == 'g' else [name]
+        for channel in channels:
+            queue_ = self.channels.setdefault(channel, asyncio.Queue(maxsize=self.get_capacity(channel)))
+            try:
+                queue_.put_nowait((time.time() + self.expiry, deepcopy(message) if len(channels) > 1 else message))
+            except asyncio.QueueFull:
+                logger.debug(f"Channel layer: {channel} full, message dropped")
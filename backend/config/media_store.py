@@ -0,0 +1,321 @@
+# config/media_store.py
+"""
+Kontent-manzilli media ombori (chat fayllari, tibbiy hujjatlar, tahlil natijalari, avatarlar).
+
+Fayl nomi - mazmunining SHA-256 xeshi: cas/ab/cd/<xesh>.<kengaytma>. Bir xil PDF yoki rasm
+necha marta (qaysi modelga) yuklansa ham diskda bitta nusxa saqlanadi.
+Bitta fayl bir nechta yozuvga tegishli bo'lishi mumkin - shuning uchun delete() uni o'chirmaydi,
+hech qaysi yozuv ishlatmaydigan fayllarni sweep_media (Celery beat) tozalaydi.
+
+Rasmlar uchun WebP thumbnail va PDF uchun birinchi sahifa preview fonda (jarayon ichidagi
+thread pool) yaratiladi: thumbs/ab/cd/<xesh>-<o'lcham>.webp. Yuklash paytida o'tkazib
+yuborilganlarini (jarayon qayta ishga tushgan va h.k.) sweep_media to'ldiradi.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import pypdfium2 as pdfium
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+STORE_SETTINGS = getattr(settings, 'MEDIA_STORE', {})
+THUMBNAIL_SIZES = STORE_SETTINGS.get('THUMBNAIL_SIZES', {'small': 160, 'medium': 480})
+WEBP_QUALITY = STORE_SETTINGS.get('WEBP_QUALITY', 80)
+WORKERS = STORE_SETTINGS.get('WORKERS', 2)
+ORPHAN_GRACE = STORE_SETTINGS.get('ORPHAN_GRACE', 24 * 60 * 60)
+
+BLOB_DIR = 'cas'
+THUMB_DIR = 'thumbs'
+TMP_DIR = 'cas/tmp'
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp', 'tif', 'tiff'}
+EXTENSION_RE = re.compile(r'^[a-z0-9]{1,10}$')
+
+# Ombordagi fayllarni ishlatadigan maydonlar - sweep_media shu ro'yxat bo'yicha tekshiradi
+MEDIA_FIELDS = (
+    ('chat', 'Message', 'file'),
+    ('medicines', 'MedicalDocument', 'file'),
+    ('appointments', 'LabTest', 'result_file'),
+    ('accounts', 'User', 'avatar'),
+)
+
+
+def _extension(name):
+    ext = os.path.splitext(name)[1][1:].lower()
+    return ext if EXTENSION_RE.match(ext) else ''
+
+
+def _digest(name):
+    """cas/ab/cd/<xesh>.ext -> xesh (ombor fayli bo'lmasa None)"""
+    if not name or not name.startswith(BLOB_DIR + '/') or name.startswith(TMP_DIR + '/'):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def blob_name(digest, ext=''):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}' + (f'.{ext}' if ext else '')
+
+
+def thumbnail_name(name, size):
+    digest = _digest(name)
+    return f'{THUMB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}-{size}.webp'
+
+
+def can_thumbnail(name):
+    ext = _extension(name)
+    return bool(_digest(name)) and (ext in IMAGE_EXTENSIONS or (ext == 'pdf' and PDF_AVAILABLE))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """MEDIA_ROOT dagi fayllar; yangi yuklanganlar xesh nomi bilan (eski nomlar o'qishda ishlayveradi)"""
+
+    def get_available_name(self, name, max_length=None):
+        # Nom _save da mazmundan hosil qilinadi - bu yerda tekshirish kerak emas
+        return name
+
+    def _save(self, name, content):
+        sha = hashlib.sha256()
+        for chunk in content.chunks():
+            sha.update(chunk)
+        name = blob_name(sha.hexdigest(), _extension(name))
+        if self.exists(name):
+            # Qayta ishlatilgan fayl yangi hisoblanadi - sweep uni grace davomida o'chirmaydi
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass  # sweep hozirgina o'chirdi - qaytadan yoziladi
+
+        # Vaqtinchalik faylga yozib, os.replace - bir xil fayl parallel yuklansa ham yarim fayl ko'rinmaydi
+        content.seek(0)
+        temporary = super()._save(f'{TMP_DIR}/{uuid.uuid4().hex}', content)
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        os.replace(self.path(temporary), self.path(name))
+        schedule_thumbnails(name)
+        return name
+
+    def delete(self, name):
+        # Ombor fayli boshqa yozuvlarda ham bo'lishi mumkin - sweep_media o'chiradi
+        if _digest(name):
+            return
+        super().delete(name)
+
+
+_storage = ContentAddressedStorage()
+
+
+def media_storage():
+    """FileField(storage=media_storage) uchun"""
+    return _storage
+
+
+# ---------- Thumbnail ----------
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = set()
+_inflight_lock = threading.Lock()
+# pdfium thread-safe emas
+_pdf_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='thumbnail')
+        return _executor
+
+
+def schedule_thumbnails(name):
+    """Yangi fayl uchun thumbnail larni fonda yaratish"""
+    if not can_thumbnail(name):
+        return
+    with _inflight_lock:
+        if name in _inflight:
+            return
+        _inflight.add(name)
+    _get_executor().submit(_run, name)
+
+
+def _run(name):
+    try:
+        make_thumbnails(name)
+    except Exception:
+        logger.exception(f"Thumbnail failed: {name}")
+    finally:
+        with _inflight_lock:
+            _inflight.discard(name)
+
+
+def _open_image(path, ext, max_size):
+    from PIL import Image, ImageOps
+
+    if ext == 'pdf':
+        with _pdf_lock:
+            document = pdfium.PdfDocument(path)
+            try:
+                page = document[0]
+                scale = max_size / max(page.get_size())
+                image = page.render(scale=scale).to_pil()
+                page.close()
+            finally:
+                document.close()
+        return image
+
+    image = Image.open(path)
+    # JPEG ni to'liq o'lchamda emas, kerakli o'lchamga yaqin dekodlash
+    image.draft('RGB', (max_size, max_size))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.mode or 'transparency' in image.info else 'RGB')
+    return image
+
+
+def make_thumbnails(name):
+    """Fayl uchun yetishmayotgan thumbnail lar; yaratilganlar soni"""
+    if not can_thumbnail(name) or not _storage.exists(name):
+        return 0
+    missing = [size for size in THUMBNAIL_SIZES.values() if not _storage.exists(thumbnail_name(name, size))]
+    if not missing:
+        return 0
+
+    image = _open_image(_storage.path(name), _extension(name), max(missing))
+    # Kattadan kichikka - har bir o'lcham oldingisidan kichraytiriladi
+    for size in sorted(missing, reverse=True):
+        image.thumbnail((size, size))
+        path = _storage.path(thumbnail_name(name, size))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image.save(path + '.tmp', 'WEBP', quality=WEBP_QUALITY)
+        os.replace(path + '.tmp', path)
+    return len(missing)
+
+
+def thumbnail_urls(field_file, request=None):
+    """{'small': url, 'medium': url} - tayyor thumbnail lar (hali yaratilmagan bo'lsa None)"""
+    if not field_file or not can_thumbnail(field_file.name):
+        return None
+    urls = {}
+    for label, size in THUMBNAIL_SIZES.items():
+        name = thumbnail_name(field_file.name, size)
+        if _storage.exists(name):
+            url = _storage.url(name)
+            urls[label] = request.build_absolute_uri(url) if request else url
+    return urls or None
+
+
+def thumbnail_url(field_file, label='small', request=None):
+    urls = thumbnail_urls(field_file, request)
+    return urls.get(label) if urls else None
+
+
+# ---------- Tozalash ----------
+
+def referenced_names():
+    from django.apps import apps
+
+    names = set()
+    for app_label, model_name, field in MEDIA_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        names.update(
+            model.objects.filter(**{f'{field}__startswith': BLOB_DIR + '/'}).values_list(field, flat=True)
+        )
+    return names
+
+
+def is_referenced(name):
+    """Fayl hozir biror yozuvda ishlatiladimi (o'chirishdan oldin qayta tekshirish)"""
+    from django.apps import apps
+
+    return any(
+        apps.get_model(app_label, model_name).objects.filter(**{field: name}).exists()
+        for app_label, model_name, field in MEDIA_FIELDS
+    )
+
+
+def _walk(directory):
+    root = _storage.path(directory)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            yield os.path.relpath(path, _storage.location).replace(os.sep, '/'), path
+
+
+def sweep(grace=ORPHAN_GRACE):
+    """
+    Yetishmayotgan thumbnail larni yaratish va hech qaysi yozuv ishlatmaydigan
+    (grace dan eski) fayllarni thumbnail lari bilan o'chirish.
+    """
+    referenced = referenced_names()
+    cutoff = time.time() - grace
+    result = {'files': 0, 'thumbnails': 0, 'removed': 0}
+
+    for name, path in _walk(BLOB_DIR):
+        if name in referenced:
+            result['files'] += 1
+            try:
+                result['thumbnails'] += make_thumbnails(name)
+            except Exception:
+                logger.exception(f"Thumbnail failed: {name}")
+            continue
+        if os.path.getmtime(path) > cutoff:
+            continue  # Yangi yuklangan, yozuvi hali saqlanmagan bo'lishi mumkin
+        if is_referenced(name):
+            continue  # Ro'yxat olingandan keyin yangi yozuv ishlata boshladi
+        os.remove(path)
+        if _digest(name):
+            for size in THUMBNAIL_SIZES.values():
+                _storage.delete(thumbnail_name(name, size))
+        result['removed'] += 1
+    return result
+
+
+def import_legacy():
+    """Eski (upload_to nomli) fayllarni omborga ko'chirish - takrorlanganlari bitta faylga"""
+    from django.apps import apps
+
+    result = {'moved': 0, 'missing': 0}
+    moved = set()
+    for app_label, model_name, field in MEDIA_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        rows = (
+            model.objects.exclude(**{f'{field}__startswith': BLOB_DIR + '/'})
+            .exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            .values_list('pk', field)
+        )
+        for pk, old_name in rows.iterator():
+            if not _storage.exists(old_name):
+                result['missing'] += 1
+                continue
+            with _storage.open(old_name) as content:
+                name = _storage.save(old_name, content)
+            # save() emas - modellarning save() dagi qo'shimcha ishlari kerak emas
+            model.objects.filter(pk=pk, **{field: old_name}).update(**{field: name})
+            moved.add(old_name)
+            result['moved'] += 1
+
+    # Eski nom bir nechta yozuvda bo'lishi mumkin - hammasi ko'chgandan keyin o'chiriladi
+    for old_name in moved:
+        _storage.delete(old_name)
+    return result
+
+
+@shared_task(name='config.media_store.sweep_media')
+def sweep_media():
+    result = sweep()
+    if result['thumbnails'] or result['removed']:
+        logger.info(f"Media sweep: {result}")
+    return result
@@ -80,6 +80,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'chat.middleware.PresenceMiddleware',  # API faolligi - onlayn holat heartbeat
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -148,6 +149,14 @@ if IS_PRODUCTION:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Kontent-manzilli media ombori (config/media_store.py)
+MEDIA_STORE = {
+    'THUMBNAIL_SIZES': {'small': 160, 'medium': 480},  # px, uzun tomoni
+    'WEBP_QUALITY': 80,
+    'WORKERS': int(os.getenv('MEDIA_THUMBNAIL_WORKERS', 2)),  # jarayon ichidagi thumbnail thread lari
+    'ORPHAN_GRACE': 60 * 60 * 24,   # sekund, ishlatilmagan fayl shundan keyin o'chiriladi
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -165,10 +174,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-    # Rate limiting - API suiiste'molidan himoya
+    # Rate limiting - API suiiste'molidan himoya (token bucket, barcha workerlar uchun umumiy - THROTTLE_BACKEND)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'ai_service.throttling.AnonBucketThrottle',
+        'ai_service.throttling.UserBucketThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
@@ -245,24 +254,49 @@ if IS_PRODUCTION:
     if FRONTEND_URL and FRONTEND_URL.startswith('https'):
         CSRF_TRUSTED_ORIGINS.append(FRONTEND_URL)
 
-# Channels (WebSocket)
+# Channels (WebSocket) - barcha worker jarayonlari uchun umumiy (config.channel_layers)
+# CHANNEL_TRANSPORT: auto (PostgreSQL bo'lsa LISTEN/NOTIFY, aks holda unix socketlar), postgres, unix, redis
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        'BACKEND': 'config.channel_layers.BroadcastChannelLayer',
+        'CONFIG': {
+            'transport': os.getenv('CHANNEL_TRANSPORT', 'auto'),
+            'redis_url': os.getenv('CHANNEL_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/2')),
+            'capacity': 200,
+            # unix transport: standart - /tmp/healthhub-channels-<uid>-<loyiha xeshi> (0700)
+            'socket_dir': os.getenv('CHANNEL_SOCKET_DIR') or None,
+        },
     }
 }
 
-# Caching
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'healthhub-cache',
-        'TIMEOUT': 300,  # 5 daqiqa default
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000
+# Onlayn holat (chat.presence)
+PRESENCE = {
+    'BACKEND': os.getenv('PRESENCE_BACKEND', 'db'),  # db, redis, local
+    'REDIS_URL': os.getenv('PRESENCE_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/3')),
+    'TTL': 60,              # sekund, shu vaqt heartbeat bo'lmasa - offline
+    'FLUSH_INTERVAL': 20,   # sekund, jarayondagi heartbeatlar bitta batched yozuvga birlashtiriladi
+}
+
+# Caching - CACHE_REDIS_URL berilsa workerlar o'rtasida umumiy, aks holda jarayon xotirasi
+if os.getenv('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
+            'TIMEOUT': 300,  # 5 daqiqa default
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'healthhub-cache',
+            'TIMEOUT': 300,  # 5 daqiqa default
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000
+            }
         }
     }
-}
 
 # Cache timeouts (sekundlarda)
 CACHE_TIMEOUTS = {
@@ -270,6 +304,59 @@ CACHE_TIMEOUTS = {
     'specializations': 60 * 30,  # 30 daqiqa
     'hospitals': 60 * 30,        # 30 daqiqa
     'medicines': 60 * 15,        # 15 daqiqa
+    'map_tiles': 60 * 60,        # 1 soat (versiya bilan yangilanadi)
+    'ai_analysis': 60 * 60 * 6,  # 6 soat (LLM tahlil natijalari)
+    'doctor_recommendations': 60 * 10,  # 10 daqiqa (versiya bilan yangilanadi)
+}
+
+# AI tahlil fon vazifalari (async analyze)
+AI_JOB_SETTINGS = {
+    'WORKERS': int(os.getenv('AI_JOB_WORKERS', 4)),
+    'QUEUE_LIMIT': int(os.getenv('AI_JOB_QUEUE_LIMIT', 20)),              # jarayon navbatidagi maksimal vazifalar
+    'MAX_CONCURRENT_LLM': int(os.getenv('AI_MAX_CONCURRENT_LLM', 2)),     # bir vaqtdagi LLM chaqiruvlari
+    'LLM_SLOT_TIMEOUT': 5,                                                 # sekund
+    'STALE_AFTER': 300,   # sekund; bundan uzoq pending/running vazifa (jarayon qayta ishga tushgan) - failed
+}
+
+# LLM modellari circuit breaker
+LLM_BREAKER_SETTINGS = {
+    'FAILURE_THRESHOLD': 3,     # ketma-ket xatolar - breaker ochiladi
+    'COOLDOWN': 30,             # sekund, oddiy xatodan keyin
+    'QUOTA_COOLDOWN': 120,      # sekund, 429/quota xatosidan keyin
+}
+
+# Bir xil LLM so'rovlarini birlashtirish (single-flight)
+SINGLE_FLIGHT_SETTINGS = {
+    'WAIT_TIMEOUT': 30,         # sekund, follower leader natijasini kutadi
+    'CROSS_WORKER': True,       # cache lock orqali workerlar o'rtasida ham
+    'POLL_INTERVAL': 0.1,
+}
+
+# Lokal alomat klassifikatori (python manage.py train_symptom_classifier)
+SYMPTOM_CLASSIFIER = {
+    'PATH': os.getenv('SYMPTOM_CLASSIFIER_PATH', str(BASE_DIR / 'ml_models' / 'symptom_classifier.npz')),
+    'MIN_CONFIDENCE': float(os.getenv('SYMPTOM_CLASSIFIER_MIN_CONFIDENCE', 0.85)),
+}
+
+# Throttle token bucketlari ombori: db (ThrottleBucket jadvali), redis yoki local (testlar)
+THROTTLE_BACKEND = {
+    'BACKEND': os.getenv('THROTTLE_BACKEND', 'db'),
+    'REDIS_URL': os.getenv('THROTTLE_REDIS_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/1')),
+}
+
+# LLM chaqiruvlari metrikasi (LLMUsageStat jadvali va /metrics)
+LLM_METERING = {
+    'FLUSH_INTERVAL': 30,       # sekund, jarayon ichidagi agregatlar bazaga yoziladi
+    'LATENCY_BUCKETS': (0.1, 0.25, 0.5, 1, 2, 5, 10, 30),  # sekund, histogram chegaralari
+    'METRICS_TOKEN': os.getenv('METRICS_TOKEN', ''),         # /metrics uchun Bearer token (bo'sh - faqat admin)
+    'RETENTION_DAYS': 7,        # undan eski soatlik qatorlar jami qatorga yig'iladi (ai_service.tasks.compact_llm_usage)
+    # USD, 1M token uchun (input, output)
+    'PRICING': {
+        'gemini-1.5-flash': (0.075, 0.30),
+        'gemini-2.0-flash': (0.10, 0.40),
+        'gemini-2.0-flash-exp': (0.0, 0.0),
+        'claude-sonnet-4-20250514': (3.0, 15.0),
+    },
 }
 
 # DRF Spectacular (API Documentation)
@@ -357,6 +444,15 @@ CLICK_SERVICE_ID = os.getenv('CLICK_SERVICE_ID', 'your_click_service_id')
 CLICK_SECRET_KEY = os.getenv('CLICK_SECRET_KEY', 'your_click_secret_key')
 IQAIR_API_KEY = os.getenv('IQAIR_API_KEY', '')
 
+# Havo sifati cache (air_quality.readings) - IQAir bepul tarifi: 5 so'rov/daqiqa, 500 so'rov/kun
+AIR_QUALITY = {
+    'FRESH_TTL': 60 * 60,           # IQAir ma'lumoti soatiga bir yangilanadi
+    'STALE_TTL': 60 * 60 * 12,      # IQAir ishlamasa oxirgi ma'lumot shuncha vaqt beriladi
+    'RETRY_TTL': 60 * 5,            # muvaffaqiyatsiz yangilashdan keyin qayta urinish
+    'REFRESH_AHEAD': 60 * 20,       # beat: muddati shundan kam qolganlar (beat oralig'idan kichik - soatiga bir so'rov)
+    'REFRESH_SPACING': 13,          # sekund, beat dagi IQAir so'rovlari orasida
+}
+
 # Email Configuration
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
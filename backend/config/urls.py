@@ -8,6 +8,8 @@ from django.db import connection
 import os
 import mimetypes
 
+from ai_service.views import prometheus_metrics
+
 
 def health_check(request):
     """Health check endpoint for load balancers and container orchestrators"""
@@ -51,6 +53,9 @@ urlpatterns = [
     # Health check - load balancer va container orchestrator uchun
     path('health/', health_check, name='health_check'),
 
+    # LLM metrikasi (Prometheus)
+    path('metrics', prometheus_metrics, name='metrics'),
+
     path('admin/', admin.site.urls),
 
     # /api/ bilan (v1 olib tashlandi)
@@ -63,6 +68,7 @@ urlpatterns = [
         path('ai/', include('ai_service.urls')),
         path('chat/', include('chat.urls')),
         path('medicines/', include('medicines.urls')),
+        path('hospitals/', include('hospitals.urls')),
         path('air-quality/', include('air_quality.urls')),
         path('notifications/', include('notifications.urls')),
         path('payments/', include('payments.urls')),
@@ -3,6 +3,8 @@ from django.db import models
 from accounts.models import User
 import uuid
 
+from .recommendations import bump_version as bump_recommendations
+
 
 class Specialization(models.Model):
     """Shifokor mutaxassisliklari"""
@@ -18,6 +20,16 @@ class Specialization(models.Model):
     def __str__(self):
         return self.name_uz
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # AI tavsiyalaridagi shifokorlar xaritasi qayta quriladi
+        bump_recommendations()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_recommendations()
+        return result
+
 
 class Hospital(models.Model):
     """Shifoxonalar va klinikalar"""
@@ -50,6 +62,15 @@ class Hospital(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_recommendations()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_recommendations()
+        return result
+
 
 class Doctor(models.Model):
     """Shifokor profillari"""
@@ -87,6 +108,16 @@ class Doctor(models.Model):
     def __str__(self):
         return f"Dr. {self.user.get_full_name()} - {self.specialization.name_uz}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # AI tavsiyalaridagi shifokorlar xaritasi qayta quriladi
+        bump_recommendations()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_recommendations()
+        return result
+
 
 class DoctorReview(models.Model):
     """Shifokor sharhlari"""
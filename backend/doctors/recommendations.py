@@ -0,0 +1,154 @@
+# doctors/recommendations.py
+"""
+Mutaxassislik -> eng yuqori reytingli bo'sh shifokorlar xaritasi (AI javoblari uchun).
+
+Xarita bitta so'rov bilan (select_related) quriladi, tayyor dict ko'rinishida
+cache da saqlanadi va versiya bilan yangilanadi: Doctor, Specialization,
+Hospital yoki shifokor User o'zgarganda bump_version() chaqiriladi. save() ni
+chetlab o'tadigan o'zgarishlar (queryset.update) xarita CACHE_TIMEOUT dan eskirganda
+ko'rinadi. So'rov vaqtida shifokorlarni biriktirish - oddiy dict qidiruvi.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+TOP_PER_SPECIALIZATION = 5
+CACHE_TIMEOUT = settings.CACHE_TIMEOUTS.get('doctor_recommendations', 60 * 10)
+VERSION_KEY = 'doctor_recommendations_version'
+
+# AI javobidagi kalit -> mutaxassislik nomidagi qidiruv so'zlari (name / name_uz)
+SPECIALIZATION_ALIASES = {
+    'terapevt': ['terapevt', 'general', 'therap'],
+    'kardiolog': ['kardiolog', 'cardio'],
+    'nevrolog': ['nevrolog', 'neuro'],
+    'pediatr': ['pediatr'],
+    'dermatolog': ['dermatolog'],
+    'lor': ['lor', 'ent'],
+}
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Vaqt asosida - cache tozalansa ham eski versiya qaytmaydi
+        version = int(time.time())
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_version():
+    """Shifokorlar ma'lumoti o'zgardi - xarita qayta quriladi"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time()), None)
+
+
+def serialize_doctor(doctor):
+    user = doctor.user
+    return {
+        'id': str(doctor.id),
+        'name': f"{user.first_name} {user.last_name}".strip() if user else '',
+        'specialization': doctor.specialization.name_uz or doctor.specialization.name,
+        'hospital': doctor.hospital.name if doctor.hospital else '',
+        'rating': float(doctor.rating or 4.5),
+        'experience': doctor.experience_years or 0,
+        'price': int(doctor.consultation_price or 0),
+    }
+
+
+def build_map(top=TOP_PER_SPECIALIZATION):
+    """
+    {
+        'specializations': [(qidiruv matni, spec_id), ...],
+        'doctors': {spec_id: [shifokor, ...]},
+        'all': [eng yuqori reytingli shifokorlar],
+        'built_at': qurilgan vaqt (time.time())
+    }
+    """
+    from .models import Doctor, Specialization
+
+    doctors = {}
+    top_all = []
+    queryset = (
+        Doctor.objects.filter(is_available=True)
+        .select_related('user', 'specialization', 'hospital')
+        .order_by('-rating', '-experience_years')
+    )
+    for doctor in queryset.iterator():
+        bucket = doctors.setdefault(doctor.specialization_id, [])
+        if len(bucket) < top:
+            bucket.append(serialize_doctor(doctor))
+        if len(top_all) < top:
+            top_all.append(serialize_doctor(doctor))
+
+    specializations = [
+        (f'{name} {name_uz}'.lower(), spec_id)
+        for spec_id, name, name_uz in Specialization.objects.values_list('id', 'name', 'name_uz')
+    ]
+    return {'specializations': specializations, 'doctors': doctors, 'all': top_all, 'built_at': time.time()}
+
+
+class RecommendationMap:
+    """
+    Jarayon ichidagi nusxa - versiya o'zgarmaguncha va xarita CACHE_TIMEOUT dan
+    eskirmaguncha cache dan qayta o'qilmaydi
+    """
+
+    def __init__(self):
+        self._version = None
+        self._data = None
+        self._expires_at = 0.0
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def _current(self):
+        version = get_version()
+        now = time.time()
+        with self._lock:
+            if version == self._version and now < self._expires_at:
+                return self._data, self._resolved
+
+        key = f'doctor_recommendations:v{version}'
+        data = cache.get(key)
+        if data is None or now >= data.get('built_at', 0) + CACHE_TIMEOUT:
+            data = build_map()
+            cache.set(key, data, CACHE_TIMEOUT)
+
+        with self._lock:
+            self._version, self._data, self._resolved = version, data, {}
+            self._expires_at = data['built_at'] + CACHE_TIMEOUT
+            return self._data, self._resolved
+
+    def _resolve(self, data, key):
+        """Kalit -> mos mutaxassisliklar (icontains kabi, lekin xotirada)"""
+        terms = SPECIALIZATION_ALIASES.get(key, [key])
+        return [
+            spec_id for text, spec_id in data['specializations']
+            if any(term in text for term in terms)
+        ]
+
+    def get(self, key, limit=TOP_PER_SPECIALIZATION, fallback_all=False):
+        """Mutaxassislik kaliti/nomi bo'yicha shifokorlar (nusxa)"""
+        data, resolved = self._current()
+        key = (key or '').strip().lower()
+
+        doctors = []
+        if key:
+            spec_ids = resolved.get(key)
+            if spec_ids is None:
+                spec_ids = resolved[key] = self._resolve(data, key)
+            for spec_id in spec_ids:
+                doctors.extend(data['doctors'].get(spec_id, ()))
+            if len(spec_ids) > 1:
+                doctors.sort(key=lambda d: d['rating'], reverse=True)
+
+        if not doctors and (fallback_all or not key):
+            doctors = data['all']
+        return [dict(d) for d in doctors[:limit]]
+
+
+recommendations = RecommendationMap()
@@ -8,6 +8,7 @@ from django.utils import timezone
 from django.core.cache import cache
 from django.conf import settings
 from datetime import timedelta, datetime
+from config.media_store import thumbnail_url
 from .models import Doctor, DoctorReview, Specialization, Hospital
 from .serializers import (
     DoctorSerializer, DoctorDetailSerializer,
@@ -99,6 +100,7 @@ class PublicDoctorViewSet(viewsets.ReadOnlyModelViewSet):
                 'consultation_price': float(doctor.consultation_price),
                 'is_available': doctor.is_available,
                 'avatar': doctor.user.avatar.url if doctor.user.avatar else None,
+                'avatar_thumbnail': thumbnail_url(doctor.user.avatar),
                 'languages': doctor.languages,
             })
         return Response(data)
@@ -1,6 +1,13 @@
 # hospitals/admin.py
 from django.contrib import admin
-from .models import Hospital, HospitalReview
+from .models import Hospital, HospitalReview, OpeningInterval
+
+
+class OpeningIntervalInline(admin.TabularInline):
+    model = OpeningInterval
+    extra = 0
+    can_delete = False
+    readonly_fields = ['start_minute', 'end_minute']
 
 
 @admin.register(Hospital)
@@ -9,6 +16,7 @@ class HospitalAdmin(admin.ModelAdmin):
     list_filter = ['hospital_type', 'city', 'is_24_hours', 'is_active', 'is_verified']
     search_fields = ['name', 'address', 'phone']
     ordering = ['-rating', 'name']
+    inlines = [OpeningIntervalInline]
 
 
 @admin.register(HospitalReview)
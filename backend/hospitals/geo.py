@@ -0,0 +1,154 @@
+# hospitals/geo.py
+"""
+Geohash indeks va vektorlashtirilgan masofa hisoblash.
+
+Qidiruv ikki bosqichda ishlaydi:
+1. SQL: geohash prefikslari (indekslangan) + bounding-box orqali nomzodlarni tanlash
+2. NumPy: nomzodlar uchun haversine masofani bitta vektor amalida hisoblash
+"""
+import math
+
+import numpy as np
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371
+GEOHASH_PRECISION = 7  # ~150m x 150m katak
+MAX_COVER_CELLS = 16  # Bitta so'rovda nechta prefiks ishlatiladi
+KNN_START_RADIUS_KM = 2
+KNN_MAX_RADIUS_KM = math.pi * EARTH_RADIUS_KM  # Yer yarim aylanasi
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Koordinatalarni geohash satriga o'girish"""
+    lat, lng = float(lat), float(lng)
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    result = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(result) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return ''.join(result)
+
+
+def cell_size(precision):
+    """Geohash katagi o'lchami (lat_deg, lng_deg)"""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def bounding_box(lat, lng, radius_km):
+    """Aylanani o'rab turgan to'rtburchak (min_lat, max_lat, min_lng, max_lng)"""
+    lat, lng = float(lat), float(lng)
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat = max(lat - dlat, -90.0)
+    max_lat = min(lat + dlat, 90.0)
+
+    # Qutbga yaqin joylarda uzunlik chegarasi butun doiraga teng
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-6:
+        return min_lat, max_lat, -180.0, 180.0
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if dlng >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, max(lng - dlng, -180.0), min(lng + dlng, 180.0)
+
+
+def covering_cells(min_lat, max_lat, min_lng, max_lng, max_cells=MAX_COVER_CELLS):
+    """
+    Bounding-box ni qoplaydigan geohash prefikslari.
+    Eng aniq (uzun) prefiks tanlanadi, lekin kataklar soni max_cells dan oshmaydi.
+    Juda katta hudud uchun None qaytaradi (prefiks filtri kerak emas).
+    """
+    for precision in range(GEOHASH_PRECISION, 1, -1):
+        lat_deg, lng_deg = cell_size(precision)
+        lat_start = math.floor((min_lat + 90) / lat_deg)
+        lat_end = math.floor((max_lat + 90) / lat_deg)
+        lng_start = math.floor((min_lng + 180) / lng_deg)
+        lng_end = math.floor((max_lng + 180) / lng_deg)
+
+        if (lat_end - lat_start + 1) * (lng_end - lng_start + 1) > max_cells:
+            continue
+
+        cells = set()
+        for i in range(lat_start, lat_end + 1):
+            center_lat = min(-90 + (i + 0.5) * lat_deg, 90.0)
+            for j in range(lng_start, lng_end + 1):
+                center_lng = min(-180 + (j + 0.5) * lng_deg, 180.0)
+                cells.add(geohash_encode(center_lat, center_lng, precision))
+        return sorted(cells)
+
+    return None
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Bitta nuqtadan massivdagi barcha nuqtalargacha masofa (km)"""
+    lat1 = math.radians(float(lat))
+    lng1 = math.radians(float(lng))
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    lng2 = np.radians(np.asarray(lngs, dtype=float))
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def within_radius(queryset, lat, lng, radius_km):
+    """
+    Radius ichidagi obyektlar: [(id, masofa_km), ...] masofa bo'yicha tartiblangan.
+    queryset'da latitude, longitude va geohash maydonlari bo'lishi kerak.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    queryset = queryset.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lng, max_lng),
+    )
+
+    cells = covering_cells(min_lat, max_lat, min_lng, max_lng)
+    if cells:
+        prefix_filter = Q()
+        for cell in cells:
+            prefix_filter |= Q(geohash__startswith=cell)
+        queryset = queryset.filter(prefix_filter)
+
+    rows = list(queryset.values_list('id', 'latitude', 'longitude'))
+    if not rows:
+        return []
+
+    ids, lats, lngs = zip(*rows)
+    distances = haversine_km(lat, lng, lats, lngs)
+    mask = distances <= radius_km
+    order = np.argsort(distances[mask], kind='stable')
+    selected_ids = np.asarray(ids, dtype=object)[mask][order]
+    return list(zip(selected_ids.tolist(), distances[mask][order].tolist()))
+
+
+def k_nearest(queryset, lat, lng, k):
+    """
+    Eng yaqin k ta obyekt, radius cheklovisiz.
+    Radius har safar ikki barobar kengaytiriladi - radius ichida k ta topilsa,
+    ular haqiqatan ham eng yaqinlari bo'ladi.
+    """
+    radius = KNN_START_RADIUS_KM
+    while True:
+        found = within_radius(queryset, lat, lng, radius)
+        if len(found) >= k or radius >= KNN_MAX_RADIUS_KM:
+            return found[:k]
+        radius = min(radius * 2, KNN_MAX_RADIUS_KM)
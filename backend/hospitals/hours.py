@@ -0,0 +1,172 @@
+# hospitals/hours.py
+"""
+Ish vaqtini (working_hours JSON) hafta daqiqalari intervallariga kompilyatsiya qilish.
+
+Hafta daqiqasi: dushanba 00:00 = 0, yakshanba 23:59 = 10079.
+Qo'llab-quvvatlanadigan formatlar:
+    "08:00 - 20:00"                          - har kuni
+    {"mon": "08:00 - 20:00", "sun": "yopiq"}  - kunlar bo'yicha
+    {"weekdays": "09:00-18:00", "sat": ["09:00-13:00", "14:00-17:00"]}
+    {"mon": {"open": "08:00", "close": "17:00"}}, {"mon": {"start": "08:00", "end": "17:00"}}
+    {"Dushanba-Juma": "08:00-18:00", "Shanba, Yakshanba": "09:00-14:00"} - kunlar oralig'i/ro'yxati
+    {"start": "08:00", "end": "18:00"}       - har kuni
+Tungi ish vaqti ("20:00 - 08:00") keyingi kunga o'tadi.
+Tushunilmagan kalit yoki qiymatlar log ga yoziladi (o'tkazib yuboriladi).
+"""
+import logging
+import re
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAY_ALIASES = {
+    0: ['mon', 'monday', 'dushanba', 'du', 'пн', 'понедельник'],
+    1: ['tue', 'tuesday', 'seshanba', 'se', 'вт', 'вторник'],
+    2: ['wed', 'wednesday', 'chorshanba', 'ch', 'ср', 'среда'],
+    3: ['thu', 'thursday', 'payshanba', 'pa', 'чт', 'четверг'],
+    4: ['fri', 'friday', 'juma', 'ju', 'пт', 'пятница'],
+    5: ['sat', 'saturday', 'shanba', 'sh', 'сб', 'суббота'],
+    6: ['sun', 'sunday', 'yakshanba', 'ya', 'вс', 'воскресенье'],
+}
+GROUP_ALIASES = {
+    'daily': range(7), 'everyday': range(7), 'all': range(7), 'har_kuni': range(7),
+    'weekdays': range(5), 'ish_kunlari': range(5),
+    'weekend': range(5, 7), 'dam_olish_kunlari': range(5, 7),
+}
+DAY_KEYS = {alias: (day,) for day, aliases in DAY_ALIASES.items() for alias in aliases}
+DAY_KEYS.update({alias: tuple(days) for alias, days in GROUP_ALIASES.items()})
+
+DAY_RANGE_RE = re.compile(r'\s*[-–—]\s*')
+TIME_KEYS = {'open', 'close', 'start', 'end'}
+
+CLOSED_VALUES = {'', 'closed', 'yopiq', 'dam olish', 'выходной', '-'}
+ALWAYS_OPEN_VALUES = {'24/7', '24 soat', 'kecha-kunduz', 'круглосуточно'}
+
+_RANGE_RE = re.compile(r'(\d{1,2})[:.](\d{2})\s*[-–—]\s*(\d{1,2})[:.](\d{2})')
+
+
+def _minutes(hours, minutes):
+    return int(hours) * 60 + int(minutes)
+
+
+def _day_key(key):
+    """Kalit -> kunlar (0=dushanba); "Dushanba-Juma", "Shanba, Yakshanba" ham. Tushunilmasa ()"""
+    key = str(key).strip().lower()
+    if key in DAY_KEYS:
+        return DAY_KEYS[key]
+    if ',' in key:
+        days = []
+        for part in key.split(','):
+            part_days = _day_key(part)
+            if not part_days:
+                return ()
+            days.extend(day for day in part_days if day not in days)
+        return tuple(days)
+    parts = DAY_RANGE_RE.split(key)
+    if len(parts) == 2 and all(len(DAY_KEYS.get(part, ())) == 1 for part in parts):
+        first, last = DAY_KEYS[parts[0]][0], DAY_KEYS[parts[1]][0]
+        # "Juma-Dushanba" hafta oxiri orqali o'tadi
+        return tuple((first + i) % 7 for i in range((last - first) % 7 + 1))
+    return ()
+
+
+def _parse_ranges(value):
+    """Bir kunlik qiymat -> [(boshlanish, tugash), ...] kun daqiqalarida"""
+    if isinstance(value, dict):
+        opens = value.get('open') or value.get('start') or ''
+        closes = value.get('close') or value.get('end') or ''
+        value = f"{opens} - {closes}" if opens or closes else ''
+    if isinstance(value, (list, tuple)):
+        ranges = []
+        for item in value:
+            ranges.extend(_parse_ranges(item))
+        return ranges
+    if not isinstance(value, str):
+        return []
+
+    text = value.strip().lower()
+    if text in CLOSED_VALUES:
+        return []
+    if text in ALWAYS_OPEN_VALUES:
+        return [(0, MINUTES_PER_DAY)]
+
+    ranges = []
+    for h1, m1, h2, m2 in _RANGE_RE.findall(text):
+        start, end = _minutes(h1, m1), _minutes(h2, m2)
+        if start >= MINUTES_PER_DAY:
+            continue
+        end = min(end, MINUTES_PER_DAY)
+        if end <= start:
+            # Tungi smena - keyingi kunga o'tadi (00:00-00:00 = kecha-kunduz)
+            end += MINUTES_PER_DAY
+        ranges.append((start, end))
+    return ranges
+
+
+def _is_closed(value):
+    if isinstance(value, dict):
+        return not any(value.get(key) for key in TIME_KEYS)
+    if isinstance(value, (list, tuple)):
+        return all(_is_closed(item) for item in value)
+    return value is None or (isinstance(value, str) and value.strip().lower() in CLOSED_VALUES)
+
+
+def compile_working_hours(working_hours, is_24_hours=False, source=''):
+    """working_hours -> birlashtirilgan [(start_minute, end_minute), ...] intervallar"""
+    if is_24_hours:
+        return [(0, MINUTES_PER_WEEK)]
+
+    days = {}
+    if isinstance(working_hours, (str, list)) or (
+        isinstance(working_hours, dict) and working_hours and set(working_hours) <= TIME_KEYS
+    ):
+        days = {day: working_hours for day in range(7)}
+    elif isinstance(working_hours, dict):
+        # Guruhlar (weekdays, Dushanba-Juma) avval, aniq kunlar keyin - aniq kun ustun turadi
+        keyed = [(_day_key(key), key, value) for key, value in working_hours.items()]
+        for key_days, key, value in sorted(keyed, key=lambda item: len(item[0]), reverse=True):
+            if not key_days:
+                logger.warning(f"Unknown working_hours day {key!r} ({source})")
+            for day in key_days:
+                days[day] = value
+
+    intervals = []
+    unparsed = set()
+    for day, value in days.items():
+        offset = day * MINUTES_PER_DAY
+        ranges = _parse_ranges(value)
+        if not ranges and not _is_closed(value):
+            unparsed.add(repr(value))
+        for start, end in ranges:
+            start, end = offset + start, offset + end
+            if end > MINUTES_PER_WEEK:
+                # Yakshanbadan dushanbaga o'tish
+                intervals.append((start, MINUTES_PER_WEEK))
+                intervals.append((0, end - MINUTES_PER_WEEK))
+            else:
+                intervals.append((start, end))
+
+    for value in unparsed:
+        logger.warning(f"Unparsed working_hours value {value} ({source})")
+    return merge_intervals(intervals)
+
+
+def merge_intervals(intervals):
+    """Ustma-ust tushgan yoki tutash intervallarni birlashtirish"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def minute_of_week(moment=None):
+    """Berilgan vaqt (default: hozir) mahalliy vaqtda hafta daqiqasi"""
+    moment = timezone.localtime(moment or timezone.now())
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
@@ -0,0 +1,127 @@
+# hospitals/management/commands/bench_nearby.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hospitals.geo import geohash_encode, within_radius, k_nearest
+from hospitals.models import Hospital
+from hospitals.views import calculate_distance
+
+# O'zbekiston chegaralari (taxminan)
+UZ_LAT = (37.2, 45.6)
+UZ_LNG = (56.0, 73.2)
+
+# Yirik shaharlar - obyektlarning ko'pchiligi shu atrofda
+CITIES = [
+    ('Toshkent', 41.3111, 69.2797),
+    ('Samarqand', 39.6542, 66.9597),
+    ('Buxoro', 39.7747, 64.4286),
+    ('Namangan', 40.9983, 71.6726),
+    ('Andijon', 40.7821, 72.3442),
+    ('Farg\'ona', 40.3894, 71.7843),
+    ('Nukus', 42.4531, 59.6103),
+    ('Qarshi', 38.8606, 65.7891),
+    ('Termiz', 37.2242, 67.2783),
+    ('Urganch', 41.5500, 60.6333),
+]
+
+
+class Command(BaseCommand):
+    help = 'Yaqin atrofdagi kasalxonalarni qidirish benchmarki (geohash indeks vs Python sikli)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--radius', type=float, default=5)
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        # Test ma'lumotlari tranzaksiya ichida yaratiladi va oxirida bekor qilinadi
+        with transaction.atomic():
+            self._populate(rng, options['count'])
+            self._run(rng, options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Tayyor! (test ma\'lumotlari o\'chirildi)'))
+
+    def _populate(self, rng, count):
+        self.stdout.write(f'{count} ta obyekt yaratilmoqda...')
+        hospitals = []
+        for i in range(count):
+            if rng.random() < 0.8:
+                city, lat, lng = rng.choice(CITIES)
+                lat += rng.gauss(0, 0.15)
+                lng += rng.gauss(0, 0.15)
+            else:
+                city = 'Viloyat'
+                lat = rng.uniform(*UZ_LAT)
+                lng = rng.uniform(*UZ_LNG)
+            lat, lng = round(lat, 7), round(lng, 7)
+            hospitals.append(Hospital(
+                name=f'Bench {i}',
+                hospital_type=rng.choice(Hospital.TYPE_CHOICES)[0],
+                address='-',
+                city=city,
+                latitude=lat,
+                longitude=lng,
+                geohash=geohash_encode(lat, lng),
+            ))
+        Hospital.objects.bulk_create(hospitals, batch_size=1000)
+
+    def _legacy(self, queryset, lat, lng, radius):
+        """Eski usul: barcha qatorlar + Python sikli"""
+        result = []
+        for h in queryset.all():
+            distance = calculate_distance(lat, lng, h.latitude, h.longitude)
+            if distance and distance <= radius:
+                result.append((h.id, distance))
+        result.sort(key=lambda x: x[1])
+        return result
+
+    def _timeit(self, func, points):
+        timings = []
+        for lat, lng in points:
+            start = time.perf_counter()
+            func(lat, lng)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return sum(timings) / len(timings), timings[int(len(timings) * 0.95) - 1]
+
+    def _run(self, rng, options):
+        queryset = Hospital.objects.filter(
+            is_active=True,
+            latitude__isnull=False,
+            longitude__isnull=False
+        )
+        radius, k = options['radius'], options['k']
+
+        points = []
+        for _ in range(options['queries']):
+            _, lat, lng = rng.choice(CITIES)
+            points.append((lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.05)))
+
+        # Natijalar mosligini tekshirish
+        lat, lng = points[0]
+        legacy_ids = {pk for pk, _ in self._legacy(queryset, lat, lng, radius)}
+        indexed_ids = {pk for pk, _ in within_radius(queryset, lat, lng, radius)}
+        if legacy_ids - indexed_ids:
+            self.stdout.write(self.style.WARNING(
+                f'Farq: {len(legacy_ids - indexed_ids)} ta obyekt topilmadi'
+            ))
+
+        rows = [
+            ('Python sikli (radius)', lambda la, ln: self._legacy(queryset, la, ln, radius)),
+            ('Geohash + NumPy (radius)', lambda la, ln: within_radius(queryset, la, ln, radius)),
+            (f'Geohash k-nearest (k={k})', lambda la, ln: k_nearest(queryset, la, ln, k)),
+        ]
+
+        header = "o'rtacha ms"
+        self.stdout.write(f'\n{"Usul":<32}{header:>14}{"p95 ms":>10}')
+        for label, func in rows:
+            avg, p95 = self._timeit(func, points)
+            self.stdout.write(f'{label:<32}{avg:>14.2f}{p95:>10.2f}')
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:46
+
+from django.db import migrations, models
+
+
+def fill_geohash(apps, schema_editor):
+    from hospitals.geo import geohash_encode
+
+    Hospital = apps.get_model('hospitals', 'Hospital')
+    hospitals = Hospital.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for hospital in hospitals.iterator():
+        hospital.geohash = geohash_encode(hospital.latitude, hospital.longitude)
+        hospital.save(update_fields=['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hospital',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def compile_intervals(apps, schema_editor):
+    from hospitals.hours import compile_working_hours
+
+    Hospital = apps.get_model('hospitals', 'Hospital')
+    OpeningInterval = apps.get_model('hospitals', 'OpeningInterval')
+    intervals = []
+    for hospital in Hospital.objects.iterator():
+        for start, end in compile_working_hours(hospital.working_hours, hospital.is_24_hours):
+            intervals.append(OpeningInterval(hospital=hospital, start_minute=start, end_minute=end))
+    OpeningInterval.objects.bulk_create(intervals, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0002_hospital_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_minute', models.PositiveIntegerField()),
+                ('end_minute', models.PositiveIntegerField()),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_intervals', to='hospitals.hospital')),
+            ],
+            options={
+                'verbose_name': 'Ish vaqti intervali',
+                'verbose_name_plural': 'Ish vaqti intervallari',
+                'ordering': ['hospital', 'start_minute'],
+                'indexes': [models.Index(fields=['start_minute', 'end_minute'], name='hospitals_o_start_m_1f5913_idx')],
+            },
+        ),
+        migrations.RunPython(compile_intervals, migrations.RunPython.noop),
+    ]
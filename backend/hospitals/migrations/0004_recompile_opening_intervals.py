@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def recompile_intervals(apps, schema_editor):
+    """Kunlar oralig'i ("Dushanba-Juma") va start/end formatidagi ish vaqtlari endi tushuniladi"""
+    from hospitals.hours import compile_working_hours
+
+    Hospital = apps.get_model('hospitals', 'Hospital')
+    OpeningInterval = apps.get_model('hospitals', 'OpeningInterval')
+    OpeningInterval.objects.all().delete()
+    intervals = []
+    for hospital in Hospital.objects.iterator():
+        for start, end in compile_working_hours(hospital.working_hours, hospital.is_24_hours, source=hospital.name):
+            intervals.append(OpeningInterval(hospital=hospital, start_minute=start, end_minute=end))
+    OpeningInterval.objects.bulk_create(intervals, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0003_openinginterval'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompile_intervals, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,23 @@
 # hospitals/models.py
 from django.db import models
 from django.conf import settings
+from .geo import geohash_encode
+from .hours import compile_working_hours, minute_of_week
+from .tiles import bump_version
+
+# Xarita tayllarida ko'rinadigan maydonlar
+TILE_FIELDS = {'name', 'hospital_type', 'is_24_hours', 'is_active', 'latitude', 'longitude'}
+
+
+class HospitalQuerySet(models.QuerySet):
+    def open_at(self, moment=None):
+        """Berilgan vaqtda (default: hozir) ochiq bo'lgan kasalxonalar"""
+        minute = minute_of_week(moment)
+        open_ids = OpeningInterval.objects.filter(
+            start_minute__lte=minute,
+            end_minute__gt=minute
+        ).values('hospital_id')
+        return self.filter(models.Q(is_24_hours=True) | models.Q(id__in=open_ids))
 
 
 class Hospital(models.Model):
@@ -22,6 +39,7 @@ class Hospital(models.Model):
     # Koordinatalar
     latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
     longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
 
     phone = models.CharField(max_length=20, blank=True)
     email = models.EmailField(blank=True)
@@ -48,6 +66,8 @@ class Hospital(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = HospitalQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Kasalxona"
         verbose_name_plural = "Kasalxonalar"
@@ -56,6 +76,37 @@ class Hospital(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Geohash koordinatalardan hisoblanadi (yaqin atrofni qidirish indeksi)
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
+        if update_fields is None or {'working_hours', 'is_24_hours'} & set(update_fields):
+            self.rebuild_opening_intervals()
+
+        if update_fields is None or TILE_FIELDS & set(update_fields):
+            bump_version('hospitals')
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_version('hospitals')
+        return result
+
+    def rebuild_opening_intervals(self):
+        """working_hours dan ish vaqti intervallarini qayta qurish"""
+        intervals = compile_working_hours(self.working_hours, self.is_24_hours, source=self.name)
+        self.opening_intervals.all().delete()
+        OpeningInterval.objects.bulk_create([
+            OpeningInterval(hospital=self, start_minute=start, end_minute=end)
+            for start, end in intervals
+        ])
+
     def update_rating(self):
         """Reytingni yangilash"""
         reviews = self.reviews.all()
@@ -65,6 +116,24 @@ class Hospital(models.Model):
             self.save(update_fields=['rating', 'reviews_count'])
 
 
+class OpeningInterval(models.Model):
+    """Ish vaqti intervali - hafta daqiqalarida (dushanba 00:00 = 0)"""
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='opening_intervals')
+    start_minute = models.PositiveIntegerField()
+    end_minute = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = "Ish vaqti intervali"
+        verbose_name_plural = "Ish vaqti intervallari"
+        ordering = ['hospital', 'start_minute']
+        indexes = [
+            models.Index(fields=['start_minute', 'end_minute']),
+        ]
+
+    def __str__(self):
+        return f"{self.hospital_id}: {self.start_minute}-{self.end_minute}"
+
+
 class HospitalReview(models.Model):
     """Kasalxona sharhlari"""
     hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='reviews')
@@ -0,0 +1,21 @@
+# hospitals/tasks.py
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+WARM_MAX_ZOOM = 12
+
+
+@shared_task(name='hospitals.tasks.warm_map_tiles')
+def warm_map_tiles(max_zoom=WARM_MAX_ZOOM):
+    """
+    Xarita tayllarini oldindan hisoblash.
+    Faqat joriy versiyada hali hisoblanmagan darajalar quriladi.
+    """
+    from .tiles import LAYERS, warm_levels
+
+    for layer in LAYERS:
+        built = warm_levels(layer, max_zoom)
+        if built:
+            logger.info(f"Map tiles warmed: {layer}, {built} levels")
@@ -0,0 +1,259 @@
+# hospitals/tiles.py
+"""
+Xarita uchun klasterlangan GeoJSON tayllar (z/x/y).
+
+Klasterlanadigan har bir zoom darajasi (0..MAX_CLUSTER_ZOOM) bir marta hisoblanadi va
+cache da bitta yozuv sifatida saqlanadi ({(x, y): features}) - qatlamga ~17 ta kalit,
+kichik LocMemCache (MAX_ENTRIES) dagi boshqa yozuvlarni siqib chiqarmaydi. Undan kattasida
+faqat so'ralgan tayl nuqtalardan (numpy niqob) hisoblanadi - butun daraja qurilmaydi.
+Nuqtalar va darajalar jarayon ichida ham kichik LRU da saqlanadi (har so'rovda unpickle yo'q).
+Kalitlarda versiya bor - obyektlar o'zgarganda versiya oshiriladi va eski tayllar
+o'z-o'zidan eskiradi (cache.delete kerak emas).
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+MAX_CLUSTER_ZOOM = 15  # Bundan kattasida har bir obyekt alohida
+MAX_ZOOM = 20
+CELLS_PER_TILE = 4  # Tayl tomoni bo'yicha klaster kataklari (256px / 4 = 64px)
+MAX_LATITUDE = 85.05112878
+
+LAYERS = ('hospitals', 'pharmacies')
+CACHE_TIMEOUT = settings.CACHE_TIMEOUTS.get('map_tiles', 60 * 60)
+MEMO_SIZE = 32  # jarayon ichidagi nuqta/daraja nusxalari
+
+
+class _Memo:
+    """Kichik LRU - kalitlarda versiya bor, eskilari o'z-o'zidan chiqib ketadi"""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+_memo = _Memo(MEMO_SIZE)
+
+
+# ============ VERSIYA ============
+
+def _version_key(layer):
+    return f'map_tiles_version:{layer}'
+
+
+def get_version(layer):
+    """Qatlamning joriy versiyasi"""
+    version = cache.get(_version_key(layer))
+    if version is None:
+        # Vaqt asosida boshlanadi - cache tozalansa ham eski versiya qaytmaydi
+        version = int(time.time())
+        cache.add(_version_key(layer), version, None)
+        version = cache.get(_version_key(layer), version)
+    return version
+
+
+def bump_version(layer):
+    """Qatlam o'zgardi - barcha tayllarni eskirgan deb belgilash"""
+    try:
+        cache.incr(_version_key(layer))
+    except ValueError:
+        cache.set(_version_key(layer), int(time.time()), None)
+
+
+# ============ NUQTALAR ============
+
+def _load_hospitals():
+    from .models import Hospital
+
+    rows = Hospital.objects.filter(
+        is_active=True,
+        latitude__isnull=False,
+        longitude__isnull=False
+    ).values_list('id', 'name', 'hospital_type', 'is_24_hours', 'latitude', 'longitude')
+
+    return [
+        ({'id': pk, 'name': name, 'type': kind, 'is_24_hours': is_24}, float(lat), float(lng))
+        for pk, name, kind, is_24, lat, lng in rows
+    ]
+
+
+def _load_pharmacies():
+    from medicines.models import Pharmacy
+
+    rows = Pharmacy.objects.filter(
+        latitude__isnull=False,
+        longitude__isnull=False
+    ).values_list('id', 'name', 'is_24_7', 'latitude', 'longitude')
+
+    return [
+        ({'id': str(pk), 'name': name, 'type': 'pharmacy', 'is_24_hours': is_24}, lat, lng)
+        for pk, name, is_24, lat, lng in rows
+    ]
+
+
+LOADERS = {
+    'hospitals': _load_hospitals,
+    'pharmacies': _load_pharmacies,
+}
+
+
+def get_points(layer, version):
+    """Qatlam nuqtalari: (properties ro'yxati, lat massivi, lng massivi, mercator x, mercator y)"""
+    key = f'map_points:{layer}:v{version}'
+    points = _memo.get(key)
+    if points is not None:
+        return points
+    points = cache.get(key)
+    if points is None:
+        rows = LOADERS[layer]()
+        props = [r[0] for r in rows]
+        lats = np.array([r[1] for r in rows], dtype=float)
+        lngs = np.array([r[2] for r in rows], dtype=float)
+        mx, my = mercator(lats, lngs)
+        points = (props, lats, lngs, mx, my)
+        cache.set(key, points, CACHE_TIMEOUT)
+    _memo.set(key, points)
+    return points
+
+
+def mercator(lats, lngs):
+    """Lat/lng -> Web Mercator [0, 1) koordinatalari (y shimoldan pastga)"""
+    lat_rad = np.radians(np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE))
+    mx = (lngs + 180.0) / 360.0
+    my = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0
+    return np.clip(mx, 0.0, 1.0 - 1e-12), np.clip(my, 0.0, 1.0 - 1e-12)
+
+
+# ============ KLASTERLASH ============
+
+def _point_feature(props, lat, lng):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [round(lng, 6), round(lat, 6)]},
+        'properties': dict(props, cluster=False),
+    }
+
+
+def _cluster_feature(count, lat, lng):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [round(lng, 6), round(lat, 6)]},
+        'properties': {'cluster': True, 'point_count': count},
+    }
+
+
+def cluster_level(points, z):
+    """
+    Bitta zoom darajasidagi barcha tayllar: {(x, y): [feature, ...]}.
+    Grid klasterlash: nuqtalar Mercator piksel kataklariga guruhlanadi,
+    klaster markazi - a'zolarning o'rtacha koordinatasi.
+    """
+    props, lats, lngs, mx, my = points
+    if not props:
+        return {}
+
+    tile_count = 1 << z
+    tiles = {}
+    scale = tile_count * CELLS_PER_TILE
+    cx = (mx * scale).astype(np.int64)
+    cy = (my * scale).astype(np.int64)
+    cells = cx * scale + cy
+
+    _, first, inverse, counts = np.unique(
+        cells, return_index=True, return_inverse=True, return_counts=True
+    )
+    mean_lat = np.bincount(inverse, weights=lats) / counts
+    mean_lng = np.bincount(inverse, weights=lngs) / counts
+
+    for group, idx in enumerate(first):
+        key = (int(cx[idx]) // CELLS_PER_TILE, int(cy[idx]) // CELLS_PER_TILE)
+        if counts[group] == 1:
+            feature = _point_feature(props[idx], lats[idx], lngs[idx])
+        else:
+            feature = _cluster_feature(int(counts[group]), mean_lat[group], mean_lng[group])
+        tiles.setdefault(key, []).append(feature)
+
+    return tiles
+
+
+def tile_points(points, z, x, y):
+    """Klasterlanmaydigan daraja (z > MAX_CLUSTER_ZOOM) - faqat shu tayldagi nuqtalar"""
+    props, lats, lngs, mx, my = points
+    if not props:
+        return []
+    tile_count = 1 << z
+    inside = ((mx * tile_count).astype(np.int64) == x) & ((my * tile_count).astype(np.int64) == y)
+    return [_point_feature(props[i], lats[i], lngs[i]) for i in np.flatnonzero(inside)]
+
+
+# ============ CACHE ============
+
+def _level_key(layer, version, z):
+    return f'map_tile_level:{layer}:v{version}:{z}'
+
+
+def _feature_collection(features):
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def build_level(layer, z, version=None):
+    """Klasterlangan zoom darajasini hisoblab, cache ga bitta yozuv sifatida saqlash"""
+    version = version or get_version(layer)
+    key = _level_key(layer, version, z)
+    tiles = {
+        tile: _feature_collection(features)
+        for tile, features in cluster_level(get_points(layer, version), z).items()
+    }
+    cache.set(key, tiles, CACHE_TIMEOUT)
+    _memo.set(key, tiles)
+    return tiles
+
+
+def _get_level(layer, version, z):
+    key = _level_key(layer, version, z)
+    tiles = _memo.get(key)
+    if tiles is None:
+        tiles = cache.get(key)
+        if tiles is None:
+            return build_level(layer, z, version)
+        _memo.set(key, tiles)
+    return tiles
+
+
+def warm_levels(layer, max_zoom):
+    """0..max_zoom (MAX_CLUSTER_ZOOM gacha) darajalarini oldindan hisoblash (hisoblanganlari o'tkazib yuboriladi)"""
+    version = get_version(layer)
+    built = 0
+    for z in range(min(max_zoom, MAX_CLUSTER_ZOOM) + 1):
+        if cache.get(_level_key(layer, version, z)) is None:
+            build_level(layer, z, version)
+            built += 1
+    return built
+
+
+def get_tile(layer, z, x, y):
+    """Tayl GeoJSON - odatda jarayon xotirasidan yoki bitta cache o'qish"""
+    version = get_version(layer)
+    if z > MAX_CLUSTER_ZOOM:
+        return _feature_collection(tile_points(get_points(layer, version), z, x, y))
+    return _get_level(layer, version, z).get((x, y)) or _feature_collection([])
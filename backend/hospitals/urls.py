@@ -7,6 +7,7 @@ app_name = 'hospitals'
 urlpatterns = [
     path('', views.hospitals_list, name='list'),
     path('nearby/', views.nearby_hospitals, name='nearby'),
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>/', views.map_tile, name='map-tile'),
     path('<int:pk>/', views.hospital_detail, name='detail'),
     path('<int:pk>/review/', views.hospital_review, name='review'),
 ]
\ No newline at end of file
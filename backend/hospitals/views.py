@@ -5,9 +5,15 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .models import Hospital, HospitalReview
+from .geo import haversine_km, within_radius, k_nearest
+from . import tiles
 import math
 
+NEARBY_LIMIT = 20
+LIST_LIMIT = 50
+
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Ikki nuqta orasidagi masofani hisoblash (km)"""
@@ -22,10 +28,37 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return round(R * c, 1)
 
 
-def hospital_to_dict(hospital, user_lat=None, user_lng=None):
+def parse_location(request):
+    """lat/lng parametrlarini float ga o'girish (bo'lmasa None, None)"""
+    try:
+        return float(request.GET['lat']), float(request.GET['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None, None
+
+
+def filter_open(queryset, request):
+    """
+    open_now=true yoki open_at=<ISO vaqt> filtri.
+    Noto'g'ri open_at uchun ValueError.
+    """
+    open_at = request.GET.get('open_at')
+    if open_at:
+        moment = parse_datetime(open_at)
+        if moment is None:
+            raise ValueError(open_at)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return queryset.open_at(moment)
+
+    if request.GET.get('open_now') == 'true':
+        return queryset.open_at()
+
+    return queryset
+
+
+def hospital_to_dict(hospital, user_lat=None, user_lng=None, distance=None):
     """Hospital modelini dict ga o'girish"""
-    distance = None
-    if user_lat and user_lng and hospital.latitude and hospital.longitude:
+    if distance is None and user_lat and user_lng and hospital.latitude and hospital.longitude:
         distance = calculate_distance(user_lat, user_lng, hospital.latitude, hospital.longitude)
 
     return {
@@ -81,12 +114,31 @@ def hospitals_list(request):
     if is_24_hours == 'true':
         queryset = queryset.filter(is_24_hours=True)
 
+    try:
+        queryset = filter_open(queryset, request)
+    except ValueError:
+        return Response({'error': 'Noto\'g\'ri open_at vaqti'}, status=400)
+
     # User location for distance calculation
-    user_lat = request.GET.get('lat')
-    user_lng = request.GET.get('lng')
+    user_lat, user_lng = parse_location(request)
+    has_location = user_lat is not None
 
     # Sort
     sort_by = request.GET.get('sort', 'rating')
+
+    if sort_by == 'distance' and has_location:
+        # Eng yaqin 50 ta - geohash indeks orqali, butun jadvalni o'qimasdan
+        nearest = k_nearest(queryset, user_lat, user_lng, LIST_LIMIT)
+        objects = queryset.in_bulk([pk for pk, _ in nearest])
+        hospitals = [
+            hospital_to_dict(objects[pk], distance=round(dist, 1))
+            for pk, dist in nearest
+        ]
+        return Response({
+            'count': len(hospitals),
+            'hospitals': hospitals
+        })
+
     if sort_by == 'rating':
         queryset = queryset.order_by('-rating', 'name')
     elif sort_by == 'name':
@@ -94,11 +146,22 @@ def hospitals_list(request):
     elif sort_by == 'reviews':
         queryset = queryset.order_by('-reviews_count')
 
-    hospitals = [hospital_to_dict(h, user_lat, user_lng) for h in queryset[:50]]
+    page = list(queryset[:LIST_LIMIT])
 
-    # Sort by distance if user location provided
-    if sort_by == 'distance' and user_lat and user_lng:
-        hospitals.sort(key=lambda x: x.get('distance') or 9999)
+    # Masofalar bitta vektor amalida
+    distances = [None] * len(page)
+    if has_location:
+        located = [i for i, h in enumerate(page) if h.latitude is not None and h.longitude is not None]
+        if located:
+            values = haversine_km(
+                user_lat, user_lng,
+                [page[i].latitude for i in located],
+                [page[i].longitude for i in located],
+            )
+            for i, dist in zip(located, values.tolist()):
+                distances[i] = round(dist, 1)
+
+    hospitals = [hospital_to_dict(h, distance=d) for h, d in zip(page, distances)]
 
     return Response({
         'count': len(hospitals),
@@ -188,20 +251,15 @@ def hospital_review(request, pk):
 def nearby_hospitals(request):
     """Yaqin atrofdagi kasalxonalar"""
 
-    lat = request.GET.get('lat')
-    lng = request.GET.get('lng')
-    radius = float(request.GET.get('radius', 5))  # km
-    hospital_type = request.GET.get('type')
-
-    if not lat or not lng:
+    if not request.GET.get('lat') or not request.GET.get('lng'):
         return Response({'error': 'lat va lng parametrlari kerak'}, status=400)
 
-    try:
-        user_lat = float(lat)
-        user_lng = float(lng)
-    except ValueError:
+    user_lat, user_lng = parse_location(request)
+    if user_lat is None:
         return Response({'error': 'Noto\'g\'ri koordinatalar'}, status=400)
 
+    hospital_type = request.GET.get('type')
+
     queryset = Hospital.objects.filter(
         is_active=True,
         latitude__isnull=False,
@@ -211,30 +269,45 @@ def nearby_hospitals(request):
     if hospital_type:
         queryset = queryset.filter(hospital_type=hospital_type)
 
-    # Calculate distances and filter
+    try:
+        queryset = filter_open(queryset, request)
+    except ValueError:
+        return Response({'error': 'Noto\'g\'ri open_at vaqti'}, status=400)
+
+    # k - radius cheklovisiz eng yaqin N ta
+    k = request.GET.get('k')
+    try:
+        if k:
+            k = max(1, min(int(k), 100))
+            found = k_nearest(queryset, user_lat, user_lng, k)
+        else:
+            radius = float(request.GET.get('radius', 5))  # km
+            found = within_radius(queryset, user_lat, user_lng, radius)
+    except ValueError:
+        return Response({'error': 'Noto\'g\'ri parametrlar'}, status=400)
+
+    # To'liq ma'lumot faqat qaytariladigan obyektlar uchun olinadi
+    top = found[:k or NEARBY_LIMIT]
+    objects = Hospital.objects.in_bulk([pk for pk, _ in top])
+
     hospitals = []
-    for h in queryset:
-        distance = calculate_distance(user_lat, user_lng, h.latitude, h.longitude)
-        if distance and distance <= radius:
-            data = {
-                'id': h.id,
-                'name': h.name,
-                'hospital_type': h.hospital_type,
-                'type_display': h.get_hospital_type_display(),
-                'distance': distance,
-                'is_24_hours': h.is_24_hours,
-                'rating': float(h.rating),
-                'address': h.address,
-                'phone': h.phone,
-            }
-            hospitals.append(data)
-
-    # Sort by distance
-    hospitals.sort(key=lambda x: x['distance'])
+    for pk, distance in top:
+        h = objects[pk]
+        hospitals.append({
+            'id': h.id,
+            'name': h.name,
+            'hospital_type': h.hospital_type,
+            'type_display': h.get_hospital_type_display(),
+            'distance': round(distance, 1),
+            'is_24_hours': h.is_24_hours,
+            'rating': float(h.rating),
+            'address': h.address,
+            'phone': h.phone,
+        })
 
     return Response({
-        'count': len(hospitals),
-        'hospitals': hospitals[:20]
+        'count': len(found),
+        'hospitals': hospitals
     })
 
 
@@ -250,3 +323,19 @@ def hospital_types(request):
         {'value': 'dental', 'label': 'Stomatologiya'},
     ]
     return Response(types)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def map_tile(request, layer, z, x, y):
+    """Xarita tayli - klasterlangan GeoJSON (hospitals yoki pharmacies)"""
+
+    if layer not in tiles.LAYERS:
+        return Response({'error': 'Noma\'lum qatlam'}, status=status.HTTP_404_NOT_FOUND)
+
+    if z > tiles.MAX_ZOOM or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        return Response({'error': 'Noto\'g\'ri tayl koordinatalari'}, status=400)
+
+    response = Response(tiles.get_tile(layer, z, x, y))
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
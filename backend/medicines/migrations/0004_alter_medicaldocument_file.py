@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:48
+
+import config.media_store
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicines', '0003_prescriptionorder'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='medicaldocument',
+            name='file',
+            field=models.FileField(storage=config.media_store.media_storage, upload_to='medical_documents/%Y/%m/', verbose_name='Fayl'),
+        ),
+    ]
@@ -2,6 +2,8 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from config.media_store import media_storage
+from hospitals.tiles import bump_version
 
 
 class Category(models.Model):
@@ -39,6 +41,16 @@ class Pharmacy(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Xarita tayllarini yangilash
+        bump_version('pharmacies')
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_version('pharmacies')
+        return result
+
 
 class Medicine(models.Model):
     """Dorilar"""
@@ -212,7 +224,7 @@ class MedicalDocument(models.Model):
     )
     title = models.CharField(max_length=200, verbose_name="Sarlavha")
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES, default='other')
-    file = models.FileField(upload_to='medical_documents/%Y/%m/', verbose_name="Fayl")
+    file = models.FileField(upload_to='medical_documents/%Y/%m/', storage=media_storage, verbose_name="Fayl")
     description = models.TextField(blank=True, verbose_name="Tavsif")
     doctor_name = models.CharField(max_length=200, blank=True, verbose_name="Shifokor")
     hospital_name = models.CharField(max_length=200, blank=True, verbose_name="Shifoxona")